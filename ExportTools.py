@@ -1,6 +1,7 @@
 # Assuming you have not changed the general structure of the template no modification is needed in this file.
 import adsk.core
 from . import commands
+from . import config
 from .lib import fusionAddInUtils as futil
 
 app = adsk.core.Application.get()
@@ -9,6 +10,9 @@ ui = app.userInterface
 
 def run(context):
     try:
+        futil.start_logging()
+        futil.set_profiling(config.PROFILE)
+
         # This will run the start function in each of your commands as defined in commands/__init__.py
         commands.start()
         # ui.messageBox('Export tools add-in started.\nPress ⌘+⌥+E')
@@ -25,5 +29,8 @@ def stop(context):
         # This will run the start function in each of your commands as defined in commands/__init__.py
         commands.stop()
 
+        # Write out any log messages still queued for the log file
+        futil.stop_logging()
+
     except:
         futil.handle_error("stop")
@@ -0,0 +1,109 @@
+"""Rule-based selection over 20k bodies with the body index and without it.
+
+The design has 2,000 bodies in its root component and 300 instances of
+three components with 60 bodies each. Every query is run against the
+index, and as a scan that reads the properties of every body through the
+API for each query, as a query without the index would. The stand-in API
+answers from Python attributes, so the scan's time is far below Fusion's,
+where each property is a call into the application. The number of bodies
+whose properties are read is reported next to the time for that reason.
+"""
+from benchutil import harness, measure
+
+import adsk.fusion
+
+entry = harness.importModule('commands.exportAsSTL.entry')
+body_index = harness.importModule('commands.exportAsSTL.body_index')
+
+QUERIES = [
+    'Rail*',
+    'material:aluminum*',
+    'path:frame* visible:yes',
+    'name:/^M\\d+$/ volume:..0.5',
+]
+
+MATERIALS = ['Steel', 'Aluminum 6061', 'ABS Plastic', 'Brass']
+
+
+def createDesign(scale):
+    design = harness.createDesign(0)
+    root = design.rootComponent
+    for i in range(2000 // scale):
+        body = root.addBody(f'Part{i}', (1.0, 1.0, 0.1 + i % 10), material=MATERIALS[i % 4])
+        body.isVisible = i % 3 != 0
+
+    for name, prefix in (('Frame', 'Rail'), ('Bolt', 'M'), ('Bracket', 'Plate')):
+        component = adsk.fusion.Component(design, name)
+        for i in range(60):
+            component.addBody(f'{prefix}{i}', (0.5, 0.5, 0.2 + i % 5), material=MATERIALS[i % 4])
+        for _ in range(100 // scale):
+            root.addOccurrence(component)
+    return design
+
+
+def scanQuery(design, query):
+    # Reads every body's properties through the API and matches them
+    matches = []
+    for _, _, body, readProperties, readVolume in entry.iterDesignBodies(design.rootComponent):
+        name, path, material, visible = readProperties(body)
+        volume = readVolume(body)
+        if query.name is not None and not query.name.search(name.casefold()):
+            continue
+        if query.path is not None and not query.path.search(path.casefold()):
+            continue
+        if query.material is not None and not query.material.search((material or '').casefold()):
+            continue
+        if query.visible is not None and bool(visible) != query.visible:
+            continue
+        if query.minVolume is not None and volume < query.minVolume:
+            continue
+        if query.maxVolume is not None and volume > query.maxVolume:
+            continue
+        matches.append(body)
+    return matches
+
+
+def run(quick=False):
+    harness.startAddIn()
+    try:
+        design = createDesign(10 if quick else 1)
+        root = design.rootComponent
+        bodies = list(entry.iterDesignBodies(root))
+
+        # Listing the bodies reads their revisions, a sync does that too
+        results = {
+            'bodies': len(bodies),
+            'coldSyncSeconds': measure(lambda: body_index.BodyIndex().sync(entry.iterDesignBodies(root)), repeat=3)['median'],
+        }
+        index = body_index.BodyIndex()
+        index.sync(entry.iterDesignBodies(root))
+
+        # A few bodies change between two queries of a dialog session
+        def modifyBodies():
+            for _, _, body, _, _ in bodies[:10]:
+                body.modify()
+
+        readCount = index.readCount
+        results['warmSyncSeconds'] = measure(lambda _: index.sync(entry.iterDesignBodies(root)), setup=modifyBodies)['median']
+        results['warmSyncReads'] = (index.readCount - readCount) // 5
+
+        results['queries'] = {}
+        for text in QUERIES:
+            query = body_index.parseQuery(text)
+            indexed = index.query(query)
+            assert indexed == scanQuery(design, query)
+            results['queries'][text] = {
+                'matches': len(indexed),
+                'indexSeconds': measure(lambda: index.query(query))['median'],
+                'scanSeconds': measure(lambda: scanQuery(design, query), repeat=3)['median'],
+                'scanReads': len(bodies),
+            }
+    finally:
+        harness.stopAddIn()
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,113 @@
+"""Size and time of gzip and zip output at compression levels 1 to 9.
+
+The meshes are spheres, whose coordinates vary like those of curved bodies
+from Fusion, unlike the flat grids of the writer benchmarks that compress
+far better than real files. Every format is compressed on its own with
+gzipFile. The zip archive holds a batch of spheres of different sizes,
+written with BatchArchive as an export with zip encoding does.
+"""
+import math
+import os
+import shutil
+import tempfile
+
+from benchutil import harness, measure
+
+compression = harness.importModule('commands.exportAsSTL.compression')
+stl_writer = harness.importModule('commands.exportAsSTL.stl_writer')
+indexed_writers = harness.importModule('commands.exportAsSTL.indexed_writers')
+
+LEVELS = [1, 3, 6, 9]
+
+WRITERS = {
+    'stl': stl_writer.writeBinaryStl,
+    'ply': indexed_writers.writeBinaryPly,
+    'obj': indexed_writers.writeObj,
+}
+
+
+def sphereMesh(triangleCount, radius=2.5):
+    """A UV sphere of about triangleCount triangles."""
+    rings = max(2, int((triangleCount / 4) ** 0.5))
+    segments = 2 * rings
+    coordinates = []
+    for ring in range(rings + 1):
+        theta = math.pi * ring / rings
+        for segment in range(segments):
+            phi = 2 * math.pi * segment / segments
+            coordinates.extend((
+                radius * math.sin(theta) * math.cos(phi),
+                radius * math.sin(theta) * math.sin(phi),
+                radius * math.cos(theta),
+            ))
+    indices = []
+    for ring in range(rings):
+        for segment in range(segments):
+            a = ring * segments + segment
+            b = ring * segments + (segment + 1) % segments
+            indices.extend((a, a + segments, b, b, a + segments, b + segments))
+    return coordinates, indices
+
+
+def compressLevels(compress, sourceBytes):
+    results = {}
+    for level in LEVELS:
+        timing = measure(lambda: compress(level), repeat=3)
+        size = compress(level)
+        results[str(level)] = {
+            'seconds': timing['median'],
+            'ratio': size / sourceBytes,
+            'MBPerSecond': sourceBytes / 1e6 / timing['median'],
+        }
+    return results
+
+
+def run(quick=False):
+    folder = tempfile.mkdtemp(prefix='bench-compression-')
+    results = {'gzip': {}}
+    try:
+        triangleCount = 100000 if quick else 1000000
+        coordinates, indices = sphereMesh(triangleCount)
+        for fileFormat, writer in WRITERS.items():
+            sourcePath = os.path.join(folder, f'body.{fileFormat}')
+            targetPath = sourcePath + '.gz'
+            writer(sourcePath, coordinates, indices)
+            sourceBytes = os.path.getsize(sourcePath)
+            results['gzip'][fileFormat] = {
+                'triangles': len(indices) // 3,
+                'MB': sourceBytes / 1e6,
+                'levels': compressLevels(lambda level: compression.gzipFile(sourcePath, targetPath, level), sourceBytes),
+            }
+            os.remove(sourcePath)
+            os.remove(targetPath)
+
+        # A batch of STL files from 5k to 200k triangles
+        batch = []
+        for i, count in enumerate([5000, 20000, 50000, 100000, 200000][:3 if quick else 5]):
+            filePath = os.path.join(folder, f'Part{i}.stl')
+            stl_writer.writeBinaryStl(filePath, *sphereMesh(count, radius=1.0 + i))
+            batch.append(filePath)
+        batchBytes = sum(os.path.getsize(filePath) for filePath in batch)
+        archivePath = os.path.join(folder, 'Design.zip')
+
+        def writeArchive(level):
+            archive = compression.BatchArchive(archivePath, level)
+            for filePath in batch:
+                archive.addFile(filePath, os.path.basename(filePath))
+            archive.close()
+            return os.path.getsize(archivePath)
+
+        results['zip'] = {
+            'files': len(batch),
+            'MB': batchBytes / 1e6,
+            'levels': compressLevels(writeArchive, batchBytes),
+        }
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,79 @@
+"""Time, memory and error of the decimate stage for 1M to 10M facet files.
+
+Each file is a bumpy grid, written a row at a time so even the largest one
+takes little memory to create, and decimated to a tenth of its facets. The
+stage runs in a process of its own so its peak resident memory can be
+measured, the memory taken by the interpreter and the add-in's modules
+before the stage runs is subtracted. The memory map of the file counts as
+it is read. The error is the largest distance any vertex moved, in mm.
+"""
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+
+from benchutil import harness, peakRssMB
+
+RATIO = 0.1
+
+_FACET = struct.Struct('<12x9f2x')
+
+
+def writeGridStl(filePath, facetCount):
+    """Writes a grid of about facetCount facets, two per square, in mm."""
+    side = max(1, int((facetCount / 2) ** 0.5))
+    height = [(x % 7) * 0.1 for x in range(side + 1)]
+    with open(filePath, 'wb') as f:
+        f.write(b' ' * 80 + struct.pack('<I', 2 * side * side))
+        for y in range(side):
+            row = bytearray(_FACET.size * 2 * side)
+            offset = 0
+            for x in range(side):
+                a = (x, y, height[x] * (y % 5))
+                b = (x + 1, y, height[x + 1] * (y % 5))
+                c = (x + 1, y + 1, height[x + 1] * ((y + 1) % 5))
+                d = (x, y + 1, height[x] * ((y + 1) % 5))
+                _FACET.pack_into(row, offset, *a, *b, *c)
+                _FACET.pack_into(row, offset + _FACET.size, *a, *c, *d)
+                offset += 2 * _FACET.size
+            f.write(row)
+
+
+def runStage(filePath):
+    decimate = harness.importModule('commands.exportAsSTL.decimate')
+    baseline = peakRssMB()
+    info = {}
+    decimate.makeDecimateStage(RATIO)(filePath, info)
+    result = info['decimation']
+    result['peakMB'] = peakRssMB() - baseline
+    result['bytesPerFacet'] = result['peakMB'] * 1024 * 1024 / result['before']
+    result['microsecondsPerFacet'] = result['seconds'] / result['before'] * 1e6
+    return result
+
+
+def run(quick=False):
+    folder = tempfile.mkdtemp(prefix='bench-decimate-')
+    results = {}
+    try:
+        for facetCount in ([100000, 1000000] if quick else [1000000, 5000000, 10000000]):
+            filePath = os.path.join(folder, 'body.stl')
+            writeGridStl(filePath, facetCount)
+
+            output = subprocess.run(
+                [sys.executable, __file__, '--stage', filePath],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[str(facetCount)] = json.loads(output)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {'ratio': RATIO, 'facets': results}
+
+
+if __name__ == '__main__':
+    if '--stage' in sys.argv:
+        print(json.dumps(runStage(sys.argv[sys.argv.index('--stage') + 1])))
+    else:
+        print(json.dumps(run('--quick' in sys.argv), indent=2))
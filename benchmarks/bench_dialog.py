@@ -0,0 +1,69 @@
+"""Time spent in the export dialog's event handlers as the selection grows.
+
+For each size a design with that many bodies is created, then the dialog is
+opened, every body selected, a naming option changed and the export started.
+Each body meshes to 12 triangles so the export shows the per-body overhead of
+the add-in rather than the cost of writing large files.
+"""
+import shutil
+import tempfile
+import time
+
+from benchutil import harness
+
+
+def run(quick=False):
+    results = {}
+    for bodyCount in ([10, 100, 1000] if quick else [10, 100, 1000, 10000]):
+        results[str(bodyCount)] = runDialog(bodyCount)
+    return results
+
+
+def runDialog(bodyCount):
+    folder = tempfile.mkdtemp(prefix='bench-dialog-')
+    harness.startAddIn()
+    try:
+        design = harness.createDesign(bodyCount)
+        for body in design.rootComponent.bRepBodies:
+            body.meshDetail = 0.01
+        bodies = list(design.rootComponent.bRepBodies)
+
+        timings = {}
+        start = time.perf_counter()
+        command = harness.openExportDialog(folder)
+        timings['open'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        harness.selectBodies(command, bodies)
+        timings['selectAll'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        harness.setInput(command, 'prefixInput', 'v2_')
+        timings['changePrefix'] = time.perf_counter() - start
+
+        # Removing one body keeps the rows of all others
+        selectionInput = command.commandInputs.itemById('selectedBodies')
+        start = time.perf_counter()
+        selectionInput.removeSelection(0)
+        command.changeInput(selectionInput)
+        timings['deselectOne'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        command.clickOK()
+        timings['startExport'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunks = harness.runPendingEvents()
+        timings['export'] = time.perf_counter() - start
+        timings['exportPerBody'] = timings['export'] / (bodyCount - 1)
+        timings['exportChunks'] = chunks
+        return timings
+    finally:
+        harness.stopAddIn()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,82 @@
+"""Filename generation for 100k body names in each of the five formatting styles.
+
+Compares the cached FilenameGenerator, first with an empty cache and then
+with the words of every name cached as after the first keystroke, against
+the earlier generateFilename that ran re.sub on every call.
+"""
+import os
+import random
+import re
+
+from benchutil import harness, measure
+
+filename_generator = harness.importModule('commands.exportAsSTL.filename_generator')
+
+STYLES = {
+    'PascalCase': filename_generator.STYLE_PASCAL,
+    'camelCase': filename_generator.STYLE_CAMEL,
+    'snake_case': filename_generator.STYLE_SNAKE,
+    'kebab-case': filename_generator.STYLE_KEBAB,
+    'space separated': filename_generator.STYLE_SPACE,
+}
+
+
+def uncachedFilename(bodyName, versionNumber, prefix, suffix, formattingStyleIndex):
+    # generateFilename as it was before the generator, without the rstrip fix
+    name = re.sub(r'[<>:"/\\|?*\x00-\x1F]', '', bodyName)
+    versionStr = str(versionNumber).strip()
+    nameSplit, ext = os.path.splitext(name)
+    nameSplit = re.sub(r"[-_ ]+", " ", nameSplit)
+    nameSplit = re.sub(r"([a-z])([A-Z])", r"\1 \2", nameSplit)
+    words = nameSplit.lower().split()
+
+    if formattingStyleIndex == 1:
+        name = ''.join(w.capitalize() for w in words) + ext
+        versionStr = f"V{versionStr}" if versionStr else ""
+    elif formattingStyleIndex == 2:
+        name = words[0] + ''.join(w.capitalize() for w in words[1:]) + ext
+        versionStr = f"V{versionStr}" if versionStr else ""
+    elif formattingStyleIndex == 3:
+        name = '_'.join(words) + ext
+        versionStr = f"_v{versionStr}" if versionStr else ""
+    elif formattingStyleIndex == 4:
+        name = '-'.join(words) + ext
+        versionStr = f"-v{versionStr}" if versionStr else ""
+    elif formattingStyleIndex == 5:
+        name = ' '.join(words) + ext
+        versionStr = f" v{versionStr}" if versionStr else ""
+    return f'{prefix}{name}{versionStr}{suffix}.stl'
+
+
+def bodyNames(count):
+    words = ['Bolt', 'housing', 'LidTop', 'gear', 'M3', 'spacer', 'FrontPanel', 'rib', 'clip', 'Base']
+    separators = [' ', '_', '-', '']
+    generator = random.Random(1)
+    return [
+        separators[i % 4].join(generator.sample(words, 1 + i % 3)) + f'{i}'
+        for i in range(count)
+    ]
+
+
+def run(quick=False):
+    names = bodyNames(10000 if quick else 100000)
+    results = {'names': len(names), 'styles': {}}
+    for styleName, style in STYLES.items():
+        def cold():
+            filename_generator.FilenameGenerator().generateAll(names, '2', 'pre_', '_suf', style)
+
+        warmGenerator = filename_generator.FilenameGenerator()
+        warmGenerator.generateAll(names, '', '', '', style)
+
+        results['styles'][styleName] = {
+            'uncachedSeconds': measure(lambda: [uncachedFilename(n, '2', 'pre_', '_suf', style) for n in names], repeat=3)['median'],
+            'coldSeconds': measure(cold, repeat=3)['median'],
+            'cachedSeconds': measure(lambda: warmGenerator.generateAll(names, '2', 'pre_', '_suf', style), repeat=3)['median'],
+        }
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
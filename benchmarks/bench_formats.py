@@ -0,0 +1,73 @@
+"""File size, write time and memory of the PLY and OBJ writers against binary STL.
+
+The meshes are the grids of the STL writer benchmark, in the form the mesh
+calculator returns them. Every write runs in a process of its own, after
+the mesh is created, so the peak resident memory it adds can be measured.
+The indexed writers weld the nodes of the mesh first, that is part of
+their time and memory.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchutil import harness, peakRssMB
+
+FORMATS = ['stl', 'ply', 'obj']
+
+
+def writeFile(fileFormat, triangleCount, filePath):
+    from bench_stl_writer import gridMesh
+
+    stl_writer = harness.importModule('commands.exportAsSTL.stl_writer')
+    indexed_writers = harness.importModule('commands.exportAsSTL.indexed_writers')
+    writer = {
+        'stl': stl_writer.writeBinaryStl,
+        'ply': indexed_writers.writeBinaryPly,
+        'obj': indexed_writers.writeObj,
+    }[fileFormat]
+
+    coordinates, indices = gridMesh(triangleCount)
+    baseline = peakRssMB()
+    start = time.perf_counter()
+    writer(filePath, coordinates, indices)
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'MB': os.path.getsize(filePath) / 1e6,
+        'peakMB': peakRssMB() - baseline,
+    }
+
+
+def run(quick=False):
+    folder = tempfile.mkdtemp(prefix='bench-formats-')
+    results = {}
+    try:
+        for triangleCount in ([10000, 100000] if quick else [10000, 100000, 1000000]):
+            result = {}
+            for fileFormat in FORMATS:
+                filePath = os.path.join(folder, f'body.{fileFormat}')
+                output = subprocess.run(
+                    [sys.executable, __file__, '--write', fileFormat, str(triangleCount), filePath],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result[fileFormat] = json.loads(output)
+                os.remove(filePath)
+            for fileFormat in FORMATS[1:]:
+                result[fileFormat]['sizeVsStl'] = result[fileFormat]['MB'] / result['stl']['MB']
+                result[fileFormat]['timeVsStl'] = result[fileFormat]['seconds'] / result['stl']['seconds']
+            results[str(triangleCount)] = result
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    if '--write' in sys.argv:
+        fileFormat, triangleCount, filePath = sys.argv[sys.argv.index('--write') + 1:]
+        print(json.dumps(writeFile(fileFormat, int(triangleCount), filePath)))
+    else:
+        print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,77 @@
+"""Cost of atomic writes and the export journal per file, and of resuming.
+
+Every exported file is written under a temporary name and renamed, and
+then recorded in the journal: a line with its size is fsynced, and its
+SHA-256 is computed on a background thread, unless the checksum stage did
+already. This measures, for files of 100 KB to 10 MB:
+
+- a plain write of the file, as the baseline;
+- the write under the temporary name with the rename;
+- journal.record, the main thread's part of it, and with the wait for the
+  checksum it leaves to a background thread;
+- journal.record with the digest of the checksum stage;
+- journal.isComplete, which a resumed export calls for every file.
+
+It also measures loading a journal of 1,000 files when an export starts.
+The numbers depend on the disk, fsync in particular.
+"""
+import os
+import shutil
+import tempfile
+
+from benchutil import harness, measure
+
+entry = harness.importModule('commands.exportAsSTL.entry')
+export_journal = harness.importModule('commands.exportAsSTL.export_journal')
+post_process = harness.importModule('commands.exportAsSTL.post_process')
+
+
+def writeFile(filePath, data):
+    with open(filePath, 'wb') as f:
+        f.write(data)
+
+
+def writeAtomically(filePath, data):
+    tempPath = entry.getTempFilePath(filePath)
+    writeFile(tempPath, data)
+    os.replace(tempPath, filePath)
+
+
+def run(quick=False):
+    folder = tempfile.mkdtemp(prefix='bench-journal-')
+    results = {'files': {}}
+    try:
+        journal = export_journal.ExportJournal(folder)
+        for size in ([100000, 1000000] if quick else [100000, 1000000, 10000000]):
+            data = os.urandom(size)
+            filePath = os.path.join(folder, 'Part.stl')
+            writeFile(filePath, data)
+            sha256 = post_process.fileSha256(filePath)
+            results['files'][str(size)] = {
+                'writeSeconds': measure(lambda: writeFile(filePath, data))['median'],
+                'atomicWriteSeconds': measure(lambda: writeAtomically(filePath, data))['median'],
+                'recordSeconds': measure(lambda _: journal.record('Part.stl', 'key'), setup=journal.close)['median'],
+                'recordAndChecksumSeconds': measure(lambda: (journal.record('Part.stl', 'key'), journal.close()))['median'],
+                'recordWithDigestSeconds': measure(lambda: journal.record('Part.stl', 'key', sha256=sha256))['median'],
+                'isCompleteSeconds': measure(lambda: journal.isComplete('Part.stl', 'key'))['median'],
+            }
+        journal.close()
+
+        # A journal from an earlier run of 1,000 small files
+        journal = export_journal.ExportJournal(folder)
+        fileCount = 100 if quick else 1000
+        for i in range(fileCount):
+            writeFile(os.path.join(folder, f'Part{i}.stl'), b'solid')
+            journal.record(f'Part{i}.stl', f'key{i}')
+        journal.close()
+        results['loadSeconds'] = measure(lambda: export_journal.ExportJournal(folder))['median']
+        results['loadFiles'] = fileCount
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,122 @@
+"""Cost of futil.log on the main thread, before and after the logging backend.
+
+Every keystroke in the dialog fires the inputChanged, validateInputs and
+executePreview events, each of which logs a message. This measures those
+three calls per keystroke with:
+
+- the earlier log, which printed every message and wrote it to the console
+  with app.log when config.DEBUG was True, as it ships;
+- the current log as shipped, DEBUG True and LOG_LEVEL 'DEBUG', where the
+  event messages go to the background thread and the log file only;
+- the current log with DEBUG False and LOG_LEVEL 'INFO', where they are
+  filtered out before they are formatted.
+
+Stand-ins for the console: print and app.log write to a line buffered
+file, so every message is a write call like a synchronous console write.
+Fusion's Text Command window is slower than that, so the earlier log's cost
+is a lower bound. The log file of the shipped case is in a temporary folder.
+"""
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchutil import harness
+
+import adsk.core
+
+futil = harness.importModule('lib.fusionAddInUtils')
+general_utils = harness.importModule('lib.fusionAddInUtils.general_utils')
+
+EVENT_MESSAGES = [
+    "Export as STL Input Changed Event fired from a change to prefixInput",
+    "Export as STL Validate Input Event",
+    "Export as STL Command Preview Event",
+]
+
+
+def earlierLog(message, level=adsk.core.LogLevels.InfoLogLevel, force_console=False):
+    # futil.log as it was before the logging backend, with DEBUG True
+    print(message)
+    if level == adsk.core.LogLevels.ErrorLogLevel:
+        general_utils.app.log(message, level, adsk.core.LogTypes.FileLogType)
+    general_utils.app.log(message, level, adsk.core.LogTypes.ConsoleLogType)
+
+
+@contextlib.contextmanager
+def console(folder):
+    with open(os.path.join(folder, 'console.txt'), 'w', buffering=1, encoding='utf-8') as f:
+        app = general_utils.app
+
+        def consoleLog(message, level=None, logType=None):
+            f.write(message + '\n')
+
+        stdout = sys.stdout
+        sys.stdout = f
+        app.log = consoleLog
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+            del app.log
+
+
+@contextlib.contextmanager
+def logSettings(debug, logLevel, logFile):
+    # Restarts the logging of general_utils with other settings, and restores it after
+    saved = {name: getattr(general_utils, name) for name in ('DEBUG', 'LOG_LEVEL', 'LOG_FILE')}
+    running = general_utils._listener is not None
+    general_utils.stop_logging()
+    general_utils.DEBUG = debug
+    general_utils.LOG_LEVEL = logLevel
+    general_utils.LOG_FILE = logFile
+    general_utils.start_logging()
+    try:
+        yield
+    finally:
+        general_utils.stop_logging()
+        for name, value in saved.items():
+            setattr(general_utils, name, value)
+        if running:
+            general_utils.start_logging()
+
+
+def timeKeystrokes(log, level, keystrokes):
+    start = time.perf_counter()
+    for _ in range(keystrokes):
+        for message in EVENT_MESSAGES:
+            log(message, level)
+    return (time.perf_counter() - start) / keystrokes
+
+
+def run(quick=False):
+    keystrokes = 2000 if quick else 20000
+    folder = tempfile.mkdtemp(prefix='bench-logging-')
+    results = {}
+    try:
+        with console(folder):
+            results['earlier'] = timeKeystrokes(earlierLog, adsk.core.LogLevels.InfoLogLevel, keystrokes)
+
+            with logSettings(True, 'DEBUG', os.path.join(folder, 'logs', 'addin.log')):
+                results['shippedDebug'] = timeKeystrokes(futil.log, futil.DEBUG_LOG_LEVEL, keystrokes)
+                start = time.perf_counter()
+            results['shippedDebugFlush'] = time.perf_counter() - start
+
+            with logSettings(False, 'INFO', ''):
+                results['infoLevel'] = timeKeystrokes(futil.log, futil.DEBUG_LOG_LEVEL, keystrokes)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return {
+        'keystrokes': keystrokes,
+        'messagesPerKeystroke': len(EVENT_MESSAGES),
+        'microsecondsPerKeystroke': {name: seconds * 1e6 for name, seconds in results.items() if name != 'shippedDebugFlush'},
+        'backgroundFlushSeconds': results['shippedDebugFlush'],
+    }
+
+
+if __name__ == '__main__':
+    import json
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
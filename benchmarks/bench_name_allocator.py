@@ -0,0 +1,112 @@
+"""Collision-free filename allocation in a folder of 50k files.
+
+The folder holds part.stl to part(250).stl and other files. A batch of 200
+bodies is exported into it, half of them named part.stl. The earlier loop
+probed os.path.exists for every counter until it found a free name, the
+NameAllocator lists the folder once. File system calls are counted by
+wrapping os.stat and os.scandir, and each allocated file is created so the
+next allocation sees it, like in an export.
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from benchutil import harness
+
+name_allocator = harness.importModule('commands.exportAsSTL.name_allocator')
+
+
+class SyscallCounter:
+    def __init__(self):
+        self.count = 0
+        self._stat = os.stat
+        self._scandir = os.scandir
+
+    def __enter__(self):
+        def stat(*args, **kwargs):
+            self.count += 1
+            return self._stat(*args, **kwargs)
+
+        def scandir(*args, **kwargs):
+            self.count += 1
+            return self._scandir(*args, **kwargs)
+
+        os.stat = stat
+        os.scandir = scandir
+        return self
+
+    def __exit__(self, *exc_info):
+        os.stat = self._stat
+        os.scandir = self._scandir
+
+
+def probingResolve(exportFolder, fileName):
+    # resolveFilePath as it was before the allocator
+    filePath = os.path.join(exportFolder, fileName)
+    counter = 1
+    while os.path.exists(filePath):
+        name, ext = os.path.splitext(fileName)
+        name = re.sub(r'\(\d+\)', '', name)
+        fileName = f"{name}({counter}){ext}"
+        filePath = os.path.join(exportFolder, fileName)
+        counter += 1
+    return fileName, filePath
+
+
+def createFolder(fileCount):
+    folder = tempfile.mkdtemp(prefix='bench-names-')
+    names = ['part.stl'] + [f'part({n}).stl' for n in range(1, 251)]
+    names += [f'body{n}.stl' for n in range(fileCount - len(names))]
+    for name in names:
+        open(os.path.join(folder, name), 'wb').close()
+    return folder
+
+
+def batchNames(bodyCount):
+    return ['part.stl' if i % 2 else f'new{i}.stl' for i in range(bodyCount)]
+
+
+def runBatch(folder, resolve):
+    created = []
+    allocationSeconds = 0.0
+    with SyscallCounter() as counter:
+        for fileName in batchNames(200):
+            start = time.perf_counter()
+            fileName, filePath = resolve(fileName)
+            allocationSeconds += time.perf_counter() - start
+            calls = counter.count
+            open(filePath, 'wb').close()
+            counter.count = calls
+            created.append(filePath)
+    for filePath in created:
+        os.remove(filePath)
+    return {'seconds': allocationSeconds, 'syscalls': counter.count}
+
+
+def run(quick=False):
+    fileCount = 5000 if quick else 50000
+    folder = createFolder(fileCount)
+    try:
+        probing = runBatch(folder, lambda fileName: probingResolve(folder, fileName))
+
+        allocator = None
+
+        def allocate(fileName):
+            nonlocal allocator
+            if allocator is None:
+                allocator = name_allocator.NameAllocator(folder)
+            fileName = allocator.allocate(fileName)
+            return fileName, os.path.join(folder, fileName)
+
+        allocated = runBatch(folder, allocate)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {'files': fileCount, 'bodies': 200, 'probingLoop': probing, 'nameAllocator': allocated}
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,80 @@
+"""Wall-clock gain of the background post-process pipeline as its cost grows.
+
+A fake exporter stands in for Fusion's tessellation on the main thread: it
+waits 20 ms per body, like the native tessellator the GIL is released
+meanwhile, and writes a 1 MB file. Each file is then post-processed by a
+SHA-256 stage and a stage waiting for the given cost, like a copy to a
+network share. The batch is run once with the stages inline after every
+export and once on the pipeline.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from benchutil import harness
+
+post_process = harness.importModule('commands.exportAsSTL.post_process')
+
+EXPORT_SECONDS = 0.02
+FILE_SIZE = 1024 * 1024
+
+
+def fakeExport(filePath):
+    time.sleep(EXPORT_SECONDS)
+    with open(filePath, 'wb') as f:
+        f.write(os.urandom(FILE_SIZE))
+
+
+def makeStages(costSeconds):
+    def slowStage(filePath, info):
+        time.sleep(costSeconds)
+
+    return [post_process.checksumStage, slowStage]
+
+
+def runInline(folder, bodyCount, stages):
+    start = time.perf_counter()
+    for i in range(bodyCount):
+        filePath = os.path.join(folder, f'body{i}.stl')
+        fakeExport(filePath)
+        info = {}
+        for stage in stages:
+            stage(filePath, info)
+    return time.perf_counter() - start
+
+
+def runPipeline(folder, bodyCount, stages, workers):
+    start = time.perf_counter()
+    pipeline = post_process.PostProcessPipeline(stages, workers, max(8, workers))
+    for i in range(bodyCount):
+        filePath = os.path.join(folder, f'body{i}.stl')
+        fakeExport(filePath)
+        pipeline.submit(filePath)
+    pipeline.wait()
+    return time.perf_counter() - start
+
+
+def run(quick=False):
+    bodyCount = 20 if quick else 50
+    results = {}
+    folder = tempfile.mkdtemp(prefix='bench-post-')
+    try:
+        for costMs in ([0, 20, 80] if quick else [0, 5, 20, 40, 80, 160]):
+            stages = makeStages(costMs / 1000)
+            inline = runInline(folder, bodyCount, stages)
+            result = {'inlineSeconds': inline}
+            for workers in (2, 4):
+                seconds = runPipeline(folder, bodyCount, stages, workers)
+                result[f'pipeline{workers}Seconds'] = seconds
+                result[f'pipeline{workers}Speedup'] = inline / seconds
+            results[f'{costMs}ms'] = result
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {'bodies': bodyCount, 'exportMs': EXPORT_SECONDS * 1000, 'costs': results}
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,106 @@
+"""Triangles, file size and export time of adaptive refinement against fixed Medium.
+
+The design mixes 2 mm pins, 30 mm brackets and 400 mm housings. Every body
+is exported with exportAllBodies, once with Fusion's Medium refinement, once
+adaptive to body size and once adaptive within a triangle budget. The
+stand-in tessellator meshes every body as a box, with a detail chosen so a
+Medium body gets about as many triangles as the budget's estimate for a
+curved body of its size. The counts follow the refinement rather than the
+shape, and the estimated total is reported next to the actual one.
+"""
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+
+from benchutil import harness
+
+entry = harness.importModule('commands.exportAsSTL.entry')
+
+# Name, dimensions in cm and count of each kind of body
+BODY_KINDS = [
+    ('Pin', (0.2, 0.2, 0.8), 400),
+    ('Bracket', (3.0, 2.0, 0.5), 100),
+    ('Housing', (40.0, 30.0, 10.0), 20),
+]
+
+# Mesh detail of the stand-in bodies that matches the estimate at Medium
+MESH_DETAIL = 1.4
+
+
+def createMixedDesign(scale):
+    design = harness.createDesign(0)
+    root = design.rootComponent
+    for kind, dimensions, count in BODY_KINDS:
+        for i in range(max(1, count // scale)):
+            body = root.addBody(f'{kind}{i + 1}', dimensions, origin=(i * 50.0, 0.0, 0.0))
+            body.meshDetail = MESH_DETAIL
+    return design
+
+
+def facetCount(filePath):
+    with open(filePath, 'rb') as f:
+        f.seek(80)
+        return struct.unpack('<I', f.read(4))[0]
+
+
+def estimateTriangles(design, adaptive, triangleBudget=0):
+    bodies = list(design.rootComponent.bRepBodies)
+    plan = entry.planBodyRefinement(bodies, adaptive, triangleBudget)
+    return sum(entry.estimateBodyTriangles(body, refinement) for body, refinement in zip(bodies, plan))
+
+
+def runExport(design, adaptive=False, triangleBudget=0):
+    folder = tempfile.mkdtemp(prefix='bench-refinement-')
+    try:
+        start = time.perf_counter()
+        entry.exportAllBodies(folder, skipUnchanged=False, adaptiveRefinement=adaptive, triangleBudget=triangleBudget)
+        seconds = time.perf_counter() - start
+
+        triangles = {kind: 0 for kind, _, _ in BODY_KINDS}
+        totalBytes = 0
+        for name in os.listdir(folder):
+            if name.endswith('.stl'):
+                filePath = os.path.join(folder, name)
+                kind = re.match(r'[A-Za-z]+', name).group()
+                triangles[kind] += facetCount(filePath)
+                totalBytes += os.path.getsize(filePath)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {
+        'seconds': seconds,
+        'triangles': sum(triangles.values()),
+        'estimatedTriangles': estimateTriangles(design, adaptive, triangleBudget),
+        'trianglesByKind': triangles,
+        'MB': totalBytes / 1e6,
+    }
+
+
+def run(quick=False):
+    harness.startAddIn()
+    try:
+        design = createMixedDesign(10 if quick else 1)
+        medium = runExport(design)
+        results = {
+            'bodies': design.rootComponent.bRepBodies.count,
+            'medium': medium,
+            'adaptive': runExport(design, adaptive=True),
+        }
+        for budget in (medium['triangles'] // 2, medium['triangles'] // 10):
+            results[f'adaptiveBudget{budget}'] = runExport(design, adaptive=True, triangleBudget=budget)
+    finally:
+        harness.stopAddIn()
+
+    for result in results.values():
+        if isinstance(result, dict):
+            result['trianglesVsMedium'] = result['triangles'] / medium['triangles']
+            result['timeVsMedium'] = result['seconds'] / medium['seconds']
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,58 @@
+"""Facets per second of the native binary STL writer for bodies of 10k to 5M triangles.
+
+The meshes are flat grids in the form the mesh calculator returns them, flat
+lists of node coordinates and triangle node indices.
+"""
+import os
+import shutil
+import tempfile
+
+from benchutil import harness, measure
+
+stl_writer = harness.importModule('commands.exportAsSTL.stl_writer')
+
+
+def gridMesh(triangleCount):
+    """A grid of about triangleCount triangles, two per square."""
+    side = max(1, int((triangleCount / 2) ** 0.5))
+    coordinates = []
+    for y in range(side + 1):
+        for x in range(side + 1):
+            coordinates.extend((x * 0.1, y * 0.1, (x * y % 7) * 0.01))
+    indices = []
+    for y in range(side):
+        for x in range(side):
+            a = y * (side + 1) + x
+            b, c, d = a + 1, a + side + 2, a + side + 1
+            indices.extend((a, b, c, a, c, d))
+    return coordinates, indices
+
+
+def run(quick=False):
+    folder = tempfile.mkdtemp(prefix='bench-stl-')
+    results = {}
+    try:
+        for triangleCount in ([10000, 100000] if quick else [10000, 100000, 1000000, 5000000]):
+            coordinates, indices = gridMesh(triangleCount)
+            facets = len(indices) // 3
+            filePath = os.path.join(folder, 'body.stl')
+            timing = measure(
+                lambda: stl_writer.writeBinaryStl(filePath, coordinates, indices),
+                repeat=5 if triangleCount <= 100000 else 2,
+            )
+            results[str(triangleCount)] = {
+                'facets': facets,
+                'seconds': timing['best'],
+                'facetsPerSecond': facets / timing['best'],
+                'MBPerSecond': os.path.getsize(filePath) / 1e6 / timing['best'],
+            }
+            del coordinates, indices
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,125 @@
+"""Time to upload a batch of files with 1 to 8 connections, with and without keep-alive.
+
+The server is a local http.server that reads the chunked request bodies and
+answers after a delay standing in for the round trip and the work of a
+remote endpoint. Uploads are started from a thread per connection, as the
+post-processing workers do. Without keep-alive the server closes the
+connection after every response, so every upload opens a new one. Opening
+a local connection costs far less than a TLS handshake with a remote
+server, so the keep-alive numbers understate its benefit.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchutil import harness
+
+upload = harness.importModule('commands.exportAsSTL.upload')
+
+CONNECTIONS = [1, 2, 4, 8]
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        received = 0
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            received += len(self.rfile.read(size + 2)) - 2
+            if not size:
+                break
+        self.server.stats.record(received, self.client_address)
+
+        time.sleep(self.server.delaySeconds)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        if not self.server.keepAlive:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ServerStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.connections = set()
+
+    def record(self, received, clientAddress):
+        with self.lock:
+            self.requests += 1
+            self.bytes += received
+            self.connections.add(clientAddress)
+
+
+def startServer(delaySeconds, keepAlive):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UploadHandler)
+    server.daemon_threads = True
+    server.delaySeconds = delaySeconds
+    server.keepAlive = keepAlive
+    server.stats = ServerStats()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def uploadBatch(server, filePaths, connections):
+    uploader = upload.HttpUploader(f'http://127.0.0.1:{server.server_port}/files/', maxConnections=connections)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(connections) as executor:
+        statuses = list(executor.map(uploader.upload, filePaths))
+    seconds = time.perf_counter() - start
+    uploader.close()
+    assert statuses == [201] * len(filePaths)
+    return seconds
+
+
+def run(quick=False):
+    fileCount = 16 if quick else 64
+    fileSize = 256 * 1024 if quick else 1024 * 1024
+    folder = tempfile.mkdtemp(prefix='bench-upload-')
+    filePaths = []
+    for i in range(fileCount):
+        filePath = os.path.join(folder, f'Part{i}.stl')
+        with open(filePath, 'wb') as f:
+            f.write(os.urandom(fileSize))
+        filePaths.append(filePath)
+
+    results = {'files': fileCount, 'MB': fileCount * fileSize / 1e6}
+    try:
+        for delaySeconds in (0.0, 0.05):
+            for keepAlive in (True, False):
+                server = startServer(delaySeconds, keepAlive)
+                try:
+                    timings = {}
+                    for connections in CONNECTIONS:
+                        server.stats = ServerStats()
+                        seconds = uploadBatch(server, filePaths, connections)
+                        assert server.stats.requests == fileCount
+                        assert server.stats.bytes == fileCount * fileSize
+                        timings[str(connections)] = {
+                            'seconds': seconds,
+                            'MBPerSecond': results['MB'] / seconds,
+                            'serverConnections': len(server.stats.connections),
+                        }
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                name = f"delay{int(delaySeconds * 1000)}ms{'KeepAlive' if keepAlive else 'Close'}"
+                results[name] = timings
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,70 @@
+"""Filename validation of 1k and 10k table rows, against the earlier full rescan.
+
+The earlier command_validate_input searched every row with an uncompiled
+pattern and found duplicates with list.count, which is quadratic. The
+FilenameValidator only re-checks the rows that changed.
+"""
+import re
+
+from benchutil import harness, measure
+
+filename_validator = harness.importModule('commands.exportAsSTL.filename_validator')
+
+# A frame at 60 Hz.
+FRAME_SECONDS = 1 / 60
+
+
+def rescanProblems(filenames):
+    # The validation of every row on every event, as it was before the validator
+    problems = []
+    for filename in filenames:
+        if re.search(r'[<>:"/\\|?*\x00-\x1F]', filename):
+            problems.append(f"Filename '{filename}' contains invalid characters.")
+    duplicates = set(name for name in filenames if filenames.count(name) > 1)
+    if duplicates:
+        problems.append(f"Duplicate filenames found: {', '.join(sorted(duplicates))}")
+    return problems
+
+
+def run(quick=False):
+    results = {}
+    for rowCount in [1000, 10000]:
+        filenames = [f'Part{i}.stl' for i in range(rowCount)]
+        validator = filename_validator.FilenameValidator()
+
+        def load():
+            validator.clear()
+            for i, filename in enumerate(filenames):
+                validator.update(i, filename)
+
+        load()
+        edits = iter(range(10 ** 9))
+
+        def editOne():
+            # Typing into one row, then the validate event
+            validator.update(rowCount // 2, f'Edited{next(edits)}.stl')
+            return validator.problems()
+
+        def prefixAll():
+            # Typing a prefix renames every row
+            prefix = f'v{next(edits)}_'
+            for i, filename in enumerate(filenames):
+                validator.update(i, prefix + filename)
+            return validator.problems()
+
+        result = {
+            'loadSeconds': measure(load)['median'],
+            'editOneSeconds': measure(editOne, repeat=50)['median'],
+            'prefixAllSeconds': measure(prefixAll)['median'],
+        }
+        result['editOneFrames'] = result['editOneSeconds'] / FRAME_SECONDS
+        if not (quick and rowCount > 1000):
+            result['rescanSeconds'] = measure(lambda: rescanProblems(filenames), repeat=1 if rowCount > 1000 else 3)['median']
+        results[str(rowCount)] = result
+    return results
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,65 @@
+"""Throughput and memory of the verify stage for 100k to 5M facet files.
+
+The files are the bumpy grids of the decimate benchmark. Every file is
+verified with the edge check and without it, each time in a process of its
+own so the peak resident memory the stage adds can be measured. The
+memory map of the file counts as it is read.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchutil import harness, peakRssMB
+
+
+def runStage(filePath, checkEdges):
+    stl_verify = harness.importModule('commands.exportAsSTL.stl_verify')
+    baseline = peakRssMB()
+    info = {}
+    # A limit of one facet skips the edge check of every file
+    stl_verify.makeVerifyStage(0 if checkEdges else 1)(filePath, info)
+    report = info['verification']
+    assert not report['errors']
+    peakMB = peakRssMB() - baseline
+    return {
+        'seconds': report['seconds'],
+        'facetsPerSecond': report['facets'] / report['seconds'],
+        'peakMB': peakMB,
+        'bytesPerFacet': peakMB * 1024 * 1024 / report['facets'],
+        'boundaryEdges': report['boundaryEdges'],
+    }
+
+
+def run(quick=False):
+    from bench_decimate import writeGridStl
+
+    folder = tempfile.mkdtemp(prefix='bench-verify-')
+    results = {}
+    try:
+        for facetCount in ([100000, 1000000] if quick else [100000, 1000000, 2000000, 5000000]):
+            filePath = os.path.join(folder, 'body.stl')
+            writeGridStl(filePath, facetCount)
+
+            result = {}
+            for mode in ('edges', 'noEdges'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--stage', filePath, mode],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result[mode] = json.loads(output)
+            result['edgeCheckTimeRatio'] = result['edges']['seconds'] / result['noEdges']['seconds']
+            results[str(facetCount)] = result
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    if '--stage' in sys.argv:
+        filePath, mode = sys.argv[sys.argv.index('--stage') + 1:]
+        print(json.dumps(runStage(filePath, mode == 'edges')))
+    else:
+        print(json.dumps(run('--quick' in sys.argv), indent=2))
@@ -0,0 +1,55 @@
+"""Helpers shared by the benchmarks."""
+import gc
+import os
+import resource
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+TESTS_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'tests')
+
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+import harness  # noqa: E402
+
+
+def measure(function, repeat=5, setup=None):
+    """Runs function repeat times and returns its timings in seconds.
+
+    Arguments:
+    function -- Called without arguments, or with the result of setup.
+    repeat -- Number of timed runs.
+    setup -- Called before every run, outside of the timing.
+
+    :returns:
+        A dict with the best, median and worst time.
+    """
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        if setup:
+            function(argument)
+        else:
+            function()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': statistics.median(times), 'worst': max(times)}
+
+
+def peakRssMB():
+    """Peak resident memory of this process so far, in MB."""
+    # Linux keeps ru_maxrss across exec, so a child would report its parent's peak
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
@@ -0,0 +1,70 @@
+"""Runs the benchmarks of the add-in and writes their results as JSON.
+
+Every bench_*.py module in this folder has a run(quick) function returning a
+dict of results. The add-in runs on the stand-in adsk package of the tests,
+so the numbers show the cost of the add-in's own code, not of Fusion.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--output FILE] [NAME ...]
+
+NAME selects benchmarks by module name without the bench_ prefix, e.g.
+dialog. --quick runs the smaller sizes only.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+
+def findBenchmarks():
+    return sorted(
+        fileName[len('bench_'):-len('.py')]
+        for fileName in os.listdir(BENCHMARKS_DIR)
+        if fileName.startswith('bench_') and fileName.endswith('.py')
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the benchmarks of the add-in.")
+    parser.add_argument('names', nargs='*', help="benchmarks to run, all by default")
+    parser.add_argument('--quick', action='store_true', help="run the smaller sizes only")
+    parser.add_argument(
+        '--output', default=os.path.join(BENCHMARKS_DIR, 'results.json'), help="JSON file for the results"
+    )
+    args = parser.parse_args(argv)
+
+    available = findBenchmarks()
+    unknown = [name for name in args.names if name not in available]
+    if unknown:
+        parser.error(f"unknown benchmarks {', '.join(unknown)}, available are {', '.join(available)}")
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'benchmarks': {},
+    }
+    for name in args.names or available:
+        print(f"Running {name}...", flush=True)
+        module = importlib.import_module(f'bench_{name}')
+        start = time.perf_counter()
+        result = module.run(quick=args.quick)
+        results['benchmarks'][name] = result
+        print(json.dumps(result, indent=2), flush=True)
+        print(f"{name} took {time.perf_counter() - start:.1f} s", flush=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,11 @@
 # If you want to add an additional command, duplicate one of the existing directories and import it here.
 # You need to use aliases (import "entry" as "my_module") assuming you have the default module named "entry".
 from .exportAsSTL import entry as exportAsSTL
+from .exportAllBodies import entry as exportAllBodies
 
 # TODO add your imported modules to this list.
 # Fusion will automatically call the start() and stop() functions.
-commands = [exportAsSTL]
+commands = [exportAsSTL, exportAllBodies]
 
 
 # Assumes you defined a "start" function in each of your modules.
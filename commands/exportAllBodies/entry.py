@@ -0,0 +1,115 @@
+import adsk.core
+import os
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ..exportAsSTL import entry as exportAsSTL
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f"{config.COMPANY_NAME}_{config.ADDIN_NAME}_exportAllBodies"
+CMD_NAME = "Export all bodies as STL"
+CMD_Description = "Exports every body in the design as STL without opening a dialog"
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# TODO *** Define the location where the command button will be created. ***
+# This is done by specifying the workspace, the tab, and the panel, and the
+# command it will be inserted beside. Not providing the command to position it
+# will insert it at the end.
+WORKSPACE_ID = "FusionSolidEnvironment"
+PANEL_ID = "SolidScriptsAddinsPanel"
+COMMAND_BESIDE_ID = exportAsSTL.CMD_ID
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "")
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+
+# Executed when add-in is run.
+def start():
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(
+        CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER
+    )
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******** Add a button into the UI so the user can run the command. ********
+    # Get the target workspace the button will be created in.
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+
+    # Get the panel the button will be created in.
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+
+    # Create the button command control in the UI after the specified existing command.
+    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
+
+    # Specify if the command is promoted to the main toolbar.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+    command_control = panel.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# No inputs are created, so the execute event follows immediately without a dialog.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    futil.log(f"{CMD_NAME} Command Created Event")
+
+    futil.add_handler(
+        args.command.execute, command_execute, local_handlers=local_handlers
+    )
+    futil.add_handler(
+        args.command.destroy, command_destroy, local_handlers=local_handlers
+    )
+
+
+# This event handler is called immediately after the created event as the command has no inputs.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log(f"{CMD_NAME} Command Execute Event")
+
+    exportFolder = os.path.expanduser(config.BATCH_EXPORT_FOLDER) or exportAsSTL.getLastUsedFolder()
+    if not os.path.isdir(exportFolder):
+        ui.messageBox(f"Export folder does not exist:\n{exportFolder}")
+        return
+
+    exportAsSTL.exportAllBodies(
+        exportFolder,
+        config.BATCH_EXPORT_INCLUDE,
+        config.BATCH_EXPORT_EXCLUDE,
+        interactive=True,
+        synchronous=False,
+    )
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log(f"{CMD_NAME} Command Destroy Event")
+
+    global local_handlers
+    local_handlers = []
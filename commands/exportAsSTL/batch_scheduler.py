@@ -0,0 +1,109 @@
+import time
+
+
+class BatchScheduler:
+    """Processes a list of work items in time-sliced chunks.
+
+    Each chunk runs items until the time slice is used up and then asks for
+    the next chunk through the fire callback, which lets the host event loop
+    (Fusion's custom events) handle UI events in between. The scheduler itself
+    does not know about Fusion so it can be driven by any event loop.
+
+    Arguments:
+    items -- The work items to process, in order.
+    process -- Called with each item. May return the number of bytes written.
+    fire -- Called when the next chunk should be scheduled.
+    isCancelled -- Polled before each item, returning True stops the batch.
+    onProgress -- Called with the scheduler after every chunk.
+    onComplete -- Called with the scheduler once, when the batch ends.
+    sliceSeconds -- Time budget of a chunk. At least one item runs per chunk.
+    clock -- Monotonic clock in seconds, replaceable for testing.
+    """
+
+    def __init__(
+            self,
+            items,
+            process,
+            fire,
+            *,
+            isCancelled=None,
+            onProgress=None,
+            onComplete=None,
+            sliceSeconds=0.1,
+            clock=time.perf_counter
+    ):
+        self.items = list(items)
+        self.process = process
+        self.fire = fire
+        self.isCancelled = isCancelled or (lambda: False)
+        self.onProgress = onProgress
+        self.onComplete = onComplete
+        self.sliceSeconds = sliceSeconds
+        self.clock = clock
+
+        self.index = 0
+        self.bytesWritten = 0
+        self.chunkCount = 0
+        self.maxChunkSeconds = 0.0
+        self.cancelled = False
+        self.finished = False
+        self.startTime = None
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.startTime if self.startTime is not None else 0.0
+
+    @property
+    def eta(self):
+        # Estimated seconds remaining, based on the average time per item so far.
+        if not self.index:
+            return None
+        return self.elapsed / self.index * (self.total - self.index)
+
+    def start(self):
+        self.startTime = self.clock()
+        if self.items:
+            self.fire()
+        else:
+            self._finish()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def runChunk(self):
+        if self.finished:
+            return
+
+        chunkStart = self.clock()
+        while self.index < self.total:
+            if self.cancelled or self.isCancelled():
+                self.cancelled = True
+                break
+
+            written = self.process(self.items[self.index])
+            self.index += 1
+            if written:
+                self.bytesWritten += written
+
+            if self.clock() - chunkStart >= self.sliceSeconds:
+                break
+
+        self.chunkCount += 1
+        self.maxChunkSeconds = max(self.maxChunkSeconds, self.clock() - chunkStart)
+
+        if self.onProgress:
+            self.onProgress(self)
+
+        if self.cancelled or self.index >= self.total:
+            self._finish()
+        else:
+            self.fire()
+
+    def _finish(self):
+        self.finished = True
+        if self.onComplete:
+            self.onComplete(self)
@@ -0,0 +1,198 @@
+import fnmatch
+import re
+import shlex
+
+QUERY_FIELDS = ('name', 'path', 'material', 'visible', 'volume')
+
+_TRUE_VALUES = ('yes', 'true', '1', 'visible', 'shown')
+_FALSE_VALUES = ('no', 'false', '0', 'hidden')
+
+
+class BodyIndex:
+    """Index of the bodies in a design for selecting them by rule.
+
+    Each property is kept in a column list, so a query is a few tight scans
+    over plain Python values instead of calls into the Fusion API. The index
+    is filled with sync. Renaming or hiding a body, or renaming one of its
+    occurrences, doesn't change its revision, so sync reads the name, path,
+    material and visibility of every body again. Only the volume, which
+    Fusion computes, is kept for bodies whose revision is unchanged.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._keys = []
+        self._bodies = []
+        self._revisions = []
+        self._names = []
+        self._paths = []
+        self._materials = []
+        self._visible = []
+        self._volumes = []
+        self.readCount = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def sync(self, entries):
+        """Brings the index up to date with the bodies in the design.
+
+        Arguments:
+        entries -- Iterable of (key, revisionId, body, readProperties, readVolume)
+                   tuples. readProperties is called with every body and returns
+                   a (name, path, material, visible) tuple, readVolume only
+                   with new and changed bodies.
+
+        :returns:
+            The number of bodies whose volume was read.
+        """
+        previous = {key: (self._revisions[row], row) for key, row in self._rows.items()}
+        oldVolumes = self._volumes
+
+        self._rows = {}
+        self._keys = []
+        self._bodies = []
+        self._revisions = []
+        columns = self._names, self._paths, self._materials, self._visible, self._volumes = [], [], [], [], []
+
+        readCount = 0
+        for key, revisionId, body, readProperties, readVolume in entries:
+            if key in self._rows:
+                continue
+
+            old = previous.get(key)
+            if old and old[0] == revisionId:
+                volume = oldVolumes[old[1]]
+            else:
+                volume = readVolume(body)
+                readCount += 1
+            name, path, material, visible = readProperties(body)
+            values = (name.casefold(), path.casefold(), (material or '').casefold(), bool(visible), volume)
+
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._bodies.append(body)
+            self._revisions.append(revisionId)
+            for column, value in zip(columns, values):
+                column.append(value)
+
+        self.readCount += readCount
+        return readCount
+
+    def query(self, query):
+        """Returns the bodies matching query, in design order.
+
+        Arguments:
+        query -- A BodyQuery or a query string, see parseQuery.
+        """
+        if isinstance(query, str):
+            query = parseQuery(query)
+
+        rows = range(len(self._keys))
+        for pattern, column in (
+                (query.name, self._names),
+                (query.path, self._paths),
+                (query.material, self._materials),
+        ):
+            if pattern is not None:
+                match = pattern.search
+                rows = [row for row in rows if match(column[row])]
+
+        if query.visible is not None:
+            visible = self._visible
+            rows = [row for row in rows if visible[row] == query.visible]
+
+        if query.minVolume is not None or query.maxVolume is not None:
+            low = query.minVolume if query.minVolume is not None else float('-inf')
+            high = query.maxVolume if query.maxVolume is not None else float('inf')
+            volumes = self._volumes
+            rows = [row for row in rows if low <= volumes[row] <= high]
+
+        return [self._bodies[row] for row in rows]
+
+
+class BodyQuery:
+    """Conditions of a body query, None where a property isn't restricted."""
+
+    def __init__(self):
+        self.name = None
+        self.path = None
+        self.material = None
+        self.visible = None
+        self.minVolume = None
+        self.maxVolume = None
+
+
+def parseQuery(text):
+    """Parses a query like 'Bolt* material:steel* volume:..2.5 visible:yes'.
+
+    Terms are separated by spaces, quote terms that contain spaces. A body
+    has to match every field, several name terms match any of the names. A
+    term without a field matches the name.
+    Names, paths and materials match case-insensitively, either a glob
+    pattern or a regular expression between slashes (e.g. name:/^M\\d+$/).
+    The path is the occurrence path of the body, e.g. Frame:1+Bracket:2, and
+    empty for bodies of the root component. visible takes yes or no, volume
+    a range in cm³ written as min..max where either end may be left out.
+
+    :returns:
+        A BodyQuery.
+
+    Raises ValueError for invalid queries.
+    """
+    query = BodyQuery()
+    names = []
+    for term in _splitTerms(text):
+        field, separator, value = term.partition(':')
+        if not separator or field.lower() not in QUERY_FIELDS:
+            field, value = 'name', term
+        field = field.lower()
+
+        if field == 'name':
+            names.append(value)
+        elif field in ('path', 'material'):
+            setattr(query, field, re.compile(_patternSource(value)))
+        elif field == 'visible':
+            if value.lower() in _TRUE_VALUES:
+                query.visible = True
+            elif value.lower() in _FALSE_VALUES:
+                query.visible = False
+            else:
+                raise ValueError(f'visible takes yes or no, not "{value}"')
+        else:
+            query.minVolume, query.maxVolume = _parseRange(value)
+
+    if names:
+        # Several name terms select bodies matching any of them
+        query.name = re.compile('|'.join(_patternSource(name) for name in names))
+    return query
+
+
+def _splitTerms(text):
+    # Quotes group terms, backslashes are kept for regular expressions
+    lexer = shlex.shlex(text, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ''
+    return list(lexer)
+
+
+def _patternSource(value):
+    # Values are stored case folded, so a folded glob matches without flags
+    if len(value) > 1 and value.startswith('/') and value.endswith('/'):
+        source = f'(?i:{value[1:-1]})'
+        try:
+            re.compile(source)
+        except re.error as e:
+            raise ValueError(f'Invalid regular expression {value}: {e}')
+        return source
+    return f'(?:^{fnmatch.translate(value.casefold())})'
+
+
+def _parseRange(value):
+    low, separator, high = value.partition('..')
+    try:
+        if separator:
+            return (float(low) if low else None), (float(high) if high else None)
+    except ValueError:
+        pass
+    raise ValueError(f'volume takes a range like 1..10, not "{value}"')
@@ -0,0 +1,65 @@
+import gzip
+import os
+import zipfile
+
+# Bytes read from the source file per write to the compressor.
+CHUNK_SIZE = 1024 * 1024
+
+
+def gzipFile(sourcePath, targetPath, compressLevel=6):
+    """Compresses sourcePath into the gzip file targetPath.
+
+    The file is streamed through the compressor in chunks of CHUNK_SIZE, so
+    it is never held in memory as a whole. The gzip header stores the name
+    of the uncompressed file but no timestamp, so the same content always
+    gives the same bytes.
+
+    :returns:
+        The size of the compressed file.
+    """
+    originalName = os.path.basename(targetPath)
+    if originalName.lower().endswith('.gz'):
+        originalName = originalName[:-3]
+
+    with open(sourcePath, 'rb') as source, open(targetPath, 'wb') as target:
+        with gzip.GzipFile(originalName, 'wb', compressLevel, target, mtime=0) as compressor:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                compressor.write(chunk)
+
+    return os.path.getsize(targetPath)
+
+
+class BatchArchive:
+    """A zip archive that collects the files of a whole export batch.
+
+    Every file is streamed into its own member in chunks and can be deleted
+    once added, so the export folder never holds the uncompressed batch.
+
+    Arguments:
+    filePath -- The archive to write.
+    compressLevel -- The deflate level of the members.
+    tempPath -- The archive is written here and renamed to filePath when it
+                is closed. None to write filePath directly.
+    """
+
+    def __init__(self, filePath, compressLevel=6, tempPath=None):
+        self.filePath = filePath
+        self.tempPath = tempPath
+        self.fileCount = 0
+        self._zip = zipfile.ZipFile(tempPath or filePath, 'w', zipfile.ZIP_DEFLATED, compresslevel=compressLevel)
+
+    def addFile(self, sourcePath, name):
+        """Adds the file at sourcePath to the archive as name."""
+        with open(sourcePath, 'rb') as source, self._zip.open(name, 'w', force_zip64=True) as member:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                member.write(chunk)
+        self.fileCount += 1
+
+    def close(self):
+        if self._zip is None:
+            return
+
+        self._zip.close()
+        self._zip = None
+        if self.tempPath:
+            os.replace(self.tempPath, self.filePath)
@@ -0,0 +1,265 @@
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from .stl_writer import STL_HEADER_SIZE, STL_FACET_SIZE, writeBinaryStl
+
+_CORNERS = struct.Struct('<12x12s12s12s2x')
+_COUNT = struct.Struct('<I')
+
+# Maximum passes of the search for the grid size that meets the target
+# triangle count. The search stops early once a grid keeps at least
+# SEARCH_TOLERANCE of the target.
+SEARCH_STEPS = 12
+SEARCH_TOLERANCE = 0.9
+
+# Grid cells per axis of the finest grid searched, and the bits each axis
+# takes in the key of a cell.
+GRID_RESOLUTION = 65536
+_AXIS_BITS = 17
+
+
+def readFacetCount(filePath):
+    """Returns the facet count in the header of a binary STL file."""
+    with open(filePath, 'rb') as f:
+        f.seek(STL_HEADER_SIZE)
+        data = f.read(4)
+    if len(data) < 4:
+        raise ValueError(f"{os.path.basename(filePath)} is not a valid binary STL file")
+    return _COUNT.unpack(data)[0]
+
+
+def readBinaryStl(filePath):
+    """Reads a binary STL file through a memory map into an indexed mesh.
+
+    Corners with the same coordinates are merged into one vertex as the
+    facets are read, keyed by their raw bytes, so the unwelded coordinates
+    are never held in memory. Facets that collapse are dropped.
+
+    :returns:
+        A (header, vertices, indices, facetCount) tuple, vertices and
+        indices being flat arrays of 32 bit floats and ints.
+    """
+    vertices = array('f')
+    indices = array('I')
+    lookup = {}
+    with open(filePath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        header = bytes(data[:STL_HEADER_SIZE])
+        facetCount = _COUNT.unpack_from(data, STL_HEADER_SIZE)[0]
+        end = STL_HEADER_SIZE + 4 + STL_FACET_SIZE * facetCount
+        if end != len(data):
+            raise ValueError(f"{os.path.basename(filePath)} is not a valid binary STL file")
+
+        view = memoryview(data)[STL_HEADER_SIZE + 4:end]
+        setdefault = lookup.setdefault
+        size = lookup.__len__
+        append = indices.append
+        try:
+            for a, b, c in _CORNERS.iter_unpack(view):
+                a = setdefault(a, size())
+                b = setdefault(b, size())
+                c = setdefault(c, size())
+                if a != b and b != c and a != c:
+                    append(a)
+                    append(b)
+                    append(c)
+        finally:
+            view.release()
+
+    # The keys of the lookup are the vertices, in the order of their indices
+    for corner in lookup:
+        vertices.frombytes(corner)
+    return header, vertices, indices, facetCount
+
+
+def clusterVertices(vertices, origin, cellSize):
+    """Assigns every vertex to the cell of a grid of the given size it lies in.
+
+    Arguments:
+    vertices -- Flat array of vertex coordinates.
+    origin -- The minimum corner of the grid, no vertex lies below it.
+    cellSize -- The size of the cells, at least the extent / GRID_RESOLUTION.
+
+    :returns:
+        A (clusterOf, clusterCount) tuple, clusterOf holding the cluster
+        index of every vertex.
+    """
+    inverse = 1.0 / cellSize
+    originX, originY, originZ = origin
+    lookup = {}
+    clusterOf = array('I')
+    append = clusterOf.append
+    for x, y, z in zip(vertices[0::3], vertices[1::3], vertices[2::3]):
+        # One int per cell, an int takes far less memory than a tuple
+        key = (
+            (int((x - originX) * inverse) << (2 * _AXIS_BITS))
+            | (int((y - originY) * inverse) << _AXIS_BITS)
+            | int((z - originZ) * inverse)
+        )
+        cluster = lookup.get(key)
+        if cluster is None:
+            cluster = lookup[key] = len(lookup)
+        append(cluster)
+    return clusterOf, len(lookup)
+
+
+def countTriangles(indices, clusterOf):
+    """Counts the triangles that don't collapse, repeated triangles included."""
+    count = 0
+    for a, b, c in zip(indices[0::3], indices[1::3], indices[2::3]):
+        a = clusterOf[a]
+        b = clusterOf[b]
+        c = clusterOf[c]
+        if a != b and b != c and a != c:
+            count += 1
+    return count
+
+
+def clusterMesh(vertices, indices, origin, cellSize):
+    """Merges all vertices within each cell of a grid of the given size.
+
+    :returns:
+        A (clusterOf, clusterCount, triangles) tuple. triangles holds the
+        cluster indices of the surviving triangles, in their original winding.
+    """
+    clusterOf, clusterCount = clusterVertices(vertices, origin, cellSize)
+
+    seen = set()
+    triangles = array('I')
+    for a, b, c in zip(indices[0::3], indices[1::3], indices[2::3]):
+        a = clusterOf[a]
+        b = clusterOf[b]
+        c = clusterOf[c]
+        if a == b or b == c or a == c:
+            continue
+
+        # Rotate the smallest index first so repeated triangles share a key
+        if a < b and a < c:
+            key = (a * clusterCount + b) * clusterCount + c
+        elif b < c:
+            key = (b * clusterCount + c) * clusterCount + a
+        else:
+            key = (c * clusterCount + a) * clusterCount + b
+        if key not in seen:
+            seen.add(key)
+            triangles.extend((a, b, c))
+
+    return clusterOf, clusterCount, triangles
+
+
+def decimateMesh(vertices, indices, targetTriangles):
+    """Reduces an indexed mesh to at most about targetTriangles triangles.
+
+    Uses vertex clustering: the mesh is snapped to a uniform grid whose size
+    is searched for, every vertex is moved to the mean of its cell and
+    collapsed triangles are dropped. Like any vertex clustering this can
+    join separate sheets of the surface, so the result may be non-manifold.
+
+    :returns:
+        A (vertices, indices, maxError) tuple, maxError being the largest
+        distance any original vertex moved.
+    """
+    origin = [min(vertices[axis::3]) for axis in range(3)]
+    extent = max(max(vertices[axis::3]) - origin[axis] for axis in range(3)) or 1.0
+
+    # The triangles of a surface fall roughly with the square of the grid
+    # size, so each pass scales the size by the square root of how far its
+    # count is off, within the bounds found so far. The first guess is the
+    # grid of a flat square. The coarsest grid always meets the target.
+    low, high = extent / GRID_RESOLUTION, extent
+    bestSize = high
+    cellSize = extent * math.sqrt(2.0 / max(targetTriangles, 1))
+    for _ in range(SEARCH_STEPS):
+        if not low < cellSize < high:
+            cellSize = math.sqrt(low * high)
+        triangleCount = countTriangles(indices, clusterVertices(vertices, origin, cellSize)[0])
+        if triangleCount > targetTriangles:
+            low = cellSize
+        else:
+            high = bestSize = cellSize
+            if triangleCount >= targetTriangles * SEARCH_TOLERANCE:
+                break
+        aim = targetTriangles * (1 + SEARCH_TOLERANCE) / 2
+        cellSize *= math.sqrt(max(triangleCount, 1) / aim)
+
+    clusterOf, clusterCount, triangles = clusterMesh(vertices, indices, origin, bestSize)
+
+    # Each cluster is represented by the mean of its vertices
+    sumX = array('d', bytes(8 * clusterCount))
+    sumY = array('d', bytes(8 * clusterCount))
+    sumZ = array('d', bytes(8 * clusterCount))
+    counts = array('I', bytes(4 * clusterCount))
+    coordinates = (vertices[0::3], vertices[1::3], vertices[2::3])
+    for cluster, x, y, z in zip(clusterOf, *coordinates):
+        counts[cluster] += 1
+        sumX[cluster] += x
+        sumY[cluster] += y
+        sumZ[cluster] += z
+    representatives = array('d')
+    for x, y, z, count in zip(sumX, sumY, sumZ, counts):
+        representatives.extend((x / count, y / count, z / count))
+    del sumX, sumY, sumZ, counts
+
+    maxError = 0.0
+    for cluster, x, y, z in zip(clusterOf, *coordinates):
+        cluster *= 3
+        dx = x - representatives[cluster]
+        dy = y - representatives[cluster + 1]
+        dz = z - representatives[cluster + 2]
+        error = dx * dx + dy * dy + dz * dz
+        if error > maxError:
+            maxError = error
+
+    return representatives, triangles, math.sqrt(maxError)
+
+
+def makeDecimateStage(targetRatio=0.0, targetTriangles=0, maxFacets=0):
+    """Returns a stage that decimates exported binary STL files.
+
+    Arguments:
+    targetRatio -- Fraction of the triangles to keep, 0 to ignore.
+    targetTriangles -- Number of triangles to keep at most, 0 to ignore.
+    maxFacets -- Files with more facets are left as they are, as decimating
+                 takes about 130 bytes of memory per facet. 0 for no limit.
+    """
+
+    def decimateStage(filePath, info):
+        if not filePath.lower().endswith('.stl'):
+            return
+
+        start = time.perf_counter()
+        triangleCount = readFacetCount(filePath)
+
+        targets = []
+        if targetRatio > 0:
+            targets.append(int(triangleCount * targetRatio))
+        if targetTriangles > 0:
+            targets.append(targetTriangles)
+        if not targets or min(targets) >= triangleCount:
+            return
+        if maxFacets and triangleCount > maxFacets:
+            info['decimationSkipped'] = triangleCount
+            return
+
+        header, vertices, indices, triangleCount = readBinaryStl(filePath)
+        vertices, indices, maxError = decimateMesh(vertices, indices, max(min(targets), 1))
+
+        # Replace the file only once the decimated mesh is completely written.
+        # The name is that of the partial files a resumed export removes.
+        folder, fileName = os.path.split(filePath)
+        name, ext = os.path.splitext(fileName)
+        tempPath = os.path.join(folder, f".{name}.decimate.partial{ext}")
+        written = writeBinaryStl(tempPath, vertices, indices, scale=1.0, header=header)
+        os.replace(tempPath, filePath)
+
+        info['decimation'] = {
+            'before': triangleCount,
+            'after': written,
+            'maxError': maxError,
+            'seconds': time.perf_counter() - start,
+        }
+
+    return decimateStage
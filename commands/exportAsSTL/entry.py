@@ -1,12 +1,34 @@
 import adsk.core
 import adsk.fusion
 import os
+import time
+import fnmatch
 import traceback
 import subprocess
 import platform
-import re
+import threading
 from ...lib import fusionAddInUtils as futil
 from ... import config
+from .export_cache import ExportCache
+from .stl_writer import writeBinaryStl
+from .batch_scheduler import BatchScheduler
+from .post_process import PostProcessPipeline, checksumStage, makeCopyStage
+from .threemf_writer import ThreeMFWriter
+from .filename_validator import FilenameValidator, INVALID_FILENAME_PATTERN
+from .filename_generator import FilenameGenerator, STYLE_NONE
+from .selection_state import SelectionState
+from .name_allocator import NameAllocator
+from .manifest import writeManifest
+from .geometry_dedup import GeometryDeduplicator
+from .refinement import planRefinement, describeRefinement, refinementFor, estimateTrianglesFromArea, DEFAULT_RELATIVE_DEVIATION
+from .decimate import makeDecimateStage
+from .indexed_writers import writeBinaryPly, writeObj
+from .watch_state import WatchState
+from .export_journal import ExportJournal
+from .body_index import BodyIndex, parseQuery
+from .compression import gzipFile, BatchArchive
+from .upload import HttpUploader, makeUploadStage
+from .stl_verify import makeVerifyStage, describeVerification, hasProblems
 
 app = adsk.core.Application.get()
 ui = app.userInterface
@@ -31,6 +53,64 @@ COMMAND_BESIDE_ID = "ScriptsManagerCommand"
 # Resource location for command icons, here we assume a sub folder in this directory named "resources".
 ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "")
 
+# Mesh settings of the fixed Medium refinement. Part of the export cache key so
+# changing them invalidates previously exported files.
+MESH_SETTINGS_KEY = "MeshRefinementMedium|binary"
+
+# Export engines selectable in the dialog. The Fusion engine goes through the
+# ExportManager, the native engine tessellates with the body's mesh calculator
+# and writes the binary STL itself.
+ENGINE_FUSION = 0
+ENGINE_NATIVE = 1
+EXPORT_ENGINES = ['Fusion STL export', 'Native mesh writer']
+
+# Output formats selectable in the dialog. 3MF writes every selected body into
+# a single package named after the design. PLY and OBJ store shared vertices
+# once and are always tessellated with the mesh calculator.
+FORMAT_STL = 0
+FORMAT_3MF = 1
+FORMAT_PLY = 2
+FORMAT_OBJ = 3
+OUTPUT_FORMATS = [
+    'STL (one file per body)',
+    '3MF (single package)',
+    'PLY (binary, shared vertices)',
+    'OBJ (shared vertices)',
+]
+FORMAT_EXTENSIONS = {FORMAT_STL: '.stl', FORMAT_PLY: '.ply', FORMAT_OBJ: '.obj'}
+
+# Approximate bytes per triangle of each format for the size estimate, with
+# about half as many shared vertices as triangles. 3MF is compressed.
+FORMAT_BYTES_PER_TRIANGLE = {FORMAT_STL: 50, FORMAT_3MF: 20, FORMAT_PLY: 19, FORMAT_OBJ: 37}
+
+# Compression of the exported files. gzip compresses every file on its own,
+# zip collects the whole batch in one archive named after the design. 3MF
+# packages are already compressed and ignore this.
+ENCODING_PLAIN = 0
+ENCODING_GZIP = 1
+ENCODING_ZIP = 2
+OUTPUT_ENCODINGS = ['None', 'gzip (one .gz per file)', 'zip (one archive per batch)']
+
+# Mesh refinement modes selectable in the dialog. Adaptive refinement scales
+# the deviations of each body with its size.
+REFINEMENT_MEDIUM = 0
+REFINEMENT_ADAPTIVE = 1
+
+# Custom event used to run batch exports in chunks, and the time each chunk
+# may keep Fusion's main thread busy before yielding back to the UI.
+EXPORT_EVENT_ID = f"{CMD_ID}_exportChunk"
+EXPORT_SLICE_SECONDS = 0.1
+
+# Longest list of files shown in the completion message.
+MAX_LISTED_FILES = 50
+
+# Custom event that checks the watched bodies for changes on the main thread.
+WATCH_EVENT_ID = f"{CMD_ID}_watchCheck"
+
+# Written to the export folder after each export when config.PROFILE is set.
+PROFILE_TRACE_FILENAME = '.exporttools-profile.jsonl'
+PROFILE_SUMMARY_FILENAME = '.exporttools-profile.txt'
+
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
@@ -46,6 +126,16 @@ def start():
     # Define an event handler for the command created event. It will be called when the button is clicked.
     futil.add_handler(cmd_def.commandCreated, command_created)
 
+    # Register the custom event that drives batch exports.
+    exportEvent = app.registerCustomEvent(EXPORT_EVENT_ID)
+    futil.add_handler(exportEvent, export_chunk)
+
+    # Register the custom event and the design events used by watch mode.
+    watchEvent = app.registerCustomEvent(WATCH_EVENT_ID)
+    futil.add_handler(watchEvent, watch_check)
+    futil.add_handler(app.documentSaved, watch_design_changed)
+    futil.add_handler(ui.commandTerminated, watch_design_changed)
+
     # ******** Add a button into the UI so the user can run the command. ********
     # Get the target workspace the button will be created in.
     workspace = ui.workspaces.itemById(WORKSPACE_ID)
@@ -76,6 +166,21 @@ def stop():
     if command_definition:
         command_definition.deleteMe()
 
+    # Cancel any running export and finish it with what it wrote so far, there
+    # won't be another chunk to do it once its custom event is unregistered
+    if active_export:
+        job = active_export
+        job.interactive = False
+        job.scheduler.cancel()
+        job.scheduler.runChunk()
+    app.unregisterCustomEvent(EXPORT_EVENT_ID)
+
+    # Stop watching for changes
+    watch_state.clear()
+    if watch_timer:
+        watch_timer.cancel()
+    app.unregisterCustomEvent(WATCH_EVENT_ID)
+
 
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
@@ -103,9 +208,28 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     selectionInput.setSelectionLimits(0)
     selectionInput.addSelectionFilter("Bodies")
 
-    filenameTable = inputs.addTableCommandInput('filenameTable', "Filenames", 1, "1")
+    filenameTable = inputs.addTableCommandInput('filenameTable', "Filenames", 2, "3:1")
     filenameTable.maximumVisibleRows = 10
 
+    estimateInput = inputs.addTextBoxCommandInput('estimateInput', 'Estimate', '', 1, True)
+    estimateInput.tooltip = "Estimated triangles and output size of the selected bodies, from their size and surface area"
+
+    groupQueryInput = inputs.addGroupCommandInput('groupQueryInput', 'Select by Rule')
+    groupQueryInput.isExpanded = False
+    groupQueryChildren = groupQueryInput.children
+
+    queryInput = groupQueryChildren.addStringValueInput('queryInput', 'Query')
+    queryInput.tooltip = "Add every body in the design matching a query to the selection"
+    queryInput.tooltipDescription = (
+        "For example: Bolt* material:steel* visible:yes volume:..2.5<br>"
+        "Fields are name, path (occurrence path), material, visible (yes or no) and volume (cm³, min..max). "
+        "A term without a field matches the name. Names, paths and materials take glob patterns or "
+        "regular expressions between slashes. Quote terms that contain spaces."
+    )
+
+    groupQueryChildren.addBoolValueInput('selectMatchingButton', 'Add matching bodies', False, '', True)
+    groupQueryChildren.addTextBoxCommandInput('queryResultInput', '', '', 1, True)
+
     groupNameInput = inputs.addGroupCommandInput('groupNameInput', 'Advanced Naming')
     groupNameChildren = groupNameInput.children
 
@@ -124,11 +248,68 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     dropdownItems.add('kebab-case', False)
     dropdownItems.add('space separated', False)
 
+    exportEngineInput = inputs.addDropDownCommandInput('exportEngineInput', 'Export Engine', 0)
+    for i, engineName in enumerate(EXPORT_ENGINES):
+        exportEngineInput.listItems.add(engineName, i == ENGINE_FUSION)
+    exportEngineInput.tooltip = "The native mesh writer skips the per-body ExportManager round-trip"
+
+    outputFormatInput = inputs.addDropDownCommandInput('outputFormatInput', 'Output Format', 0)
+    for i, formatName in enumerate(OUTPUT_FORMATS):
+        outputFormatInput.listItems.add(formatName, i == FORMAT_STL)
+
+    outputEncodingInput = inputs.addDropDownCommandInput('outputEncodingInput', 'Compression', 0)
+    for i, encodingName in enumerate(OUTPUT_ENCODINGS):
+        outputEncodingInput.listItems.add(encodingName, i == ENCODING_PLAIN)
+    outputEncodingInput.tooltip = "Binary STL files usually compress to a third or less of their size"
+
+    groupMeshInput = inputs.addGroupCommandInput('groupMeshInput', 'Mesh Refinement')
+    groupMeshChildren = groupMeshInput.children
+
+    refinementModeInput = groupMeshChildren.addDropDownCommandInput('refinementModeInput', 'Refinement', 0)
+    refinementModeInput.listItems.add('Medium', True)
+    refinementModeInput.listItems.add('Adaptive to body size', False)
+
+    triangleBudgetInput = groupMeshChildren.addIntegerSpinnerCommandInput(
+        'triangleBudgetInput', 'Triangle Budget', 0, 100000000, 100000, 0
+    )
+    triangleBudgetInput.tooltip = (
+        "Estimated triangles for the whole batch when using adaptive refinement, 0 for no limit. "
+        "Each triangle takes 50 bytes in a binary STL."
+    )
+
     replaceButton = inputs.addBoolValueInput(
         "replaceButton", "Replace existing", True, "", False
     )
     replaceButton.tooltip = "Replace existing files"
 
+    skipUnchangedButton = inputs.addBoolValueInput(
+        "skipUnchangedButton", "Skip unchanged", True, "", True
+    )
+    skipUnchangedButton.tooltip = "Skip bodies that have not changed since they were last exported to this folder"
+
+    reuseGeometryButton = inputs.addBoolValueInput(
+        "reuseGeometryButton", "Reuse identical geometry", True, "", False
+    )
+    reuseGeometryButton.tooltip = (
+        "Export repeated instances of the same component once and hardlink or copy the file for the others"
+    )
+
+    resumeButton = inputs.addBoolValueInput(
+        "resumeButton", "Resume interrupted export", True, "", False
+    )
+    resumeButton.tooltip = (
+        "Skip bodies that an earlier export to this folder finished before it was cancelled or Fusion closed, "
+        "as long as their files are unchanged"
+    )
+
+    watchButton = inputs.addBoolValueInput(
+        "watchButton", "Watch for changes", True, "", watch_state.isWatching
+    )
+    watchButton.tooltip = (
+        "Keep exporting the selected bodies to the same files whenever they change, until an export "
+        "is run without this option or the add-in is stopped"
+    )
+
     errorTextInput = inputs.addTextBoxCommandInput('errorTextInput', 'Log', '', 2, True)
     errorTextInput.isFullWidth = True
 
@@ -166,17 +347,50 @@ def command_execute(args: adsk.core.CommandEventArgs):
     selectedFolder = inputs.itemById("folderPathInput").text
     filenameTable = inputs.itemById('filenameTable')
     replace = inputs.itemById("replaceButton").value
-
-    exportSelectedBodies(selectionInput, selectedFolder, replace, filenameTable)
+    skipUnchanged = inputs.itemById("skipUnchangedButton").value
+    reuseGeometry = inputs.itemById("reuseGeometryButton").value
+    watch = inputs.itemById("watchButton").value
+    resume = inputs.itemById("resumeButton").value
+    engine = inputs.itemById("exportEngineInput").selectedItem.index
+    outputFormat = inputs.itemById("outputFormatInput").selectedItem.index
+    encoding = inputs.itemById("outputEncodingInput").selectedItem.index
+    adaptiveRefinement = inputs.itemById("refinementModeInput").selectedItem.index == REFINEMENT_ADAPTIVE
+    triangleBudget = inputs.itemById("triangleBudgetInput").value
+
+    exportSelectedBodies(
+        selectionInput, selectedFolder, replace, filenameTable, skipUnchanged, engine, outputFormat,
+        reuseGeometry=reuseGeometry,
+        adaptiveRefinement=adaptiveRefinement,
+        triangleBudget=triangleBudget,
+        watch=watch,
+        resume=resume,
+        encoding=encoding,
+    )
 
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f"{CMD_NAME} Command Preview Event")
+    if futil.is_log_enabled(futil.DEBUG_LOG_LEVEL):
+        futil.log(f"{CMD_NAME} Command Preview Event", futil.DEBUG_LOG_LEVEL)
     inputs = args.command.commandInputs
 
-previous_selected_bodies = []
+    # The column is kept up to date by the input changed events, this only
+    # compares the inputs it depends on
+    try:
+        with futil.span('preview.updateMeshColumn'):
+            updateMeshColumn(inputs)
+    except:
+        futil.log("Failed:\n{}".format(traceback.format_exc()))
+
+# Bodies in the selection input, in the order of their rows in the filename table.
+selection_state = SelectionState()
+
+# Validity of the rows in the filename table, keyed by the id of each row's input.
+filename_validator = FilenameValidator()
+
+# Filename generator for the dialog session, caches the words of each body name.
+filename_generator = FilenameGenerator()
 
 # This event handler is called when the user changes anything in the command dialog
 # allowing you to modify values of other inputs based on that change.
@@ -191,9 +405,10 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     inputs = command.commandInputs
 
     # General logging for debug.
-    futil.log(
-        f"{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}"
-    )
+    if futil.is_log_enabled(futil.DEBUG_LOG_LEVEL):
+        futil.log(
+            f"{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}", futil.DEBUG_LOG_LEVEL
+        )
 
     product = app.activeProduct
     design = adsk.fusion.Design.cast(product)
@@ -207,17 +422,6 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     suffixInput = adsk.core.StringValueCommandInput.cast(inputs.itemById('suffixInput'))
     nameFormatInput = adsk.core.DropDownCommandInput.cast(inputs.itemById('nameFormatInput'))
 
-    global previous_selected_bodies
-
-    selected_bodies = []
-    if not selectionInput:
-        selected_bodies = previous_selected_bodies
-    else:
-        count = selectionInput.selectionCount
-        for i in range(count):
-            name = selectionInput.selection(i).entity
-            selected_bodies.append(name)
-        
     versionNumber = versionNumberInput.value
     prefix = prefixInput.value
     suffix = suffixInput.value
@@ -249,65 +453,178 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
 
     elif changed_input.id in ['versionInput', 'prefixInput', 'suffixInput', 'nameFormatInput']:
         # When versionInput changes, update all filename textboxes in the table
-        for i, body in enumerate(selected_bodies):
-            body = adsk.fusion.BRepBody.cast(body)
-            parent_component = body.parentComponent
-            body_name = body.name
-
-            if body.name == 'Body1' and parent_component != root_comp:
-                body_name = parent_component.name
-            
-            textBoxId = body.revisionId
-            filename = generateFilename(body_name, versionNumber, prefix, suffix, formattingStyleIndex)
+        items = selection_state.items()
+        bodyNames = [getExportName(adsk.fusion.BRepBody.cast(body), root_comp) for _, body in items]
+        filenames = filename_generator.generateAll(bodyNames, versionNumber, prefix, suffix, formattingStyleIndex)
+        for (textBoxId, body), filename in zip(items, filenames):
             nameInput = adsk.core.StringValueCommandInput.cast(inputs.itemById(textBoxId))
             if nameInput:
                 nameInput.value = filename
+                filename_validator.update(textBoxId, filename)
 
-    elif changed_input.id == 'selectedBodies':
-        added_body = [name for name in selected_bodies if name not in previous_selected_bodies]
-        removed_body = [name for name in previous_selected_bodies if name not in selected_bodies]
-
-        if added_body:
-            for i, body in enumerate(added_body):
-                # Create unique IDs and display names for each input
-                body = adsk.fusion.BRepBody.cast(body)
-                parent_component = body.parentComponent
-                body_name = body.name
-
-                if body.name == 'Body1' and parent_component != root_comp:
-                    body_name = parent_component.name
-                
-                textBoxId = body.revisionId
-                filename = generateFilename(body_name, versionNumber, prefix, suffix, formattingStyleIndex)
-                textBoxValue = filename
-
-                # Create a new TextBoxCommandInput
-                subTextInput = inputs.addStringValueInput(textBoxId, '', textBoxValue)
-                subTextInput.isFullWidth = True
-
-                # Add to the next available row in the table
-                row = filenameTable.rowCount
-                filenameTable.addCommandInput(subTextInput, row, 0)
-        elif removed_body:
-            for i, body in enumerate(removed_body):
-                try:
-                    nameInput = inputs.itemById(body.revisionId)
-                    (returnValue, row, column, rowSpan, columnSpan) = filenameTable.getPosition(nameInput)
-                    delete_row = filenameTable.deleteRow(row)
-                except:
-                    futil.log("Failed:\n{}".format(traceback.format_exc()))
+    elif changed_input.id in ['selectedBodies', 'selectMatchingButton']:
+        if changed_input.id == 'selectMatchingButton':
+            changed_input = adsk.core.BoolValueCommandInput.cast(changed_input)
+            changed_input.value = False
+            queryResultInput = adsk.core.TextBoxCommandInput.cast(inputs.itemById('queryResultInput'))
+            queryInput = adsk.core.StringValueCommandInput.cast(inputs.itemById('queryInput'))
+            try:
+                matches = queryBodies(design, queryInput.value)
+            except ValueError as e:
+                queryResultInput.text = str(e)
+                return
 
-        # Update previous_selected_bodies for next change
-        previous_selected_bodies = selected_bodies.copy()
+            # Add all matches to the selection, the table is updated once below
+            addedCount = 0
+            for body in matches:
+                if body.entityToken not in selection_state and selectionInput.addSelection(body):
+                    addedCount += 1
+            queryResultInput.text = f"{len(matches)} bodies match, {addedCount} added"
 
-    
+        selected_bodies = []
+        count = selectionInput.selectionCount
+        for i in range(count):
+            selected_bodies.append(selectionInput.selection(i).entity)
+
+        addedRows = []
+
+        def createRow(textBoxId, body, row):
+            # Create a filename input for the body, with the id of its row as a unique ID
+            body = adsk.fusion.BRepBody.cast(body)
+            filename = generateFilename(getExportName(body, root_comp), versionNumber, prefix, suffix, formattingStyleIndex)
+
+            subTextInput = inputs.addStringValueInput(textBoxId, '', filename)
+            subTextInput.isFullWidth = True
+            filenameTable.addCommandInput(subTextInput, row, 0)
+            filename_validator.update(textBoxId, filename)
+
+            meshInput = inputs.addTextBoxCommandInput(f"{textBoxId}_mesh", '', '', 1, True)
+            filenameTable.addCommandInput(meshInput, row, 1)
+            addedRows.append((textBoxId, body))
+
+        try:
+            added, removed = selection_state.update(selected_bodies, filenameTable, createRow)
+            for textBoxId in removed:
+                filename_validator.remove(textBoxId)
+            with futil.span('inputChanged.updateMeshColumn'):
+                updateMeshColumn(inputs, addedRows, removed)
+        except:
+            futil.log("Failed:\n{}".format(traceback.format_exc()))
+
+    elif changed_input.id in filename_validator:
+        # A filename in the table was edited by hand
+        nameInput = adsk.core.StringValueCommandInput.cast(changed_input)
+        filename_validator.update(changed_input.id, nameInput.value)
+
+    # Fusion doesn't run the preview while the inputs are invalid, so the
+    # estimates follow the inputs they depend on here as well
+    if changed_input.id in MESH_COLUMN_INPUTS:
+        try:
+            with futil.span('inputChanged.updateMeshColumn'):
+                updateMeshColumn(inputs)
+        except:
+            futil.log("Failed:\n{}".format(traceback.format_exc()))
+
+
+
+# Inputs that change the estimates in the second column of the filename table.
+# Changes of the selection update the rows of added and removed bodies only.
+MESH_COLUMN_INPUTS = [
+    'refinementModeInput', 'triangleBudgetInput', 'outputFormatInput', 'outputEncodingInput',
+]
+
+# Text shown in the second column of each row, keyed by the id of the row's
+# filename input, so rows that didn't change aren't updated again.
+mesh_column_texts = {}
+
+# Estimated triangles of each row and their total, and the refinement mode,
+# budget and format the rows were estimated with.
+mesh_column_triangles = {}
+mesh_column_total = 0
+mesh_column_signature = None
+
+# Estimated triangles of each body, keyed by revisionId and refinement.
+triangle_estimates = {}
+
+
+def updateMeshColumn(inputs, addedRows=(), removedRowIds=()):
+    # Show the refinement and the estimated output of each body next to its filename
+    global mesh_column_total, mesh_column_signature
+
+    adaptive = inputs.itemById('refinementModeInput').selectedItem.index == REFINEMENT_ADAPTIVE
+    triangleBudget = inputs.itemById('triangleBudgetInput').value
+    outputFormat = inputs.itemById('outputFormatInput').selectedItem.index
+    encoding = inputs.itemById('outputEncodingInput').selectedItem.index
+    bytesPerTriangle = FORMAT_BYTES_PER_TRIANGLE[outputFormat]
+
+    for textBoxId in removedRowIds:
+        mesh_column_total -= mesh_column_triangles.pop(textBoxId, 0)
+        mesh_column_texts.pop(textBoxId, None)
+
+    # A budget is shared by the whole selection, so every row is planned
+    # again when it changes. Otherwise each body is planned on its own.
+    signature = (adaptive, triangleBudget if adaptive else 0, outputFormat)
+    sharedBudget = adaptive and triangleBudget > 0 and (addedRows or removedRowIds)
+    if signature != mesh_column_signature or sharedBudget:
+        rows = selection_state.items()
+        mesh_column_triangles.clear()
+        mesh_column_total = 0
+        mesh_column_signature = signature
+    else:
+        rows = addedRows
+
+    plan = planBodyRefinement([body for _, body in rows], adaptive, triangleBudget)
+    for (textBoxId, body), refinement in zip(rows, plan):
+        triangles = estimateBodyTriangles(body, refinement)
+        mesh_column_triangles[textBoxId] = triangles
+        mesh_column_total += triangles
+        text = (
+            f"{describeRefinement(refinement) if refinement else 'Medium'}, "
+            f"~{formatCount(triangles)} triangles, {triangles * bytesPerTriangle / 1e6:.1f} MB"
+        )
+        if mesh_column_texts.get(textBoxId) == text:
+            continue
+        meshInput = adsk.core.TextBoxCommandInput.cast(inputs.itemById(f"{textBoxId}_mesh"))
+        if meshInput:
+            meshInput.text = text
+            mesh_column_texts[textBoxId] = text
+
+    estimateInput = adsk.core.TextBoxCommandInput.cast(inputs.itemById('estimateInput'))
+    if not mesh_column_triangles:
+        estimateInput.text = ''
+        return
+    estimateInput.text = (
+        f"~{formatCount(mesh_column_total)} triangles, {mesh_column_total * bytesPerTriangle / 1e6:.1f} MB "
+        f"for {len(mesh_column_triangles)} bodies" + (" before compression" if encoding != ENCODING_PLAIN and outputFormat != FORMAT_3MF else "")
+    )
+
+
+def estimateBodyTriangles(body, refinement=None):
+    key = (body.revisionId, refinement)
+    triangles = triangle_estimates.get(key)
+    if triangles is None:
+        size = getBodySize(body)
+        # Medium is estimated with the default deviation of the adaptive refinement
+        settings = refinement or refinementFor(size, DEFAULT_RELATIVE_DEVIATION)
+        triangles = estimateTrianglesFromArea(size, getBodyArea(body), settings)
+        triangle_estimates[key] = triangles
+    return triangles
+
+
+def formatCount(count):
+    if count >= 1e6:
+        return f"{count / 1e6:.1f}M"
+    if count >= 1e4:
+        return f"{count / 1e3:.0f}k"
+    return f"{count:,}"
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # General logging for debug.
-    futil.log(f"{CMD_NAME} Validate Input Event")
+    if futil.is_log_enabled(futil.DEBUG_LOG_LEVEL):
+        futil.log(f"{CMD_NAME} Validate Input Event", futil.DEBUG_LOG_LEVEL)
 
     inputs = args.inputs
 
@@ -316,51 +633,27 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # Get the selected folder path
     selectedFolderInput = adsk.core.TextBoxCommandInput.cast(inputs.itemById("folderPathInput"))
     selectionInput = adsk.core.SelectionCommandInput.cast(inputs.itemById("selectedBodies"))
-    filenameTable = adsk.core.TableCommandInput.cast(inputs.itemById('filenameTable'))
     errorTextInput = adsk.core.TextBoxCommandInput.cast(inputs.itemById('errorTextInput'))
 
     selectedFolder = selectedFolderInput.text
 
+    # Collect every problem so they can all be shown at once
+    problems = []
+
     # Validate selected folder
     if not selectedFolder or not os.path.exists(selectedFolder):
-        args.areInputsValid = False
-        errorTextInput.text = "Selected folder does not exist."
-        return
-    else:
-        errorTextInput.text = ''
+        problems.append("Selected folder does not exist.")
 
     # Validate selection
     if selectionInput.selectionCount == 0:
+        problems.append("No bodies selected.")
+
+    # Validate filenames, the validator is kept up to date as rows change
+    problems.extend(filename_validator.problems())
+
+    if problems:
         args.areInputsValid = False
-        errorTextInput.text = "No bodies selected."
-        return
-    else:
-        errorTextInput.text = ''
-
-    # Validate filenames
-    if filenameTable.rowCount:
-        for i in range(filenameTable.rowCount):
-            nameInput = filenameTable.getInputAtPosition(i, 0)
-            name = nameInput.value
-
-            # Check if name contains any invalid characters
-            invalid_pattern = r'[<>:"/\\|?*\x00-\x1F]'
-            if re.search(invalid_pattern, name):
-                args.areInputsValid = False
-                errorTextInput.text = f"Filename '{name}' contains invalid characters."
-                return
-    
-    # Check for repeated filenames
-    filenames = []
-    for i in range(filenameTable.rowCount):
-        nameInput = filenameTable.getInputAtPosition(i, 0)
-        name = nameInput.value
-        filenames.append(name)
-    duplicates = set([x for x in filenames if filenames.count(x) > 1])
-    if duplicates:
-        args.areInputsValid = False
-        errorTextInput.text = f"Duplicate filenames found: {', '.join(duplicates)}"
-        return
+    errorTextInput.text = "\n".join(problems)
 
 
 # This event handler is called when the command terminates.
@@ -368,12 +661,39 @@ def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     futil.log(f"{CMD_NAME} Command Destroy Event")
 
-    global local_handlers, previous_selected_bodies
-    previous_selected_bodies = []
+    global local_handlers
+    selection_state.clear()
+    filename_generator.clear()
+    body_sizes.clear()
+    body_areas.clear()
+    triangle_estimates.clear()
+    mesh_column_texts.clear()
+    mesh_column_triangles.clear()
+    global mesh_column_total, mesh_column_signature
+    mesh_column_total = 0
+    mesh_column_signature = None
+    filename_validator.clear()
+    global body_index_synced
+    body_index_synced = False
     local_handlers = []
 
 
-def exportSelectedBodies(selectionInput, exportFolder, replace, filenameTable):
+def exportSelectedBodies(
+        selectionInput,
+        exportFolder,
+        replace,
+        filenameTable,
+        skipUnchanged=True,
+        engine=ENGINE_FUSION,
+        outputFormat=FORMAT_STL,
+        *,
+        reuseGeometry=False,
+        adaptiveRefinement=False,
+        triangleBudget=0,
+        watch=False,
+        resume=False,
+        encoding=ENCODING_PLAIN
+):
     try:
         selectionInput = adsk.core.SelectionCommandInput.cast(selectionInput)
         filenameTable = adsk.core.TableCommandInput.cast(filenameTable)
@@ -384,111 +704,992 @@ def exportSelectedBodies(selectionInput, exportFolder, replace, filenameTable):
             futil.log("No active design found.")
             return
 
-        # Filter selected bodies
-        selectedBodies = []
-        count = selectionInput.selectionCount
-        for i in range(count):
-            entity = selectionInput.selection(i).entity
-            if entity.objectType == adsk.fusion.BRepBody.classType():
-                selectedBodies.append(entity)
+        if active_export:
+            ui.messageBox("An export is already running. Wait for it to finish or cancel it first.")
+            return
 
-        # Export each selected body
-        exportMgr = design.exportManager
-        successCount = 0
-        exportedFiles = []
+        # Filter selected bodies and read their filenames up front, the command
+        # inputs are no longer available while the export runs in chunks.
+        futil.reset_profile()
+        bodies = []
+        fileNames = []
+        with futil.span('setup.collectBodies'):
+            # Rows are found by the id of their filename input, the order of
+            # the selection doesn't have to match the order of the rows
+            rowNames = {}
+            for row in range(filenameTable.rowCount):
+                filenameInput = adsk.core.StringValueCommandInput.cast(filenameTable.getInputAtPosition(row, 0))
+                if filenameInput:
+                    rowNames[filenameInput.id] = filenameInput.value
+
+            count = selectionInput.selectionCount
+            for i in range(count):
+                entity = selectionInput.selection(i).entity
+                if entity.objectType != adsk.fusion.BRepBody.classType():
+                    continue
+                fileName = rowNames.get(selection_state.rowIdOf(entity))
+                if fileName is None:
+                    futil.log(f'Body "{entity.name}" has no row in the filename table, using its default name')
+                    fileName = generateFilename(getExportName(entity, design.rootComponent), '', '', '', STYLE_NONE)
+                bodies.append(entity)
+                fileNames.append(fileName)
+
+        with futil.span('setup.planRefinement'):
+            refinements = planBodyRefinement(bodies, adaptiveRefinement, triangleBudget)
+        workItems = list(zip(bodies, fileNames, refinements))
+
+        # Keep exporting these bodies whenever they change, or stop watching
+        if watch and (outputFormat == FORMAT_3MF or encoding == ENCODING_ZIP):
+            futil.log("Watch mode is not available for 3MF packages and zip archives.")
+            watch_state.clear()
+        elif watch:
+            watchBodies(workItems, exportFolder, engine, outputFormat, encoding, reuseGeometry)
+        else:
+            watch_state.clear()
+
+        with futil.span('setup.createJob'):
+            job = ExportJob(exportFolder, design.exportManager, replace, skipUnchanged, engine, resume)
+        job.outputFormat = outputFormat
+        if reuseGeometry:
+            job.dedup = GeometryDeduplicator()
+
+        # All bodies go into one package, streamed in as they are tessellated
+        if outputFormat == FORMAT_3MF:
+            packageName = INVALID_FILENAME_PATTERN.sub('', design.rootComponent.name) + '.3mf'
+            job.packageName, packagePath = resolveFilePath(job, packageName)
+            job.package = ThreeMFWriter(packagePath, tempPath=getTempFilePath(packagePath))
+        else:
+            setOutputEncoding(job, encoding, design)
 
-        for i, body in enumerate(selectedBodies):
-            try:
-                body = adsk.fusion.BRepBody.cast(body)
-                
-                # Create STL export options
-                stlOptions = exportMgr.createSTLExportOptions(body)
-                
-                filenameInput = filenameTable.getInputAtPosition(i, 0)
-                fileName = filenameInput.value
-                filePath = os.path.join(exportFolder, fileName)
-
-                if not replace:
-                    counter = 1
-                    while os.path.exists(filePath):
-                        name, ext = os.path.splitext(fileName)
-                        name = re.sub(r'\(\d+\)', '', name)
-                        fileName = f"{name}({counter}){ext}"
-                        filePath = os.path.join(exportFolder, fileName)
-                        counter += 1
-
-                # Set export options
-                stlOptions.filename = filePath
-                stlOptions.meshRefinement = (
-                    adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
-                )
-                stlOptions.isBinaryFormat = True  # Binary STL is more compact
+        startExportJob(job, workItems)
 
-                # Export the body
-                exportMgr.execute(stlOptions)
-                successCount += 1
-                exportedFiles.append(fileName)
+    except:
+        futil.log("Failed to export:\n{}".format(traceback.format_exc()))
+
+
+def exportAllBodies(
+        exportFolder,
+        include=None,
+        exclude=None,
+        *,
+        replace=True,
+        skipUnchanged=True,
+        engine=ENGINE_FUSION,
+        reuseGeometry=False,
+        adaptiveRefinement=False,
+        triangleBudget=0,
+        resume=False,
+        encoding=ENCODING_PLAIN,
+        interactive=False,
+        synchronous=True
+):
+    """Exports every body in the active design without showing the dialog.
+
+    Bodies are collected from the root component and every occurrence. A body
+    is exported when its name, or its occurrence path and name joined by a
+    "/", matches one of the include patterns and none of the exclude patterns.
+    Filenames follow the dialog's defaults, including the Body1 fallback to
+    the component name.
+
+    Arguments:
+    exportFolder -- The folder to export to.
+    include -- fnmatch style patterns of bodies to export. Defaults to all bodies.
+    exclude -- fnmatch style patterns of bodies to leave out.
+    replace -- Overwrite existing files instead of adding a (n) counter.
+    skipUnchanged -- Skip bodies that are unchanged since their last export.
+    engine -- The export engine, ENGINE_FUSION or ENGINE_NATIVE.
+    reuseGeometry -- Export repeated component instances once and link the other files to it.
+    adaptiveRefinement -- Scale the mesh refinement of each body with its size.
+    triangleBudget -- Estimated triangles for the batch with adaptive refinement, 0 for no limit.
+    resume -- Skip bodies an interrupted export to the folder already finished.
+    encoding -- Compression of the files, ENCODING_PLAIN, ENCODING_GZIP or ENCODING_ZIP.
+    interactive -- Show a progress dialog, error messages and a summary message.
+    synchronous -- Export everything before returning instead of in chunks.
+
+    :returns:
+        The ExportJob, finished when synchronous. None if nothing could be started.
+    """
+    design = adsk.fusion.Design.cast(app.activeProduct)
+
+    if not design:
+        futil.log("No active design found.")
+        return None
+
+    if active_export:
+        futil.log("An export is already running.")
+        return None
+
+    futil.reset_profile()
+    include = [pattern.casefold() for pattern in (include or ['*'])]
+    exclude = [pattern.casefold() for pattern in (exclude or [])]
+
+    rootComp = design.rootComponent
+    bodies = [(body, '') for body in rootComp.bRepBodies]
+    for occurrence in rootComp.allOccurrences:
+        occurrencePath = occurrence.fullPathName
+        bodies.extend((body, occurrencePath) for body in occurrence.bRepBodies)
+
+    # Repeated components give the same name more than once, keep them apart
+    generator = FilenameGenerator()
+    batchNames = NameAllocator(None)
+    selectedBodies = []
+    fileNames = []
+    for body, occurrencePath in bodies:
+        bodyName = getExportName(body, rootComp)
+        candidates = [bodyName.casefold(), f"{occurrencePath}/{bodyName}".casefold()]
+        if not any(fnmatch.fnmatchcase(c, p) for c in candidates for p in include):
+            continue
+        if any(fnmatch.fnmatchcase(c, p) for c in candidates for p in exclude):
+            continue
+
+        fileName = generator.generate(bodyName, '', '', '', STYLE_NONE)
+        selectedBodies.append(body)
+        fileNames.append(batchNames.allocate(fileName))
+
+    refinements = planBodyRefinement(selectedBodies, adaptiveRefinement, triangleBudget)
+    workItems = list(zip(selectedBodies, fileNames, refinements))
+
+    futil.log(f"Exporting {len(workItems)} of {len(bodies)} bodies in the design")
+
+    job = ExportJob(exportFolder, design.exportManager, replace, skipUnchanged, engine, resume)
+    job.interactive = interactive
+    if reuseGeometry:
+        job.dedup = GeometryDeduplicator()
+    setOutputEncoding(job, encoding, design)
+    return startExportJob(job, workItems, synchronous)
+
+
+def setOutputEncoding(job, encoding, design):
+    job.encoding = encoding
+    if encoding != ENCODING_ZIP:
+        return
+
+    # The files only exist inside the archive, so there is nothing in the
+    # folder to skip, resume or link to, and their names only have to be
+    # unique within the archive.
+    archiveName = INVALID_FILENAME_PATTERN.sub('', design.rootComponent.name) + '.zip'
+    job.archiveName, archivePath = resolveFilePath(job, archiveName)
+    job.archive = BatchArchive(archivePath, config.COMPRESSION_LEVEL, getTempFilePath(archivePath))
+    job.allocator = NameAllocator(None)
+    job.skipUnchanged = False
+    job.resume = False
+    job.dedup = None
+
+
+def startExportJob(job, workItems, synchronous=False):
+    global active_export
+
+    if synchronous:
+        # Run every item in one chunk, without yielding to the UI in between
+        job.scheduler = BatchScheduler(
+            workItems,
+            lambda item: exportWorkItem(job, item),
+            lambda: None,
+            onComplete=lambda scheduler: finishExport(job),
+            sliceSeconds=float('inf'),
+        )
+        active_export = job
+        try:
+            job.scheduler.start()
+            while not job.scheduler.finished:
+                job.scheduler.runChunk()
+        finally:
+            active_export = None
+        return job
+
+    progressDialog = None
+    if job.interactive:
+        progressDialog = ui.createProgressDialog()
+        progressDialog.cancelButtonText = 'Cancel'
+        progressDialog.isBackgroundTranslucent = False
+        progressDialog.isCancelButtonShown = True
+        progressDialog.show(CMD_NAME, 'Exported %v of %m bodies', 0, len(workItems))
+        job.progressDialog = progressDialog
+
+    # Export the bodies in time-sliced chunks driven by a custom event so
+    # Fusion stays responsive and the export can be cancelled.
+    job.scheduler = BatchScheduler(
+        workItems,
+        lambda item: exportWorkItem(job, item),
+        lambda: app.fireCustomEvent(EXPORT_EVENT_ID),
+        isCancelled=lambda: progressDialog is not None and progressDialog.wasCancelled,
+        onProgress=lambda scheduler: updateExportProgress(job),
+        onComplete=lambda scheduler: finishExport(job),
+        sliceSeconds=EXPORT_SLICE_SECONDS,
+    )
+    active_export = job
+    try:
+        job.scheduler.start()
+    except:
+        active_export = None
+        raise
+    return job
+
+
+class ExportJob:
+    """State of a batch export while its work items are processed."""
+
+    def __init__(self, exportFolder, exportMgr, replace, skipUnchanged, engine, resume=False):
+        self.exportFolder = exportFolder
+        self.exportMgr = exportMgr
+        self.replace = replace
+        self.skipUnchanged = skipUnchanged
+        self.engine = engine
+        self.exportCache = ExportCache(exportFolder)
+        self.journal = ExportJournal(exportFolder)
+        self.resume = resume
+        # Write to the name the last export of a file used instead of the requested one
+        self.overwriteWritten = False
+
+        # An interrupted run leaves its unfinished files behind under their
+        # temporary names, clear them before the folder is listed.
+        if resume:
+            removePartialFiles(exportFolder)
+        self.allocator = NameAllocator(None if replace else exportFolder)
+        self.exportedFiles = []
+        self.skippedFiles = []
+        self.records = []
+        self.failedCount = 0
+        self.interactive = True
+        self.writeManifest = True
+        self.progressDialog = None
+        self.scheduler = None
+        self.pipeline = createPostProcessPipeline()
+        if self.pipeline:
+            self.pipeline.stages.append(makeJournalStage(self.journal))
+        self.package = None
+        self.packageName = None
+        self.dedup = None
+        self.outputFormat = FORMAT_STL
+        self.encoding = ENCODING_PLAIN
+        self.archive = None
+        self.archiveName = None
+        self.onFinished = None
+
+
+# Export job currently being processed by the custom event, if any.
+active_export = None
+
+
+# This event handler is called for every chunk of a running batch export.
+def export_chunk(args: adsk.core.CustomEventArgs):
+    if active_export:
+        active_export.scheduler.runChunk()
+
+
+def exportWorkItem(job, item):
+    body, fileName, refinement = item
+    try:
+        body = adsk.fusion.BRepBody.cast(body)
+
+        # Stream the body into the package instead of writing a file of its own
+        if job.package:
+            sizeBefore = job.package.size
+            objectName = os.path.splitext(fileName)[0]
+            with futil.span('export.tessellate'):
+                mesh = calculateBodyMesh(body, refinement)
+            with futil.span('export.writePackage'):
+                job.package.addMesh(objectName, mesh.nodeCoordinatesAsFloat, mesh.nodeIndices)
+            job.exportedFiles.append(objectName)
+            futil.count('bodies.exported')
+            return job.package.size - sizeBefore
+
+        fileName = getOutputFileName(fileName, job.outputFormat, job.encoding)
+        requestedName = fileName
+
+        # Skip bodies whose last export to this folder is still up to date
+        meshSettingsKey = MESH_SETTINGS_KEY
+        if refinement:
+            meshSettingsKey = f"Custom({refinement.surfaceDeviation:.6g},{refinement.normalDeviation:.6g})|binary"
+        cacheKey = ExportCache.makeKey(body.revisionId, f"{meshSettingsKey}|{job.engine}|{job.outputFormat}|{job.encoding}")
+        with futil.span('export.cacheCheck'):
+            isFresh = job.skipUnchanged and job.exportCache.isFresh(requestedName, cacheKey)
+        if isFresh:
+            writtenName = job.exportCache.writtenName(requestedName)
+            job.skippedFiles.append(writtenName)
+            job.records.append(makeExportRecord(body, writtenName, 'skipped'))
+            futil.count('bodies.skipped')
+            return 0
+
+        # Skip bodies an interrupted run already finished
+        with futil.span('export.journalCheck'):
+            isJournaled = job.resume and job.journal.isComplete(requestedName, cacheKey)
+        if isJournaled:
+            writtenName = job.journal.writtenName(requestedName)
+            job.skippedFiles.append(writtenName)
+            job.exportCache.record(requestedName, cacheKey, writtenName)
+            job.records.append(makeExportRecord(body, writtenName, 'resumed'))
+            futil.count('bodies.resumed')
+            return 0
+
+        with futil.span('export.resolveFilename'):
+            if job.overwriteWritten:
+                fileName = job.exportCache.writtenName(requestedName)
+            fileName, filePath = resolveFilePath(job, fileName)
+
+        # Files are written under a temporary name and renamed once complete,
+        # so a crash never leaves a partial file under the final name.
+        tempPath = getTempFilePath(filePath)
+
+        # Repeated instances of a component reuse the file of the first one.
+        # Like exported files, they go through the background stages.
+        fingerprint = getGeometryFingerprint(body, refinement) if job.dedup else None
+        sourcePath = None
+        if fingerprint and job.dedup.find(fingerprint):
+            with futil.span('export.linkDuplicate'):
+                sourcePath = job.dedup.materialize(fingerprint, filePath, tempPath)
+        else:
+            exportStart = time.perf_counter()
+            fileSize = writeBodyFile(job, body, fileName, filePath, tempPath, refinement)
+
+            # Files in the archive are neither cached, journaled nor post-processed
+            if job.archive:
+                job.exportedFiles.append(fileName)
+                job.records.append(makeExportRecord(body, fileName, 'exported'))
+                futil.count('bodies.exported')
+                futil.count('bytes.written', fileSize)
+                return fileSize
+
+            # Stages may replace the file, so repeats are created from a
+            # snapshot of it. The temporary name is free again by now.
+            if fingerprint:
+                snapshotPath = tempPath if job.pipeline else None
+                job.dedup.register(fingerprint, filePath, time.perf_counter() - exportStart, snapshotPath)
+
+        job.exportedFiles.append(fileName)
+        job.exportCache.record(requestedName, cacheKey, fileName)
+        record = makeExportRecord(body, fileName, 'exported')
+        if sourcePath:
+            record['sameAs'] = os.path.basename(sourcePath)
+        job.records.append(record)
+
+        # Hand the finished file to the background stages while the next body is
+        # exported. The last stage journals it, once the other stages are done with it.
+        if job.pipeline:
+            with futil.span('export.submitPostProcess'):
+                job.pipeline.submit(filePath, {'bodyName': body.name, 'journal': (requestedName, cacheKey, fileName)})
+        else:
+            journalExport(job, requestedName, cacheKey, fileName)
 
-            except Exception as e:
-                ui.messageBox(f'Failed to export body "{body.name}": {str(e)}')
-                futil.log("Failed to export:\n{}".format(traceback.format_exc()))
+        if sourcePath:
+            futil.count('bodies.reused')
+            return 0
 
-        # Show completion message
-        if successCount > 0:
-            fileList = "\n".join(f"• {file}" for file in exportedFiles)
-            text_message = f"Successfully exported {successCount} of {len(selectedBodies)} bodies to:\n{exportFolder}\n\nFiles created:\n{fileList}"
-            returnValue = ui.messageBox(text_message, 'Open location?', 3)
+        fileSize = os.path.getsize(filePath)
+        futil.count('bodies.exported')
+        futil.count('bytes.written', fileSize)
+        return fileSize
 
-            if returnValue == 2:
-                openFolderLocation(exportFolder)
+    except Exception as e:
+        job.failedCount += 1
+        futil.count('bodies.failed')
+        if job.interactive:
+            ui.messageBox(f'Failed to export body "{body.name}": {str(e)}')
+        futil.log("Failed to export:\n{}".format(traceback.format_exc()))
+        return 0
 
-            saveLastUsedFolder(exportFolder)
 
+def writeBodyFile(job, body, fileName, filePath, tempPath, refinement):
+    # Exports the body to filePath, or adds it to the archive, through tempPath.
+    # Returns the size of the file written.
+    rawPath = tempPath
+    if job.encoding == ENCODING_GZIP:
+        rawPath = getTempFilePath(filePath[:-len('.gz')])
+    try:
+        with futil.span('export.writeBody'):
+            if job.outputFormat == FORMAT_PLY:
+                exportBodyIndexed(body, rawPath, refinement, writeBinaryPly)
+            elif job.outputFormat == FORMAT_OBJ:
+                exportBodyIndexed(body, rawPath, refinement, writeObj)
+            elif job.engine == ENGINE_NATIVE:
+                exportBodyNative(body, rawPath, refinement)
+            else:
+                exportBodyFusion(job.exportMgr, body, rawPath, refinement)
+
+        if job.encoding == ENCODING_GZIP:
+            with futil.span('export.compress'):
+                gzipFile(rawPath, tempPath, config.COMPRESSION_LEVEL)
+            os.remove(rawPath)
+
+        fileSize = os.path.getsize(tempPath)
+        if job.archive:
+            with futil.span('export.archive'):
+                job.archive.addFile(tempPath, fileName)
+            os.remove(tempPath)
         else:
-            futil.log("No bodies were exported successfully.")
+            os.replace(tempPath, filePath)
+    except:
+        for path in {rawPath, tempPath}:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return fileSize
+
+
+def getOutputFileName(fileName, outputFormat, encoding=ENCODING_PLAIN):
+    if fileName.lower().endswith('.gz'):
+        fileName = fileName[:-len('.gz')]
+
+    # The filenames in the table end in .stl, swap it for the chosen format
+    if outputFormat != FORMAT_STL:
+        extension = FORMAT_EXTENSIONS[outputFormat]
+        name, ext = os.path.splitext(fileName)
+        if ext.lower() != extension:
+            fileName = (name if ext.lower() == '.stl' else fileName) + extension
+
+    if encoding == ENCODING_GZIP:
+        fileName += '.gz'
+    return fileName
+
+
+def getTempFilePath(filePath):
+    # Keep the extension, the Fusion exporter adds .stl to any other name
+    folder, fileName = os.path.split(filePath)
+    name, ext = os.path.splitext(fileName)
+    return os.path.join(folder, f".{name}.partial{ext}")
+
+
+def removePartialFiles(folder):
+    # Removes the files getTempFilePath names, left behind by an interrupted export
+    try:
+        with os.scandir(folder) as entries:
+            partialPaths = [
+                entry.path for entry in entries
+                if entry.name.startswith('.') and os.path.splitext(entry.name)[0].endswith('.partial')
+            ]
+    except OSError:
+        return
+
+    for filePath in partialPaths:
+        try:
+            os.remove(filePath)
+            futil.log(f"Removed unfinished file {filePath}")
+        except OSError:
+            futil.log(f"Failed to remove unfinished file {filePath}")
+
+
+def journalExport(job, fileName, cacheKey, writtenName):
+    try:
+        with futil.span('export.journal'):
+            job.journal.record(fileName, cacheKey, writtenName)
+    except OSError:
+        futil.log("Failed to write export journal:\n{}".format(traceback.format_exc()))
+
+
+def makeJournalStage(journal):
+    def journalStage(filePath, info):
+        if 'journal' in info:
+            journal.record(*info['journal'], sha256=info.get('sha256'))
+
+    return journalStage
+
+
+def getGeometryFingerprint(body, refinement=None):
+    # Occurrences of the same component share the native body, so its token
+    # together with the revision and the mesh refinement identifies the mesh.
+    nativeBody = body.nativeObject or body
+    meshSettings = 'Medium'
+    if refinement:
+        meshSettings = f"Custom({refinement.surfaceDeviation:.6g},{refinement.normalDeviation:.6g})"
+    return f"{nativeBody.entityToken}|{body.revisionId}|{meshSettings}"
+
+
+def makeExportRecord(body, fileName, status):
+    assemblyContext = body.assemblyContext
+    return {
+        'file': fileName,
+        'body': body.name,
+        'component': assemblyContext.fullPathName if assemblyContext else '',
+        'revisionId': body.revisionId,
+        'entityToken': body.entityToken,
+        'status': status,
+    }
+
+
+def resolveFilePath(job, fileName):
+    # Pick a name that is free in this batch and, unless replacing, in the export folder
+    fileName = job.allocator.allocate(fileName)
+    return fileName, os.path.join(job.exportFolder, fileName)
+
+
+def createPostProcessPipeline():
+    stages = []
+    if config.POST_EXPORT_DECIMATE_RATIO > 0 or config.POST_EXPORT_DECIMATE_MAX_TRIANGLES > 0:
+        stages.append(makeDecimateStage(
+            config.POST_EXPORT_DECIMATE_RATIO,
+            config.POST_EXPORT_DECIMATE_MAX_TRIANGLES,
+            config.POST_EXPORT_DECIMATE_MAX_FACETS,
+        ))
+    if config.POST_EXPORT_VERIFY:
+        stages.append(makeVerifyStage(config.POST_EXPORT_VERIFY_MAX_EDGE_FACETS))
+    if config.POST_EXPORT_CHECKSUM:
+        stages.append(checksumStage)
+    if config.POST_EXPORT_COPY_FOLDER:
+        stages.append(makeCopyStage(os.path.expanduser(config.POST_EXPORT_COPY_FOLDER)))
+
+    uploader = None
+    workers = config.POST_EXPORT_WORKERS
+    if config.POST_EXPORT_UPLOAD_URL:
+        uploader = HttpUploader(
+            config.POST_EXPORT_UPLOAD_URL,
+            config.POST_EXPORT_UPLOAD_METHOD,
+            config.POST_EXPORT_UPLOAD_HEADERS,
+            config.POST_EXPORT_UPLOAD_CONNECTIONS,
+            config.POST_EXPORT_UPLOAD_RETRIES,
+        )
+        stages.append(makeUploadStage(uploader))
+        # Enough workers to keep every connection busy
+        workers = max(workers, config.POST_EXPORT_UPLOAD_CONNECTIONS)
+
+    if not stages:
+        return None
+    stages = [futil.profiled(f"postProcess.{stage.__name__}")(stage) for stage in stages]
+    pipeline = PostProcessPipeline(stages, workers, max(config.POST_EXPORT_MAX_PENDING, workers))
+    if uploader:
+        pipeline.cleanups.append(uploader.close)
+    return pipeline
+
+
+def updateExportProgress(job):
+    if not job.progressDialog:
+        return
+
+    scheduler = job.scheduler
+    eta = scheduler.eta
+    etaText = f", about {eta:.0f} s remaining" if eta is not None and scheduler.index < scheduler.total else ""
+
+    job.progressDialog.progressValue = scheduler.index
+    job.progressDialog.message = (
+        f"Exported %v of %m bodies, {scheduler.bytesWritten / 1e6:.1f} MB written{etaText}"
+    )
+
+
+def finishExport(job):
+    global active_export
+    active_export = None
+
+    scheduler = job.scheduler
+    exportFolder = job.exportFolder
+    successCount = len(job.exportedFiles)
+    if job.progressDialog:
+        job.progressDialog.hide()
+
+    # Finish the package with whatever bodies made it in, even when cancelled
+    if job.package:
+        try:
+            job.package.close()
+            if job.pipeline:
+                job.pipeline.submit(job.package.filePath, {'bodyCount': successCount})
+        except:
+            successCount = 0
+            futil.log("Failed to write 3MF package:\n{}".format(traceback.format_exc()))
+
+    # The archive is kept with whatever files made it in as well
+    if job.archive:
+        try:
+            job.archive.close()
+            if job.pipeline:
+                job.pipeline.submit(job.archive.filePath, {'fileCount': successCount})
+        except:
+            successCount = 0
+            futil.log("Failed to write zip archive:\n{}".format(traceback.format_exc()))
+
+    futil.log(
+        f"Export finished in {scheduler.elapsed:.2f} s over {scheduler.chunkCount} chunks, "
+        f"longest chunk {scheduler.maxChunkSeconds * 1000:.0f} ms"
+    )
+
+    # Wait for the background stages to finish with the exported files
+    postErrors = []
+    processedFiles = []
+    decimated = []
+    decimationSkipped = []
+    uploadedCount = 0
+    verified = []
+    if job.pipeline:
+        with futil.span('finish.waitPostProcess'):
+            results = job.pipeline.wait()
+        for filePath, info, error in results:
+            if error:
+                postErrors.append(f"• {os.path.basename(filePath)}: {error}")
+                futil.log(f"Post-processing failed for {filePath}: {error}")
+                continue
+            processedFiles.append(os.path.basename(filePath))
+            if 'decimation' in info:
+                decimated.append(info['decimation'])
+            if 'decimationSkipped' in info:
+                decimationSkipped.append(os.path.basename(filePath))
+            if 'verification' in info:
+                verified.append((os.path.basename(filePath), info['verification']))
+            if 'uploadStatus' in info:
+                uploadedCount += 1
+
+    if job.dedup:
+        try:
+            job.dedup.close()
+        except OSError:
+            futil.log("Failed to remove geometry snapshots:\n{}".format(traceback.format_exc()))
+
+    # Stages may have rewritten files, record them as they are now
+    try:
+        with futil.span('finish.saveCache'):
+            job.exportCache.restat(processedFiles)
+            job.exportCache.save()
+    except OSError:
+        futil.log("Failed to save export cache:\n{}".format(traceback.format_exc()))
+
+    try:
+        with futil.span('finish.journal'):
+            job.journal.close()
+    except OSError:
+        futil.log("Failed to update export journal:\n{}".format(traceback.format_exc()))
+
+    manifestChanges = None
+    if job.writeManifest:
+        manifestRecords = job.records
+
+        # A package or archive is listed as a whole, with the files inside it
+        containerName = job.packageName if job.package else job.archiveName
+        if containerName:
+            manifestRecords = [{
+                'file': containerName,
+                'status': 'exported',
+                'contents': list(job.exportedFiles),
+            }]
+
+        try:
+            with futil.span('finish.writeManifest'):
+                _, manifestChanges = writeManifest(
+                    exportFolder, manifestRecords, config.MANIFEST_HASH_WORKERS, job.journal.digests
+                )
+            for fileName, error in manifestChanges['failed'].items():
+                futil.log(f"Failed to describe {fileName} in the manifest: {error}")
+        except OSError:
+            futil.log("Failed to write manifest:\n{}".format(traceback.format_exc()))
+
+    writeProfile(job)
+
+    if job.onFinished:
+        job.onFinished(job)
+
+    # Show completion message
+    if successCount > 0 or job.skippedFiles:
+        fileList = "\n".join(f"• {file}" for file in job.exportedFiles[:MAX_LISTED_FILES])
+        if len(job.exportedFiles) > MAX_LISTED_FILES:
+            fileList += f"\n… and {len(job.exportedFiles) - MAX_LISTED_FILES} more"
+        text_message = (
+            f"Exported {successCount}, skipped {len(job.skippedFiles)} unchanged or already done, failed {job.failedCount} "
+            f"of {scheduler.total} bodies to:\n{exportFolder}"
+        )
+        if scheduler.cancelled:
+            text_message = f"Export cancelled after {scheduler.index} of {scheduler.total} bodies.\n\n" + text_message
+        if job.package and successCount:
+            text_message += f"\n\nPackage created:\n• {job.packageName}\n\nBodies:\n{fileList}"
+        elif job.archive and successCount:
+            text_message += f"\n\nArchive created:\n• {job.archiveName}\n\nFiles:\n{fileList}"
+        elif job.exportedFiles:
+            text_message += f"\n\nFiles created:\n{fileList}"
+        if job.dedup and job.dedup.reusedCount:
+            text_message += (
+                f"\n\nReused identical geometry for {job.dedup.reusedCount} bodies, saving about "
+                f"{job.dedup.secondsSaved:.1f} s of tessellation and {job.dedup.linkedBytes / 1e6:.1f} MB of disk space."
+            )
+        if decimated:
+            text_message += (
+                f"\n\nDecimated {len(decimated)} files from {sum(d['before'] for d in decimated):,} "
+                f"to {sum(d['after'] for d in decimated):,} triangles, largest vertex deviation "
+                f"{max(d['maxError'] for d in decimated):.3f} mm, "
+                f"{sum(d['seconds'] for d in decimated):.1f} s."
+            )
+        if decimationSkipped:
+            text_message += (
+                f"\n\nNot decimated, over {config.POST_EXPORT_DECIMATE_MAX_FACETS:,} facets: "
+                + ", ".join(decimationSkipped)
+            )
+        if verified:
+            # Files with problems first, they are what the list is for
+            verified.sort(key=lambda item: not hasProblems(item[1]))
+            problemCount = sum(1 for _, report in verified if hasProblems(report))
+            reportList = "\n".join(
+                f"• {fileName}: {describeVerification(report)}" for fileName, report in verified[:MAX_LISTED_FILES]
+            )
+            if len(verified) > MAX_LISTED_FILES:
+                reportList += f"\n… and {len(verified) - MAX_LISTED_FILES} more"
+            text_message += f"\n\nVerified {len(verified)} STL files, {problemCount} with problems:\n{reportList}"
+        if uploadedCount:
+            text_message += f"\n\nUploaded {uploadedCount} files to {config.POST_EXPORT_UPLOAD_URL}"
+        if manifestChanges:
+            text_message += (
+                f"\n\nSince the previous manifest {len(manifestChanges['added'])} files were added, "
+                f"{len(manifestChanges['changed'])} changed and {len(manifestChanges['removed'])} removed."
+            )
+            if manifestChanges['failed']:
+                text_message += f" {len(manifestChanges['failed'])} files could not be read for the manifest."
+        if postErrors:
+            text_message += "\n\nPost-processing failed:\n" + "\n".join(postErrors)
+
+        if not job.interactive:
+            futil.log(text_message)
+            return
+
+        returnValue = ui.messageBox(text_message, 'Open location?', 3)
+
+        if returnValue == 2:
+            openFolderLocation(exportFolder)
+
+        saveLastUsedFolder(exportFolder)
+
+    else:
+        futil.log("No bodies were exported successfully.")
+
+
+def writeProfile(job):
+    if not futil.is_profiling():
+        return
+
+    futil.log(f"Export timings:\n{futil.profile_summary()}")
+    try:
+        futil.write_profile(
+            os.path.join(job.exportFolder, PROFILE_TRACE_FILENAME),
+            os.path.join(job.exportFolder, PROFILE_SUMMARY_FILENAME),
+        )
+    except OSError:
+        futil.log("Failed to write profile:\n{}".format(traceback.format_exc()))
+
+
+# Watch mode state. Bodies are watched by entity token, with their filename and
+# refinement from the export that started watching as payload.
+watch_state = WatchState(config.WATCH_DEBOUNCE_SECONDS)
+watch_settings = {}
+watch_timer = None
+
+
+def watchBodies(workItems, exportFolder, engine, outputFormat, encoding, reuseGeometry):
+    watch_state.watch(
+        (body.entityToken, body.revisionId, (fileName, refinement))
+        for body, fileName, refinement in workItems
+    )
+    watch_settings.clear()
+    watch_settings.update(
+        exportFolder=exportFolder,
+        engine=engine,
+        outputFormat=outputFormat,
+        encoding=encoding,
+        reuseGeometry=reuseGeometry,
+    )
+    futil.log(f"Watching {len(workItems)} bodies for changes")
 
+
+def scheduleWatchCheck(delay):
+    global watch_timer
+
+    # A running timer checks the remaining debounce time itself when it fires
+    if watch_timer and watch_timer.is_alive():
+        return
+    watch_timer = threading.Timer(delay, app.fireCustomEvent, (WATCH_EVENT_ID,))
+    watch_timer.daemon = True
+    watch_timer.start()
+
+
+# This event handler is called for saves and completed commands, which may have changed watched bodies.
+def watch_design_changed(args: adsk.core.EventArgs):
+    delay = watch_state.notify()
+    if delay is not None:
+        scheduleWatchCheck(delay)
+
+
+# This event handler is called on the main thread when the debounce timer of watch mode fires.
+def watch_check(args: adsk.core.CustomEventArgs):
+    remaining = watch_state.remaining()
+    if remaining is None:
+        return
+
+    # Wait until the design has settled and no other export is running
+    if remaining > 0 or active_export:
+        scheduleWatchCheck(remaining or watch_state.debounceSeconds)
+        return
+
+    bodies = findWatchedBodies()
+    changed = watch_state.poll(lambda key: bodies[key].revisionId if key in bodies else None)
+    if changed:
+        startWatchExport(bodies, changed)
+
+
+def findWatchedBodies():
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    bodies = {}
+    if not design:
+        return bodies
+
+    for token in watch_state.keys():
+        for entity in design.findEntityByToken(token):
+            body = adsk.fusion.BRepBody.cast(entity)
+            if body and body.isValid:
+                bodies[token] = body
+                break
+    return bodies
+
+
+def startWatchExport(bodies, changed):
+    try:
+        design = adsk.fusion.Design.cast(app.activeProduct)
+        settings = watch_settings
+        job = ExportJob(settings['exportFolder'], design.exportManager, True, False, settings['engine'])
+        job.outputFormat = settings['outputFormat']
+        job.encoding = settings['encoding']
+        job.interactive = False
+        if settings['reuseGeometry']:
+            job.dedup = GeometryDeduplicator()
+        job.onFinished = lambda job: finishWatchExport(job, changed)
+
+        # Overwrite the files the bodies were last written to, which may have a (n) counter
+        job.overwriteWritten = True
+        workItems = [(bodies[key], fileName, refinement) for key, revisionId, (fileName, refinement) in changed]
+
+        futil.log(f"Watch mode is exporting {len(workItems)} changed bodies")
+        startExportJob(job, workItems)
     except:
-        futil.log("Failed to export:\n{}".format(traceback.format_exc()))
+        watch_state.finish({})
+        futil.log("Failed to export changed bodies:\n{}".format(traceback.format_exc()))
 
 
-def generateFilename(bodyName, versionNumber, prefix, suffix, formattingStyleIndex):
-    # Remove invalid characters
-    name = re.sub(r'[<>:"/\\|?*\x00-\x1F]', '', bodyName)
-    # Remove trailing spaces or dots
-    name.rstrip(" .")
+def finishWatchExport(job, changed):
+    # Instances of a component share their revision, their records are told apart by token
+    exportedKeys = {record['entityToken'] for record in job.records}
+    remaining = watch_state.finish(
+        {key: revisionId for key, revisionId, payload in changed if key in exportedKeys}
+    )
 
-    versionStr = str(versionNumber).strip()
+    # Bodies changed again while they were exported
+    if remaining is not None:
+        scheduleWatchCheck(remaining)
 
-    nameSplit, ext = os.path.splitext(name)
-    
-    # Replace hyphens, underscores, and spaces with a single space
-    nameSplit = re.sub(r"[-_ ]+", " ", nameSplit)
-
-    # Insert space before uppercase letters that follow lowercase (e.g., fileName → file Name)
-    nameSplit = re.sub(r"([a-z])([A-Z])", r"\1 \2", nameSplit)
-
-    # Split into words and lowercase them all
-    words = nameSplit.lower().split()
-
-    if formattingStyleIndex == 1: #PascalCase
-        name = ''.join(w.capitalize() for w in words) + ext
-        versionStr = f"V{versionStr}" if versionStr else ""
-    elif formattingStyleIndex == 2: #camelCase
-        name = words[0] + ''.join(w.capitalize() for w in words[1:]) + ext
-        versionStr = f"V{versionStr}" if versionStr else ""
-    elif formattingStyleIndex == 3: #snake_case
-        name = '_'.join(words) + ext
-        versionStr = f"_v{versionStr}" if versionStr else ""
-    elif formattingStyleIndex == 4: #kebab-case
-        name = '-'.join(words) + ext
-        versionStr = f"-v{versionStr}" if versionStr else ""
-    elif formattingStyleIndex == 5: #space separated
-        name = ' '.join(words) + ext
-        versionStr = f" v{versionStr}" if versionStr else ""
+
+def exportBodyFusion(exportMgr, body, filePath, refinement=None):
+    # Create STL export options
+    stlOptions = exportMgr.createSTLExportOptions(body)
+
+    # Set export options
+    stlOptions.filename = filePath
+    if refinement:
+        stlOptions.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementCustom
+        stlOptions.surfaceDeviation = refinement.surfaceDeviation
+        stlOptions.normalDeviation = refinement.normalDeviation
     else:
-        pass
+        stlOptions.meshRefinement = (
+            adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+        )
+    stlOptions.isBinaryFormat = True  # Binary STL is more compact
+
+    exportMgr.execute(stlOptions)
+
+
+def exportBodyNative(body, filePath, refinement=None):
+    mesh = calculateBodyMesh(body, refinement)
+    return writeBinaryStl(filePath, mesh.nodeCoordinatesAsFloat, mesh.nodeIndices)
+
+
+def exportBodyIndexed(body, filePath, refinement, writer):
+    mesh = calculateBodyMesh(body, refinement)
+    return writer(filePath, mesh.nodeCoordinatesAsFloat, mesh.nodeIndices)
+
 
-    return f'{prefix}{name}{versionStr}{suffix}.stl'
+def calculateBodyMesh(body, refinement=None):
+    calculator = body.meshManager.createMeshCalculator()
+    if refinement:
+        calculator.surfaceTolerance = refinement.surfaceDeviation
+        calculator.maxNormalDeviation = refinement.normalDeviation
+    else:
+        # The quality matching MeshRefinementMedium
+        calculator.setQuality(adsk.fusion.TriangleMeshQualityOptions.NormalQualityTriangleMesh)
+    return calculator.calculate()
+
+
+def planBodyRefinement(bodies, adaptive, triangleBudget=0):
+    # None keeps the fixed Medium refinement
+    if not adaptive:
+        return [None] * len(bodies)
+    return planRefinement([getBodySize(body) for body in bodies], triangleBudget)
+
+
+# Bounding box diagonal of each body in cm, keyed by revisionId.
+body_sizes = {}
+
+
+def getBodySize(body):
+    size = body_sizes.get(body.revisionId)
+    if size is None:
+        boundingBox = body.boundingBox
+        size = boundingBox.minPoint.distanceTo(boundingBox.maxPoint)
+        body_sizes[body.revisionId] = size
+    return size
+
+
+# Surface area of each body in cm², keyed by revisionId.
+body_areas = {}
+
+
+def getBodyArea(body):
+    area = body_areas.get(body.revisionId)
+    if area is None:
+        area = body.area
+        body_areas[body.revisionId] = area
+    return area
+
+
+# Index of the bodies in the design for the rule based selection. It is synced
+# once per dialog session, computing the volume only of bodies that changed since.
+body_index = BodyIndex()
+body_index_synced = False
+
+
+def queryBodies(design, text):
+    global body_index_synced
+
+    # Parse first so an invalid query doesn't wait for the index
+    query = parseQuery(text)
+    if not body_index_synced:
+        with futil.span('query.syncIndex'):
+            readCount = body_index.sync(iterDesignBodies(design.rootComponent))
+        body_index_synced = True
+        futil.log(f"Indexed {len(body_index)} bodies, computed the volume of {readCount}")
+
+    with futil.span('query.match'):
+        return body_index.query(query)
+
+
+def iterDesignBodies(rootComp):
+    for body in rootComp.bRepBodies:
+        yield body.entityToken, body.revisionId, body, readBodyProperties, readBodyVolume
+    for occurrence in rootComp.allOccurrences:
+        for body in occurrence.bRepBodies:
+            yield body.entityToken, body.revisionId, body, readBodyProperties, readBodyVolume
+
+
+def readBodyProperties(body):
+    assemblyContext = body.assemblyContext
+    material = body.material
+    return (
+        body.name,
+        assemblyContext.fullPathName if assemblyContext else '',
+        material.name if material else '',
+        body.isVisible,
+    )
+
+
+def readBodyVolume(body):
+    return body.volume
+
+
+def getExportName(body, rootComp):
+    # Bodies left with the default name take the name of their component instead
+    if body.name == 'Body1' and body.parentComponent != rootComp:
+        return body.parentComponent.name
+    return body.name
+
+
+def generateFilename(bodyName, versionNumber, prefix, suffix, formattingStyleIndex):
+    return filename_generator.generate(bodyName, versionNumber, prefix, suffix, formattingStyleIndex)
 
 
 def getLastUsedFolder():
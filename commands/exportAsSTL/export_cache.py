@@ -0,0 +1,93 @@
+import json
+import os
+
+# Name of the index file written next to the exported files.
+CACHE_FILENAME = '.exporttools-cache.json'
+CACHE_VERSION = 1
+
+
+class ExportCache:
+    """Persistent index of the files written by previous exports.
+
+    Each entry maps the filename requested for a body to the key it was
+    exported with (body revision and mesh settings), the name the file was
+    actually written under, and the size and modification time of that file.
+    A body can be skipped when its key is unchanged and the file on disk has
+    not been touched since.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, CACHE_FILENAME)
+        self._entries = {}
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def makeKey(revisionId, meshSettings):
+        return f'{revisionId}|{meshSettings}'
+
+    def load(self):
+        self._entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self._entries = data.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            # A missing or corrupt index simply means nothing is cached.
+            self._entries = {}
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        # Write to a temporary file first so a crash never leaves a truncated index.
+        tempPath = self.path + '.tmp'
+        with open(tempPath, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': self._entries}, f, indent=1)
+        os.replace(tempPath, self.path)
+        self._dirty = False
+
+    def isFresh(self, fileName, key):
+        entry = self._entries.get(fileName)
+        if not entry or entry.get('key') != key:
+            return False
+
+        try:
+            stat = os.stat(os.path.join(self.folder, entry.get('file', fileName)))
+        except OSError:
+            return False
+
+        return stat.st_size == entry.get('size') and stat.st_mtime_ns == entry.get('mtime')
+
+    def writtenName(self, fileName):
+        entry = self._entries.get(fileName)
+        return entry.get('file', fileName) if entry else fileName
+
+    def record(self, fileName, key, writtenName=None):
+        writtenName = writtenName or fileName
+        try:
+            stat = os.stat(os.path.join(self.folder, writtenName))
+        except OSError:
+            self.discard(fileName)
+            return
+
+        self._entries[fileName] = {
+            'key': key,
+            'file': writtenName,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+        }
+        self._dirty = True
+
+    def restat(self, writtenNames):
+        """Updates the size and modification time recorded for files changed after export."""
+        writtenNames = set(writtenNames)
+        for fileName, entry in self._entries.items():
+            if entry.get('file') in writtenNames:
+                self.record(fileName, entry['key'], entry['file'])
+
+    def discard(self, fileName):
+        if self._entries.pop(fileName, None) is not None:
+            self._dirty = True
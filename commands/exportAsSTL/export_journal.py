@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .post_process import fileSha256
+
+# Name of the journal kept in the export folder.
+JOURNAL_FILENAME = '.exporttools-journal.jsonl'
+JOURNAL_VERSION = 1
+
+# The journal is rewritten with only the latest entry of each file once it
+# holds this many times more lines than files.
+COMPACT_RATIO = 4
+
+
+class ExportJournal:
+    """Append-only record of the files completed by export runs.
+
+    Every finished file is appended as one JSON line with its size and
+    modification time, and flushed to disk right away, so the journal
+    survives a crash or a cancelled run. Its SHA-256 checksum is computed on
+    a background thread, unless it is known already, and appended as a
+    further line for the file. A later run can skip the files that are in
+    the journal for the same cache key and still match their size and
+    checksum on disk, or their size and modification time while the checksum
+    is missing. When a file appears more than once the last line wins, and a
+    line cut short by a crash is ignored.
+
+    Files can be recorded from post-processing worker threads.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, JOURNAL_FILENAME)
+        self._entries = {}
+        self._lineCount = 0
+        self._file = None
+        self.digests = {}
+        self._needsNewline = False
+        self._lock = threading.Lock()
+        self._hasher = None
+        self._pending = []
+        self.load()
+
+    def load(self):
+        self._entries = {}
+        self._lineCount = 0
+        self._needsNewline = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._lineCount += 1
+                    self._needsNewline = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('version') == JOURNAL_VERSION and 'requested' in entry:
+                        self._entries[entry['requested']] = entry
+        except OSError:
+            pass
+
+    def isComplete(self, fileName, key):
+        """Returns True if fileName was completed with key and is unchanged on disk."""
+        entry = self._entries.get(fileName)
+        if not entry or entry.get('key') != key:
+            return False
+
+        filePath = os.path.join(self.folder, entry['file'])
+        try:
+            stat = os.stat(filePath)
+            if stat.st_size != entry.get('size'):
+                return False
+            if entry.get('sha256'):
+                return fileSha256(filePath) == entry['sha256']
+            return entry.get('mtime') is not None and stat.st_mtime_ns == entry['mtime']
+        except OSError:
+            return False
+
+    def writtenName(self, fileName):
+        entry = self._entries.get(fileName)
+        return entry['file'] if entry else fileName
+
+    def record(self, fileName, key, writtenName=None, sha256=None):
+        """Appends the file written for fileName to the journal.
+
+        The file isn't read here: without sha256 its checksum is computed on
+        a background thread, close waits for it. The size and checksum of
+        the files recorded by this run are kept in digests, by the name they
+        were written to.
+
+        Arguments:
+        fileName -- The filename requested for the body.
+        key -- The cache key of the body and its export settings.
+        writtenName -- The name the file was written to, if it differs from fileName.
+        sha256 -- The checksum of the file if it is known already, so it isn't read again.
+        """
+        writtenName = writtenName or fileName
+        stat = os.stat(os.path.join(self.folder, writtenName))
+        entry = {
+            'version': JOURNAL_VERSION,
+            'requested': fileName,
+            'file': writtenName,
+            'key': key,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha256': sha256,
+            'time': round(time.time(), 3),
+        }
+        with self._lock:
+            self._append(entry)
+            self._entries[fileName] = entry
+            if sha256:
+                self.digests[writtenName] = (entry['size'], sha256)
+                return
+
+            if self._hasher is None:
+                self._hasher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ExportToolsJournal')
+            self._pending.append(self._hasher.submit(self._addChecksum, entry))
+
+    def close(self):
+        """Waits for the pending checksums and closes the journal.
+
+        Raises the first error of a pending checksum, after closing.
+        """
+        with self._lock:
+            hasher, self._hasher = self._hasher, None
+            pending, self._pending = self._pending, []
+        if hasher:
+            hasher.shutdown(wait=True)
+        errors = [future.exception() for future in pending if future.exception()]
+
+        self._close()
+        if errors:
+            raise errors[0]
+
+    def _addChecksum(self, entry):
+        filePath = os.path.join(self.folder, entry['file'])
+        sha256 = fileSha256(filePath)
+        stat = os.stat(filePath)
+        with self._lock:
+            # The file was recorded again or changed meanwhile
+            if self._entries.get(entry['requested']) is not entry:
+                return
+            if (stat.st_size, stat.st_mtime_ns) != (entry['size'], entry['mtime']):
+                return
+
+            entry = dict(entry, sha256=sha256, time=round(time.time(), 3))
+            self._append(entry)
+            self._entries[entry['requested']] = entry
+            self.digests[entry['file']] = (entry['size'], sha256)
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        # Drop the superseded lines of files exported many times
+        if self._lineCount > COMPACT_RATIO * max(len(self._entries), 1):
+            tempPath = self.path + '.tmp'
+            with open(tempPath, 'w', encoding='utf-8') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(tempPath, self.path)
+            self._lineCount = len(self._entries)
+
+    def _append(self, entry):
+        if not self._file:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+        # Don't continue a line left unfinished by a crash
+        if self._needsNewline:
+            self._file.write('\n')
+            self._needsNewline = False
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._lineCount += 1
@@ -0,0 +1,77 @@
+import os
+import re
+
+from .filename_validator import INVALID_FILENAME_PATTERN
+
+# Runs of hyphens, underscores and spaces separate words.
+_SEPARATOR_PATTERN = re.compile(r"[-_ ]+")
+# A lowercase letter followed by an uppercase one starts a new word (e.g. fileName → file Name).
+_CAMEL_BOUNDARY_PATTERN = re.compile(r"([a-z])([A-Z])")
+
+STYLE_NONE = 0
+STYLE_PASCAL = 1
+STYLE_CAMEL = 2
+STYLE_SNAKE = 3
+STYLE_KEBAB = 4
+STYLE_SPACE = 5
+
+
+class FilenameGenerator:
+    """Builds export filenames from body names.
+
+    Splitting a body name into words is the expensive part of generating a
+    filename and only depends on the name, so the result is cached per name.
+    Changing the prefix, suffix, version or style then only re-joins the
+    cached words. Create one generator per dialog session.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+
+    def tokenize(self, bodyName):
+        """Returns the (cleanName, words, ext) of a body name, cached."""
+        tokens = self._tokens.get(bodyName)
+        if tokens is None:
+            # Remove invalid characters and trailing spaces or dots
+            name = INVALID_FILENAME_PATTERN.sub('', bodyName).rstrip(" .")
+
+            nameSplit, ext = os.path.splitext(name)
+            nameSplit = _SEPARATOR_PATTERN.sub(" ", nameSplit)
+            nameSplit = _CAMEL_BOUNDARY_PATTERN.sub(r"\1 \2", nameSplit)
+
+            # Split into words and lowercase them all
+            tokens = (name, tuple(nameSplit.lower().split()), ext)
+            self._tokens[bodyName] = tokens
+        return tokens
+
+    def generate(self, bodyName, versionNumber, prefix, suffix, formattingStyleIndex):
+        name, words, ext = self.tokenize(bodyName)
+        versionStr = str(versionNumber).strip()
+
+        if formattingStyleIndex == STYLE_PASCAL:
+            name = ''.join(w.capitalize() for w in words) + ext
+            versionStr = f"V{versionStr}" if versionStr else ""
+        elif formattingStyleIndex == STYLE_CAMEL:
+            name = (words[0] if words else '') + ''.join(w.capitalize() for w in words[1:]) + ext
+            versionStr = f"V{versionStr}" if versionStr else ""
+        elif formattingStyleIndex == STYLE_SNAKE:
+            name = '_'.join(words) + ext
+            versionStr = f"_v{versionStr}" if versionStr else ""
+        elif formattingStyleIndex == STYLE_KEBAB:
+            name = '-'.join(words) + ext
+            versionStr = f"-v{versionStr}" if versionStr else ""
+        elif formattingStyleIndex == STYLE_SPACE:
+            name = ' '.join(words) + ext
+            versionStr = f" v{versionStr}" if versionStr else ""
+
+        return f'{prefix}{name}{versionStr}{suffix}.stl'
+
+    def generateAll(self, bodyNames, versionNumber, prefix, suffix, formattingStyleIndex):
+        """Returns the filenames for a list of body names, in the same order."""
+        return [
+            self.generate(bodyName, versionNumber, prefix, suffix, formattingStyleIndex)
+            for bodyName in bodyNames
+        ]
+
+    def clear(self):
+        self._tokens = {}
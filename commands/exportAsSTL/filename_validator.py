@@ -0,0 +1,69 @@
+import re
+
+# Characters that are not allowed in filenames on any supported platform.
+INVALID_FILENAME_PATTERN = re.compile(r'[<>:"/\\|?*\x00-\x1F]')
+
+
+class FilenameValidator:
+    """Incrementally tracks the validity of the rows in the filename table.
+
+    Rows are identified by a stable key (the id of their input) rather than by
+    position, so deleting a row doesn't touch the others. Every update only
+    re-checks the row that changed: invalid rows are kept in a set and the
+    rows using each name in a name -> rows map, which makes duplicates
+    available without rescanning the table.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._rowsByName = {}
+        self._invalidRows = set()
+        self._duplicateNames = set()
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, rowKey):
+        return rowKey in self._names
+
+    def update(self, rowKey, name):
+        if self._names.get(rowKey) == name and rowKey in self._names:
+            return
+
+        self.remove(rowKey)
+        self._names[rowKey] = name
+
+        if INVALID_FILENAME_PATTERN.search(name):
+            self._invalidRows.add(rowKey)
+
+        rows = self._rowsByName.setdefault(name, set())
+        rows.add(rowKey)
+        if len(rows) > 1:
+            self._duplicateNames.add(name)
+
+    def remove(self, rowKey):
+        if rowKey not in self._names:
+            return
+
+        name = self._names.pop(rowKey)
+        self._invalidRows.discard(rowKey)
+
+        rows = self._rowsByName[name]
+        rows.discard(rowKey)
+        if not rows:
+            del self._rowsByName[name]
+        if len(rows) < 2:
+            self._duplicateNames.discard(name)
+
+    def clear(self):
+        self.__init__()
+
+    def problems(self):
+        """Returns a message for every problem found, empty when all rows are valid."""
+        problems = [
+            f"Filename '{name}' contains invalid characters."
+            for name in sorted(self._names[rowKey] for rowKey in self._invalidRows)
+        ]
+        if self._duplicateNames:
+            problems.append(f"Duplicate filenames found: {', '.join(sorted(self._duplicateNames))}")
+        return problems
@@ -0,0 +1,100 @@
+import os
+import shutil
+
+
+class GeometryDeduplicator:
+    """Exports each unique geometry once and reuses the file for repeats.
+
+    Bodies are matched by a fingerprint supplied by the caller, e.g. the
+    token of the native body, its revision and its mesh refinement, which is
+    shared by every occurrence of a component exported the same way. The
+    first body with a fingerprint is exported normally and registered, later
+    ones get a hardlink to that file, or a copy when the file system doesn't
+    support hardlinks.
+
+    When later stages may replace the registered file, e.g. with a decimated
+    one, a snapshot of the file as exported is kept and the repeats are
+    created from it, so every file goes through those stages once. Call
+    close when the stages are done to remove the snapshots.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._links = []
+        self.reusedCount = 0
+        self.linkedBytes = 0
+        self.secondsSaved = 0.0
+
+    def find(self, fingerprint):
+        """Returns the path of the file already exported for fingerprint, or None."""
+        source = self._sources.get(fingerprint)
+        return source[0] if source else None
+
+    def register(self, fingerprint, filePath, exportSeconds, snapshotPath=None):
+        """Registers the file exported for fingerprint.
+
+        Arguments:
+        fingerprint -- The fingerprint of the body's geometry.
+        filePath -- The exported file.
+        exportSeconds -- The time the export took, saved by every repeat.
+        snapshotPath -- Where to keep the file as it is now, for files that
+                        may be replaced later. None to create repeats from
+                        filePath.
+        """
+        if snapshotPath:
+            if os.path.lexists(snapshotPath):
+                os.remove(snapshotPath)
+            _linkOrCopy(filePath, snapshotPath)
+        self._sources[fingerprint] = (filePath, snapshotPath, exportSeconds)
+
+    def materialize(self, fingerprint, filePath, tempPath=None):
+        """Creates filePath from the file registered for fingerprint.
+
+        Arguments:
+        fingerprint -- The fingerprint of a registered file.
+        filePath -- The file to create.
+        tempPath -- Created first and renamed to filePath, so a crash while
+                    copying never leaves a partial file under filePath.
+
+        :returns:
+            The path of the registered file.
+        """
+        sourcePath, snapshotPath, exportSeconds = self._sources[fingerprint]
+
+        createPath = tempPath or filePath
+        if os.path.lexists(createPath):
+            os.remove(createPath)
+        linked = _linkOrCopy(snapshotPath or sourcePath, createPath)
+        if tempPath:
+            os.replace(tempPath, filePath)
+        if linked:
+            self._links.append((filePath, sourcePath))
+
+        self.reusedCount += 1
+        self.secondsSaved += exportSeconds
+        return sourcePath
+
+    def close(self):
+        """Removes the snapshots and counts the bytes still shared by hardlinks."""
+        for sourcePath, snapshotPath, exportSeconds in self._sources.values():
+            if snapshotPath and os.path.lexists(snapshotPath):
+                os.remove(snapshotPath)
+
+        # A stage that replaced either file ends the sharing
+        self.linkedBytes = 0
+        for linkPath, sourcePath in self._links:
+            try:
+                if os.path.samefile(linkPath, sourcePath):
+                    self.linkedBytes += os.path.getsize(linkPath)
+            except OSError:
+                pass
+
+
+def _linkOrCopy(sourcePath, filePath):
+    # Returns True when a hardlink was created
+    try:
+        os.link(sourcePath, filePath)
+        return True
+    except OSError:
+        shutil.copyfile(sourcePath, filePath)
+        return False
@@ -0,0 +1,71 @@
+import struct
+import sys
+from array import array
+
+from .mesh_utils import weldVertices
+from .stl_writer import CM_TO_MM
+
+_PLY_FACE = struct.Struct('<B3i')
+
+
+def writeBinaryPly(filePath, coordinates, triangleIndices, scale=CM_TO_MM):
+    """Writes a mesh as a binary little-endian PLY file with shared vertices.
+
+    :returns:
+        The number of triangles written.
+    """
+    vertices, indices = weldVertices(coordinates, triangleIndices, scale)
+    vertexCount = len(vertices) // 3
+    triangleCount = len(indices) // 3
+
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {vertexCount}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {triangleCount}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    ).encode('ascii')
+
+    vertexData = array('f', vertices)
+    if sys.byteorder != 'little':
+        vertexData.byteswap()
+
+    faceData = bytearray(_PLY_FACE.size * triangleCount)
+    pack = _PLY_FACE.pack_into
+    offset = 0
+    for t in range(0, len(indices), 3):
+        pack(faceData, offset, 3, indices[t], indices[t + 1], indices[t + 2])
+        offset += _PLY_FACE.size
+
+    with open(filePath, 'wb') as f:
+        f.write(b''.join((header, vertexData.tobytes(), faceData)))
+
+    return triangleCount
+
+
+def writeObj(filePath, coordinates, triangleIndices, scale=CM_TO_MM):
+    """Writes a mesh as a Wavefront OBJ file with shared vertices.
+
+    :returns:
+        The number of triangles written.
+    """
+    vertices, indices = weldVertices(coordinates, triangleIndices, scale)
+
+    # OBJ indices start at 1
+    lines = [
+        f"v {vertices[i]:.5f} {vertices[i + 1]:.5f} {vertices[i + 2]:.5f}\n"
+        for i in range(0, len(vertices), 3)
+    ]
+    lines.extend(
+        f"f {indices[t] + 1} {indices[t + 1] + 1} {indices[t + 2] + 1}\n"
+        for t in range(0, len(indices), 3)
+    )
+
+    with open(filePath, 'w', encoding='ascii', newline='\n') as f:
+        f.write(''.join(lines))
+
+    return len(indices) // 3
@@ -0,0 +1,185 @@
+import datetime
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# Name of the manifest written next to the exported files.
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_VERSION = 2
+
+_STL_COUNT = struct.Struct('<I')
+
+
+def writeManifest(folder, records, maxWorkers=4, digests=None):
+    """Writes the manifest of the export folder after an export run.
+
+    The manifest lists the files of this run together with the files of
+    earlier runs that are still in the folder. Every file gets its size,
+    SHA-256 and triangle count. Files that are unchanged since the previous
+    manifest keep their entry, and files hashed during the export run get
+    the checksum from digests. Only the others are hashed, on a thread pool.
+    The changes against the previous manifest are stored with it, so
+    consumers only need to fetch the files that were added or changed.
+
+    Arguments:
+    folder -- The export folder.
+    records -- One dict per body describing the file written for it, with at
+               least the name of the file in 'file'.
+    maxWorkers -- Number of files hashed at the same time.
+    digests -- Dict of filename to the (size, sha256) of files hashed during
+               the export run. A checksum is used while the size matches.
+
+    :returns:
+        A (manifestPath, changes) tuple, changes being a dict of added,
+        changed and removed filenames, and of the files that could not be
+        described, by filename with their error in 'failed'.
+    """
+    digests = digests or {}
+    previous = readManifest(folder)
+    previousFiles = {entry['file']: entry for entry in previous.get('files', [])} if previous else {}
+
+    # Files of earlier runs stay listed as long as they exist
+    files = [dict(record) for record in records]
+    names = {record['file'] for record in files}
+    for fileName, entry in previousFiles.items():
+        if fileName not in names and os.path.isfile(os.path.join(folder, fileName)):
+            files.append(dict(entry))
+            names.add(fileName)
+
+    with ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='ExportToolsManifest') as executor:
+        futures = [
+            (entry, executor.submit(_describeFile, folder, entry, previousFiles.get(entry['file']), digests.get(entry['file'])))
+            for entry in files
+        ]
+
+    failed = {}
+    for entry, future in futures:
+        error = future.exception()
+        if error:
+            entry['sha256'] = None
+            failed[entry['file']] = f"{type(error).__name__}: {error}"
+
+    changes = diffManifests(previousFiles, files)
+    changes['failed'] = failed
+    data = {
+        'version': MANIFEST_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'previous': previous.get('created') if previous else None,
+        'changes': changes,
+        'files': files,
+    }
+
+    # Write to a temporary file first so readers never see a partial manifest.
+    manifestPath = os.path.join(folder, MANIFEST_FILENAME)
+    tempPath = manifestPath + '.tmp'
+    with open(tempPath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tempPath, manifestPath)
+    return manifestPath, changes
+
+
+def readManifest(folder):
+    """Returns the manifest in folder as a dict, or None if there is no valid one."""
+    try:
+        with open(os.path.join(folder, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and isinstance(data.get('files'), list) else None
+
+
+def diffManifests(previousFiles, files):
+    """Compares the files of two manifests by checksum.
+
+    Arguments:
+    previousFiles -- Dict of filename to the entry of the previous manifest.
+    files -- The entries of the new manifest.
+
+    :returns:
+        A dict with sorted lists of the added, changed and removed filenames.
+    """
+    current = {entry['file']: entry for entry in files}
+    added = [name for name in current if name not in previousFiles]
+    changed = [
+        name for name, entry in current.items()
+        if name in previousFiles and (not entry.get('sha256') or entry.get('sha256') != previousFiles[name].get('sha256'))
+    ]
+    removed = [name for name in previousFiles if name not in current]
+    return {'added': sorted(added), 'changed': sorted(changed), 'removed': sorted(removed)}
+
+
+def hashFile(filePath):
+    """Returns the SHA-256 of a file, reading it through a memory map.
+
+    The digest is updated from the mapped pages directly, so the file is
+    never copied into a Python object, and the GIL is released while it is
+    hashed, so several files can be hashed in parallel.
+    """
+    digest = hashlib.sha256()
+    with open(filePath, 'rb') as f:
+        # Empty files can't be mapped
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                digest.update(data)
+    return digest.hexdigest()
+
+
+def readTriangleCount(filePath):
+    """Returns the triangle count from the header of a binary STL or PLY file.
+
+    gzip compressed files are read through the decompressor, only as far as
+    the header. None for other files.
+    """
+    name = filePath.lower()
+    opener = open
+    if name.endswith('.gz'):
+        name = name[:-len('.gz')]
+        opener = gzip.open
+
+    if name.endswith('.stl'):
+        with opener(filePath, 'rb') as f:
+            header = f.read(84)
+        return _STL_COUNT.unpack_from(header, 80)[0] if len(header) == 84 else None
+
+    if name.endswith('.ply'):
+        with opener(filePath, 'rb') as f:
+            for line in f:
+                words = line.split()
+                if words[:2] == [b'element', b'face'] and len(words) == 3:
+                    return int(words[2])
+                if words[:1] == [b'end_header']:
+                    break
+    return None
+
+
+def _describeFile(folder, entry, previousEntry, digest):
+    filePath = os.path.join(folder, entry['file'])
+    try:
+        stat = os.stat(filePath)
+    except OSError:
+        return
+
+    entry['size'] = stat.st_size
+    entry['mtime'] = stat.st_mtime_ns
+
+    # Unchanged since the previous manifest, keep its checksum
+    if (
+            previousEntry and previousEntry.get('sha256')
+            and previousEntry.get('size') == stat.st_size and previousEntry.get('mtime') == stat.st_mtime_ns
+    ):
+        entry['sha256'] = previousEntry['sha256']
+        entry['triangles'] = previousEntry.get('triangles')
+        return
+
+    if digest and digest[0] == stat.st_size:
+        entry['sha256'] = digest[1]
+    else:
+        entry['sha256'] = hashFile(filePath)
+    try:
+        entry['triangles'] = readTriangleCount(filePath)
+    except (OSError, ValueError, struct.error):
+        entry['triangles'] = None
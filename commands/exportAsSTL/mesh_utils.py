@@ -0,0 +1,42 @@
+def weldVertices(coordinates, triangleIndices, scale=1.0, tolerance=1e-4):
+    """Merges coincident mesh nodes into shared, indexed vertices.
+
+    Nodes whose scaled coordinates fall on the same point of a grid with the
+    given tolerance are merged. Triangles that collapse after merging are
+    dropped.
+
+    Arguments:
+    coordinates -- Flat sequence of node coordinates (x0, y0, z0, x1, ...).
+    triangleIndices -- Flat sequence of node indices, three per triangle.
+    scale -- Factor applied to every coordinate.
+    tolerance -- Grid size, in scaled units, used to detect coincident nodes.
+
+    :returns:
+        A (vertices, indices) tuple of flat lists, vertices holding the scaled
+        coordinates of the unique vertices.
+    """
+    inverse = 1.0 / tolerance
+    lookup = {}
+    vertices = []
+    remap = []
+    for i in range(0, len(coordinates) - 2, 3):
+        x = coordinates[i] * scale
+        y = coordinates[i + 1] * scale
+        z = coordinates[i + 2] * scale
+        key = (round(x * inverse), round(y * inverse), round(z * inverse))
+        index = lookup.get(key)
+        if index is None:
+            index = len(lookup)
+            lookup[key] = index
+            vertices.extend((x, y, z))
+        remap.append(index)
+
+    indices = []
+    for t in range(0, len(triangleIndices) - 2, 3):
+        a = remap[triangleIndices[t]]
+        b = remap[triangleIndices[t + 1]]
+        c = remap[triangleIndices[t + 2]]
+        if a != b and b != c and a != c:
+            indices.extend((a, b, c))
+
+    return vertices, indices
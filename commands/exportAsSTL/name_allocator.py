@@ -0,0 +1,58 @@
+import os
+import re
+
+# Collision counters appended to a filename, e.g. part(3).stl
+_COUNTER_PATTERN = re.compile(r'\((\d+)\)')
+_TRAILING_COUNTER_PATTERN = re.compile(r'\((\d+)\)$')
+
+
+class NameAllocator:
+    """Hands out filenames that don't collide with existing files or each other.
+
+    The export folder is listed once when the allocator is created. Existing
+    names are kept in a set, together with the highest collision counter used
+    for each base name, so a free name is found without probing the file
+    system. Every name handed out is reserved, which also keeps duplicate
+    names within one batch apart. Names are compared case-insensitively as
+    the export folder may be on a case-insensitive file system.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._taken = set()
+        self._highest = {}
+
+        # Without a folder only the names handed out are kept apart
+        if folder:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        self._reserve(entry.name)
+            except OSError:
+                pass
+
+    def allocate(self, fileName):
+        """Returns fileName, or fileName with the next free (n) counter, and reserves it."""
+        if fileName.casefold() not in self._taken:
+            self._reserve(fileName)
+            return fileName
+
+        name, ext = os.path.splitext(fileName)
+        base = _COUNTER_PATTERN.sub('', name)
+        counter = self._highest.get((base.casefold(), ext.casefold()), 0) + 1
+        candidate = f"{base}({counter}){ext}"
+        while candidate.casefold() in self._taken:
+            counter += 1
+            candidate = f"{base}({counter}){ext}"
+
+        self._reserve(candidate)
+        return candidate
+
+    def _reserve(self, fileName):
+        self._taken.add(fileName.casefold())
+
+        name, ext = os.path.splitext(fileName)
+        match = _TRAILING_COUNTER_PATTERN.search(name)
+        if match:
+            key = (_COUNTER_PATTERN.sub('', name).casefold(), ext.casefold())
+            self._highest[key] = max(self._highest.get(key, 0), int(match.group(1)))
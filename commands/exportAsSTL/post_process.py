@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class PostProcessPipeline:
+    """Runs post-export stages for finished files on a background worker pool.
+
+    Tessellation and export have to stay on Fusion's main thread, but anything
+    done with the file afterwards can overlap with the export of the next body.
+    Every submitted file runs through the stages in order on one worker. Each
+    stage is called with the file path and a dict it can read from and add
+    results to.
+
+    The number of files waiting or in progress is bounded, submit blocks once
+    the limit is reached so a slow stage can't queue up the whole batch.
+    Functions added to cleanups are called once the pool has shut down, e.g.
+    to close connections held by a stage.
+    """
+
+    def __init__(self, stages, maxWorkers=2, maxPending=8):
+        self.stages = list(stages)
+        self._executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='ExportToolsPost')
+        self._slots = threading.BoundedSemaphore(maxPending)
+        self._futures = []
+        self.cleanups = []
+
+    def submit(self, filePath, info=None):
+        info = dict(info or {})
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._run, filePath, info)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        self._futures.append((filePath, future))
+        return future
+
+    def wait(self):
+        """Waits for all submitted files and shuts the pool down.
+
+        :returns:
+            A list of (filePath, info, error) tuples in submission order. error is
+            None when every stage succeeded, otherwise the exception raised.
+        """
+        wait([future for _, future in self._futures])
+        self._executor.shutdown(wait=True)
+        for cleanup in self.cleanups:
+            cleanup()
+
+        results = []
+        for filePath, future in self._futures:
+            error = future.exception()
+            results.append((filePath, None if error else future.result(), error))
+        return results
+
+    def _run(self, filePath, info):
+        for stage in self.stages:
+            stage(filePath, info)
+        return info
+
+
+def fileSha256(filePath):
+    # Hash in blocks so large files are never read into memory at once.
+    digest = hashlib.sha256()
+    with open(filePath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def checksumStage(filePath, info):
+    info['sha256'] = fileSha256(filePath)
+
+
+def makeCopyStage(destinationFolder):
+    """Returns a stage that copies each file to destinationFolder and verifies the copy."""
+
+    def copyStage(filePath, info):
+        os.makedirs(destinationFolder, exist_ok=True)
+        destination = os.path.join(destinationFolder, os.path.basename(filePath))
+        shutil.copyfile(filePath, destination)
+
+        if os.path.getsize(destination) != os.path.getsize(filePath):
+            raise OSError(f"Copy of {os.path.basename(filePath)} to {destinationFolder} is incomplete")
+        info['copiedTo'] = destination
+
+    return copyStage
@@ -0,0 +1,87 @@
+import math
+from collections import namedtuple
+
+# Custom mesh refinement of a body. Deviations use Fusion's internal units,
+# surfaceDeviation in centimeters and normalDeviation in radians.
+RefinementSettings = namedtuple('RefinementSettings', ['surfaceDeviation', 'normalDeviation'])
+
+# Surface deviation as a fraction of the body size when there is no budget.
+DEFAULT_RELATIVE_DEVIATION = 0.0005
+
+MIN_SURFACE_DEVIATION = 0.0005
+MAX_SURFACE_DEVIATION = 0.05
+MIN_NORMAL_DEVIATION = math.radians(5)
+MAX_NORMAL_DEVIATION = math.radians(30)
+
+# A sphere with a bounding box diagonal of size, meshed to a chord deviation d,
+# needs about pi² / (4·√3) · size / d triangles. Used as the estimate for a
+# curved body, flat bodies need far fewer.
+TRIANGLE_FACTOR = math.pi ** 2 / (4 * math.sqrt(3))
+
+# A sphere with a bounding box diagonal of size has an area of pi / 3 · size².
+AREA_TRIANGLE_FACTOR = TRIANGLE_FACTOR * 3 / math.pi
+
+
+def refinementFor(size, relativeDeviation):
+    """Returns the refinement of a body with the given bounding box diagonal in cm."""
+    surfaceDeviation = min(max(size * relativeDeviation, MIN_SURFACE_DEVIATION), MAX_SURFACE_DEVIATION)
+
+    # The angle between the facets of an arc meshed to this chord deviation
+    normalDeviation = 4 * math.sqrt(relativeDeviation)
+    normalDeviation = min(max(normalDeviation, MIN_NORMAL_DEVIATION), MAX_NORMAL_DEVIATION)
+
+    return RefinementSettings(surfaceDeviation, normalDeviation)
+
+
+def estimateTriangles(size, settings):
+    """Rough upper estimate of the triangles needed for a body of the given size."""
+    bySurface = TRIANGLE_FACTOR * size / settings.surfaceDeviation
+    byNormal = (2 * math.pi / settings.normalDeviation) ** 2
+    return int(max(bySurface, byNormal))
+
+
+def estimateTrianglesFromArea(size, area, settings):
+    """Estimates the triangles of a body from its size and surface area in cm².
+
+    Meshed to a chord deviation d, a surface curved with radius r needs
+    triangles covering about r·d each. Taking the curvature from the body
+    size, bodies with a lot of surface for their size, such as threads,
+    fins or fillets, get more triangles than compact ones. Scaled to match
+    estimateTriangles for a sphere.
+    """
+    bySurface = AREA_TRIANGLE_FACTOR * area / (size * settings.surfaceDeviation) if size > 0 else 0
+    byNormal = (2 * math.pi / settings.normalDeviation) ** 2
+    return int(max(bySurface, byNormal))
+
+
+def planRefinement(sizes, triangleBudget=0, relativeDeviation=DEFAULT_RELATIVE_DEVIATION):
+    """Chooses the refinement of every body in a batch.
+
+    The surface deviation of each body is proportional to its size so small
+    and large bodies get a similar number of triangles. With a budget, the
+    deviation is coarsened until the estimated total fits in it.
+
+    Arguments:
+    sizes -- Bounding box diagonal of each body, in cm.
+    triangleBudget -- Estimated triangles allowed for the whole batch, 0 for no limit.
+    relativeDeviation -- Surface deviation as a fraction of the body size.
+
+    :returns:
+        A list of RefinementSettings in the order of sizes.
+    """
+    plan = [refinementFor(size, relativeDeviation) for size in sizes]
+
+    if triangleBudget > 0:
+        # Clamping keeps the estimate from scaling exactly, so refine a few times
+        for _ in range(16):
+            total = sum(estimateTriangles(size, settings) for size, settings in zip(sizes, plan))
+            if total <= triangleBudget:
+                break
+            relativeDeviation *= total / triangleBudget
+            plan = [refinementFor(size, relativeDeviation) for size in sizes]
+
+    return plan
+
+
+def describeRefinement(settings):
+    return f"{settings.surfaceDeviation * 10:.3f} mm, {math.degrees(settings.normalDeviation):.0f}°"
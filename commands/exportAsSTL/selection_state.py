@@ -0,0 +1,84 @@
+import itertools
+
+
+class SelectionState:
+    """Keeps the filename table in step with the bodies in the selection input.
+
+    Bodies are stored in table row order, keyed by their entityToken (or the
+    key returned by keyOf), so the row of a body is its position in the state.
+    The occurrences of a component share the revisionId of their bodies but
+    each has an entityToken of its own, so every instance gets its own row.
+    An update diffs the new selection against the state in a single pass,
+    deletes the rows of removed bodies from the bottom up and appends rows
+    for added bodies, without asking the table where each input is.
+
+    Each row gets an id of its own for its inputs, as entity tokens contain
+    characters like / and = that don't belong in input ids.
+
+    Arguments:
+    keyOf -- Returns the key used for a body. Defaults to its entityToken.
+    """
+
+    def __init__(self, keyOf=None):
+        self.keyOf = keyOf or (lambda body: body.entityToken)
+        self._rows = {}
+        self._rowIds = itertools.count(1)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def keys(self):
+        return list(self._rows)
+
+    def bodies(self):
+        return [body for _, body in self._rows.values()]
+
+    def items(self):
+        """Returns a (rowId, body) pair for every row, in row order."""
+        return list(self._rows.values())
+
+    def rowIdOf(self, body):
+        """Returns the id of the row of body, None when it has no row."""
+        row = self._rows.get(self.keyOf(body))
+        return row[0] if row else None
+
+    def update(self, bodies, table, createRow):
+        """Applies a new selection to the state and the table.
+
+        Arguments:
+        bodies -- The bodies currently selected, in selection order.
+        table -- The table holding one row per body.
+        createRow -- Called with (rowId, body, row) to add the row of each added body.
+
+        :returns:
+            A (addedRowIds, removedRowIds) tuple.
+        """
+        current = {}
+        for body in bodies:
+            current[self.keyOf(body)] = body
+
+        # Delete from the last row up so the positions of earlier rows stay valid
+        removed = [(row, key) for row, key in enumerate(self._rows) if key not in current]
+        removedRowIds = []
+        for row, key in reversed(removed):
+            table.deleteRow(row)
+            removedRowIds.append(self._rows.pop(key)[0])
+
+        addedRowIds = []
+        for key, body in current.items():
+            if key in self._rows:
+                continue
+            rowId = f"bodyRow{next(self._rowIds)}"
+            createRow(rowId, body, len(self._rows))
+            self._rows[key] = (rowId, body)
+            addedRowIds.append(rowId)
+
+        removedRowIds.reverse()
+        return addedRowIds, removedRowIds
+
+    def clear(self):
+        self._rows = {}
+        self._rowIds = itertools.count(1)
@@ -0,0 +1,192 @@
+import math
+import mmap
+import os
+import struct
+import time
+
+from .stl_writer import STL_HEADER_SIZE, STL_FACET_SIZE
+
+# The three corners of a facet as raw bytes, to find the corners facets share.
+_CORNERS = struct.Struct('<12x12s12s12s2x')
+# The three corners of a facet as coordinates.
+_COORDINATES = struct.Struct('<12x9f2x')
+_COUNT = struct.Struct('<I')
+
+# A facet counts as degenerate when its area is below this fraction of the
+# square of its longest edge, e.g. a sliver with all corners on a line.
+DEGENERATE_RATIO = 1e-7
+
+
+def verifyStl(filePath, maxEdgeFacets=0):
+    """Checks a binary STL file for the problems slicers trip over.
+
+    The file is read through a memory map, one facet at a time, without
+    copying it. The facet count in the header has to match the file size.
+    Facets with no area or with coordinates that aren't finite numbers are
+    counted as degenerate. Corners with the same
+    coordinates are shared, and every edge between them is stored as a key
+    of its two corner ids. Sorting the keys puts the uses of each edge next
+    to each other: in a watertight mesh every edge is used by exactly two
+    facets, an edge used once lies on a hole and one used more than twice
+    is non-manifold.
+
+    Arguments:
+    filePath -- The binary STL file.
+    maxEdgeFacets -- Files with more facets skip the edge check, which needs
+                     memory for every edge. 0 for no limit.
+
+    :returns:
+        A dict with the facet count, degenerate, boundary and non-manifold
+        counts, the bounds as a (min, max) pair of coordinate tuples and the
+        seconds taken. The edge counts are None when the check was skipped,
+        errors lists problems with the file itself.
+    """
+    start = time.perf_counter()
+    report = {
+        'facets': 0,
+        'errors': [],
+        'degenerate': 0,
+        'boundaryEdges': None,
+        'nonManifoldEdges': None,
+        'bounds': None,
+        'seconds': 0.0,
+    }
+
+    with open(filePath, 'rb') as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        if fileSize < STL_HEADER_SIZE + 4:
+            report['errors'].append(f"file is too short for a binary STL ({fileSize} bytes)")
+            return report
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            facetCount = _COUNT.unpack_from(data, STL_HEADER_SIZE)[0]
+            report['facets'] = facetCount
+            expectedSize = STL_HEADER_SIZE + 4 + STL_FACET_SIZE * facetCount
+            if expectedSize != fileSize:
+                if data[:5] == b'solid' and b'facet' in data[:1024]:
+                    report['errors'].append("file is an ASCII STL")
+                else:
+                    report['errors'].append(
+                        f"header says {facetCount:,} facets but the file holds {(fileSize - STL_HEADER_SIZE - 4) / STL_FACET_SIZE:,.2f}"
+                    )
+                return report
+
+            checkEdges = not maxEdgeFacets or facetCount <= maxEdgeFacets
+            view = memoryview(data)[STL_HEADER_SIZE + 4:expectedSize]
+            try:
+                degenerate, bounds, edgeKeys = _scanFacets(view, checkEdges)
+            finally:
+                view.release()
+
+    report['degenerate'] = degenerate
+    report['bounds'] = bounds
+    if checkEdges:
+        report['boundaryEdges'], report['nonManifoldEdges'] = _countEdgeUses(edgeKeys)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def _scanFacets(view, checkEdges):
+    minX = minY = minZ = math.inf
+    maxX = maxY = maxZ = -math.inf
+    degenerate = 0
+    cornerIds = {}
+    edgeKeys = []
+    addEdge = edgeKeys.append
+
+    corners = _CORNERS.iter_unpack(view) if checkEdges else None
+    for x1, y1, z1, x2, y2, z2, x3, y3, z3 in _COORDINATES.iter_unpack(view):
+        # Bounds of the corners
+        minX = min(minX, x1, x2, x3)
+        maxX = max(maxX, x1, x2, x3)
+        minY = min(minY, y1, y2, y3)
+        maxY = max(maxY, y1, y2, y3)
+        minZ = min(minZ, z1, z2, z3)
+        maxZ = max(maxZ, z1, z2, z3)
+
+        # Twice the area, from the cross product of two edges
+        ux, uy, uz = x2 - x1, y2 - y1, z2 - z1
+        vx, vy, vz = x3 - x1, y3 - y1, z3 - z1
+        wx, wy, wz = x3 - x2, y3 - y2, z3 - z2
+        cx, cy, cz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+        longest = max(ux * ux + uy * uy + uz * uz, vx * vx + vy * vy + vz * vz, wx * wx + wy * wy + wz * wz)
+        # Written as a negation so NaN coordinates count as degenerate too
+        if not cx * cx + cy * cy + cz * cz > (DEGENERATE_RATIO * longest) ** 2:
+            degenerate += 1
+
+        if corners is not None:
+            a, b, c = next(corners)
+            a = cornerIds.setdefault(a, len(cornerIds))
+            b = cornerIds.setdefault(b, len(cornerIds))
+            c = cornerIds.setdefault(c, len(cornerIds))
+            # An edge is the same key whichever direction a facet uses it in
+            addEdge((a << 32) | b if a < b else (b << 32) | a)
+            addEdge((b << 32) | c if b < c else (c << 32) | b)
+            addEdge((c << 32) | a if c < a else (a << 32) | c)
+
+    bounds = ((minX, minY, minZ), (maxX, maxY, maxZ)) if minX <= maxX else None
+    return degenerate, bounds, edgeKeys
+
+
+def _countEdgeUses(edgeKeys):
+    # After sorting, the uses of each edge form a run of equal keys
+    edgeKeys.sort()
+    boundary = nonManifold = 0
+    run = 0
+    previous = None
+    for key in edgeKeys:
+        if key == previous:
+            run += 1
+            continue
+        if run == 1:
+            boundary += 1
+        elif run > 2:
+            nonManifold += 1
+        previous = key
+        run = 1
+    if run == 1:
+        boundary += 1
+    elif run > 2:
+        nonManifold += 1
+    return boundary, nonManifold
+
+
+def describeVerification(report):
+    """Returns a one line summary of a report of verifyStl."""
+    if report['errors']:
+        return "; ".join(report['errors'])
+
+    parts = [f"{report['facets']:,} facets"]
+    if report['bounds']:
+        low, high = report['bounds']
+        parts.append(" × ".join(f"{high[i] - low[i]:.1f}" for i in range(3)) + " mm")
+    if report['boundaryEdges'] is None:
+        parts.append("edges not checked")
+    elif report['boundaryEdges'] or report['nonManifoldEdges']:
+        parts.append(f"{report['boundaryEdges']:,} open and {report['nonManifoldEdges']:,} non-manifold edges")
+    else:
+        parts.append("watertight")
+    if report['degenerate']:
+        parts.append(f"{report['degenerate']:,} degenerate facets")
+    return ", ".join(parts)
+
+
+def hasProblems(report):
+    return bool(
+        report['errors'] or report['degenerate'] or report['boundaryEdges'] or report['nonManifoldEdges']
+    )
+
+
+def makeVerifyStage(maxEdgeFacets=0):
+    """Returns a stage that verifies exported binary STL files.
+
+    Arguments:
+    maxEdgeFacets -- Files with more facets skip the edge check, 0 for no limit.
+    """
+
+    def verifyStage(filePath, info):
+        if not filePath.lower().endswith('.stl'):
+            return
+        info['verification'] = verifyStl(filePath, maxEdgeFacets)
+
+    return verifyStage
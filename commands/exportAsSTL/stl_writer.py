@@ -0,0 +1,63 @@
+import math
+import struct
+
+# Fusion reports mesh coordinates in centimeters, STL files are written in millimeters.
+CM_TO_MM = 10.0
+
+STL_HEADER_SIZE = 80
+STL_FACET_SIZE = 50
+
+# Normal, three vertices and the attribute byte count of a single facet.
+_FACET = struct.Struct('<12fH')
+_COUNT = struct.Struct('<I')
+
+
+def writeBinaryStl(filePath, coordinates, triangleIndices, scale=CM_TO_MM, header=b''):
+    """Writes a binary STL file from flat mesh arrays.
+
+    Arguments:
+    filePath -- The file to write.
+    coordinates -- Flat sequence of node coordinates (x0, y0, z0, x1, ...).
+    triangleIndices -- Flat sequence of node indices, three per triangle.
+    scale -- Factor applied to every coordinate before writing.
+    header -- Optional bytes for the 80 byte STL header.
+
+    :returns:
+        The number of facets written.
+    """
+    triangleCount = len(triangleIndices) // 3
+    coords = [value * scale for value in coordinates]
+
+    # The whole file is assembled in one buffer so it can be written with a single call.
+    buffer = bytearray(STL_HEADER_SIZE + 4 + STL_FACET_SIZE * triangleCount)
+    buffer[:STL_HEADER_SIZE] = bytes(header[:STL_HEADER_SIZE]).ljust(STL_HEADER_SIZE, b' ')
+    _COUNT.pack_into(buffer, STL_HEADER_SIZE, triangleCount)
+
+    pack = _FACET.pack_into
+    sqrt = math.sqrt
+    offset = STL_HEADER_SIZE + 4
+    for t in range(0, triangleCount * 3, 3):
+        a = triangleIndices[t] * 3
+        b = triangleIndices[t + 1] * 3
+        c = triangleIndices[t + 2] * 3
+        ax, ay, az = coords[a], coords[a + 1], coords[a + 2]
+        bx, by, bz = coords[b], coords[b + 1], coords[b + 2]
+        cx, cy, cz = coords[c], coords[c + 1], coords[c + 2]
+
+        # Facet normal from the winding order of the triangle.
+        ux, uy, uz = bx - ax, by - ay, bz - az
+        vx, vy, vz = cx - ax, cy - ay, cz - az
+        nx = uy * vz - uz * vy
+        ny = uz * vx - ux * vz
+        nz = ux * vy - uy * vx
+        length = sqrt(nx * nx + ny * ny + nz * nz)
+        if length:
+            nx, ny, nz = nx / length, ny / length, nz / length
+
+        pack(buffer, offset, nx, ny, nz, ax, ay, az, bx, by, bz, cx, cy, cz, 0)
+        offset += STL_FACET_SIZE
+
+    with open(filePath, 'wb') as f:
+        f.write(buffer)
+
+    return triangleCount
@@ -0,0 +1,106 @@
+import os
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+from .mesh_utils import weldVertices
+from .stl_writer import CM_TO_MM
+
+MODEL_PATH = '3D/3dmodel.model'
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>'
+)
+
+RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    f'<Relationship Target="/{MODEL_PATH}" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>'
+)
+
+MODEL_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<model unit="millimeter" xml:lang="en-US" '
+    'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+    '<resources>\n'
+)
+
+# Number of vertices or triangles formatted before each write to the archive.
+WRITE_BATCH = 4096
+
+
+class ThreeMFWriter:
+    """Writes several meshes into a single 3MF package.
+
+    The model part is streamed into the zip archive one object at a time, so
+    only the mesh being added has to be held in memory. Every mesh becomes its
+    own object with welded, indexed vertices and one build item.
+
+    Arguments:
+    filePath -- The package to write.
+    compressLevel -- The deflate level of the zip archive.
+    tempPath -- The package is written here and renamed to filePath when it
+                is closed, so an interrupted export never leaves a broken
+                package under filePath. None to write filePath directly.
+    """
+
+    def __init__(self, filePath, compressLevel=6, tempPath=None):
+        self.filePath = filePath
+        self.tempPath = tempPath
+        self.objectCount = 0
+        self.triangleCount = 0
+        self._zip = zipfile.ZipFile(tempPath or filePath, 'w', zipfile.ZIP_DEFLATED, compresslevel=compressLevel)
+        self._zip.writestr('[Content_Types].xml', CONTENT_TYPES)
+        self._zip.writestr('_rels/.rels', RELATIONSHIPS)
+        self._model = self._zip.open(MODEL_PATH, 'w', force_zip64=True)
+        self._write(MODEL_HEADER)
+
+    @property
+    def size(self):
+        """Bytes of the package written to disk so far."""
+        return os.path.getsize(self.tempPath or self.filePath)
+
+    def addMesh(self, name, coordinates, triangleIndices, scale=CM_TO_MM):
+        """Adds a mesh as a new object and returns the number of triangles written."""
+        vertices, indices = weldVertices(coordinates, triangleIndices, scale)
+
+        self.objectCount += 1
+        self._write(f'<object id="{self.objectCount}" type="model" name={quoteattr(name)}>\n<mesh>\n<vertices>\n')
+        for start in range(0, len(vertices), WRITE_BATCH * 3):
+            end = min(start + WRITE_BATCH * 3, len(vertices))
+            self._write(''.join(
+                f'<vertex x="{vertices[i]:.4f}" y="{vertices[i + 1]:.4f}" z="{vertices[i + 2]:.4f}"/>\n'
+                for i in range(start, end, 3)
+            ))
+        self._write('</vertices>\n<triangles>\n')
+        for start in range(0, len(indices), WRITE_BATCH * 3):
+            end = min(start + WRITE_BATCH * 3, len(indices))
+            self._write(''.join(
+                f'<triangle v1="{indices[i]}" v2="{indices[i + 1]}" v3="{indices[i + 2]}"/>\n'
+                for i in range(start, end, 3)
+            ))
+        self._write('</triangles>\n</mesh>\n</object>\n')
+
+        triangleCount = len(indices) // 3
+        self.triangleCount += triangleCount
+        return triangleCount
+
+    def close(self):
+        if self._zip is None:
+            return
+
+        build = ''.join(f'<item objectid="{i}"/>\n' for i in range(1, self.objectCount + 1))
+        self._write(f'</resources>\n<build>\n{build}</build>\n</model>\n')
+        self._model.close()
+        self._zip.close()
+        self._zip = None
+        if self.tempPath:
+            os.replace(self.tempPath, self.filePath)
+
+    def _write(self, text):
+        self._model.write(text.encode('utf-8'))
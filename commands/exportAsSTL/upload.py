@@ -0,0 +1,182 @@
+import http.client
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+# Bytes read from the file per chunk of the request body.
+CHUNK_SIZE = 256 * 1024
+
+# Responses that are worth another attempt, anything else is final.
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+
+class UploadError(Exception):
+    """An upload that failed after all attempts."""
+
+
+class HttpUploader:
+    """Uploads files to an HTTP endpoint over a small pool of keep-alive connections.
+
+    Every file is sent as its own request with a chunked body streamed from
+    disk, so files of any size are uploaded without being read into memory.
+    At most maxConnections uploads run at the same time, further calls wait
+    for a connection to become free. Connections are kept open between
+    uploads and reused, a connection that fails is dropped and replaced.
+    Attempts that fail on the connection or with a status like 503 are
+    retried with exponential backoff.
+
+    upload can be called from several threads.
+
+    Arguments:
+    url -- The endpoint. When it ends with a / the filename is appended to it.
+    method -- The HTTP method of the uploads.
+    headers -- Dict of additional request headers, e.g. for an API key.
+    maxConnections -- Number of connections and concurrent uploads.
+    retries -- Number of further attempts after a failed upload.
+    backoffSeconds -- Delay before the first retry, doubled for every further one.
+    timeout -- Socket timeout in seconds.
+    """
+
+    def __init__(self, url, method='PUT', headers=None, maxConnections=4, retries=3, backoffSeconds=0.5, timeout=60):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'Invalid upload URL "{url}"')
+
+        self.url = url
+        self.method = method
+        self.headers = dict(headers or {})
+        self.retries = retries
+        self.backoffSeconds = backoffSeconds
+        self.timeout = timeout
+        self.uploadCount = 0
+        self.uploadedBytes = 0
+        self.retryCount = 0
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path or '/'
+        self._query = parts.query
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(maxConnections)
+        self._lock = threading.Lock()
+
+    def upload(self, filePath, name=None):
+        """Uploads the file at filePath, retrying failed attempts.
+
+        Arguments:
+        filePath -- The file to upload.
+        name -- The filename sent to the server, defaults to the name of the file.
+
+        :returns:
+            The HTTP status of the successful response.
+
+        Raises UploadError when the last attempt failed, and OSError at once
+        when the file can't be read.
+        """
+        name = name or os.path.basename(filePath)
+        path = self._requestPath(name)
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Disposition': _contentDisposition(name),
+            **self.headers,
+        }
+
+        attempt = 0
+        while True:
+            try:
+                status = self._send(filePath, path, headers)
+                break
+            except _RETRY_ERRORS as e:
+                if attempt >= self.retries:
+                    raise UploadError(f'Upload of {name} failed after {attempt + 1} attempts: {e}') from e
+                # Spread the retries of concurrent uploads that failed together
+                time.sleep(self.backoffSeconds * 2 ** attempt * random.uniform(0.5, 1.0))
+                attempt += 1
+                with self._lock:
+                    self.retryCount += 1
+
+        with self._lock:
+            self.uploadCount += 1
+            self.uploadedBytes += os.path.getsize(filePath)
+        return status
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _send(self, filePath, path, headers):
+        with self._slots:
+            connection = self._acquire()
+            try:
+                with open(filePath, 'rb') as f:
+                    connection.request(
+                        self.method, path, body=iter(lambda: f.read(CHUNK_SIZE), b''),
+                        headers=headers, encode_chunked=True,
+                    )
+                response = connection.getresponse()
+                # Read the whole response so the connection can be reused
+                text = response.read(4096)
+                response.read()
+            except:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+
+        if response.status in RETRY_STATUSES:
+            raise _RetryableStatus(f'HTTP {response.status} {response.reason}')
+        if response.status >= 300:
+            detail = text.decode('utf-8', 'replace').strip()
+            raise UploadError(f'HTTP {response.status} {response.reason}' + (f': {detail}' if detail else ''))
+        return response.status
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        if self._scheme == 'https':
+            return http.client.HTTPSConnection(self._host, self._port, timeout=self.timeout)
+        return http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+
+    def _release(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+
+    def _requestPath(self, name):
+        path = self._path
+        if path.endswith('/'):
+            path += urllib.parse.quote(name)
+        return f'{path}?{self._query}' if self._query else path
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+# Failures of the connection or the server. Errors reading the file are
+# OSErrors too but fail the upload at once.
+_RETRY_ERRORS = (ConnectionError, TimeoutError, http.client.HTTPException, _RetryableStatus)
+
+
+def _contentDisposition(name):
+    # Header values are sent as latin-1, so the name goes in the RFC 6266
+    # filename* parameter with an ASCII filename for servers that ignore it
+    fallback = ''.join(c if ' ' <= c < '\x7f' and c not in '"\\' else '_' for c in name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{urllib.parse.quote(name)}"
+
+
+def makeUploadStage(uploader):
+    """Returns a stage that uploads each file with uploader."""
+
+    def uploadStage(filePath, info):
+        info['uploadStatus'] = uploader.upload(filePath)
+
+    return uploadStage
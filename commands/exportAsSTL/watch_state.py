@@ -0,0 +1,128 @@
+import time
+
+WATCH_IDLE = 'idle'
+WATCH_PENDING = 'pending'
+WATCH_EXPORTING = 'exporting'
+
+
+class WatchState:
+    """Decides when watched bodies are re-exported after the design changes.
+
+    Every design event calls notify, which (re)starts a debounce period. Once
+    it has passed without further events, poll compares the current revision
+    of each watched body with the revision it was last exported at and
+    returns the changed ones. Events that arrive while those are exported
+    start another debounce period once the export is finished, so a burst of
+    edits leads to a single export of each changed body.
+
+    The state only depends on the calls made and the clock, so it can be
+    driven by a synthetic stream of events.
+
+    Arguments:
+    debounceSeconds -- Quiet time after the last event before changes are exported.
+    clock -- Function returning the current time in seconds.
+    """
+
+    def __init__(self, debounceSeconds=2.0, clock=time.monotonic):
+        self.debounceSeconds = debounceSeconds
+        self._clock = clock
+        self._revisions = {}
+        self._payloads = {}
+        self._deadline = None
+        self._changedWhileExporting = False
+        self.state = WATCH_IDLE
+
+    @property
+    def isWatching(self):
+        return bool(self._revisions)
+
+    def keys(self):
+        return list(self._revisions)
+
+    def watch(self, items):
+        """Starts watching, replacing anything watched before.
+
+        Arguments:
+        items -- Iterable of (key, revisionId, payload) tuples. The payload is
+                 returned with the key when the body needs to be exported again.
+        """
+        self.clear()
+        for key, revisionId, payload in items:
+            self._revisions[key] = revisionId
+            self._payloads[key] = payload
+
+    def clear(self):
+        self._revisions.clear()
+        self._payloads.clear()
+        self._deadline = None
+        self._changedWhileExporting = False
+        self.state = WATCH_IDLE
+
+    def notify(self):
+        """Records a design event.
+
+        :returns:
+            The seconds until poll should be called, None when not watching.
+        """
+        if not self.isWatching:
+            return None
+
+        self._deadline = self._clock() + self.debounceSeconds
+        if self.state == WATCH_EXPORTING:
+            self._changedWhileExporting = True
+        else:
+            self.state = WATCH_PENDING
+        return self.debounceSeconds
+
+    def remaining(self):
+        """Returns the seconds left of the debounce period, None when nothing is pending."""
+        if self.state != WATCH_PENDING:
+            return None
+        return max(self._deadline - self._clock(), 0.0)
+
+    def poll(self, revisionOf):
+        """Returns the watched bodies that changed, once the debounce period is over.
+
+        Arguments:
+        revisionOf -- Function returning the current revision of a key, or
+                      None when the body no longer exists.
+
+        :returns:
+            A list of (key, revisionId, payload) tuples with the current
+            revision of each changed body. When it isn't empty the state
+            becomes exporting until finish is called.
+        """
+        if self.remaining() != 0.0:
+            return []
+
+        changed = []
+        for key, exportedRevision in self._revisions.items():
+            revisionId = revisionOf(key)
+            if revisionId is not None and revisionId != exportedRevision:
+                changed.append((key, revisionId, self._payloads[key]))
+
+        self._deadline = None
+        self.state = WATCH_EXPORTING if changed else WATCH_IDLE
+        return changed
+
+    def finish(self, exportedRevisions):
+        """Records the result of the export started after poll.
+
+        Bodies that are left out keep their old revision and are exported
+        again after the next event.
+
+        Arguments:
+        exportedRevisions -- Dict of key to the revision that was exported.
+
+        :returns:
+            The seconds until poll should be called, None when nothing is pending.
+        """
+        for key, revisionId in exportedRevisions.items():
+            if key in self._revisions:
+                self._revisions[key] = revisionId
+
+        self.state = WATCH_IDLE
+        if self._changedWhileExporting:
+            self._changedWhileExporting = False
+            self.state = WATCH_PENDING
+        return self.remaining()
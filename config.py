@@ -10,6 +10,11 @@ import os
 # are ready to distribute it.
 DEBUG = True
 
+# Flag that enables timing of event handlers and export phases. After each
+# export a trace and a summary of the timings are written to the export folder.
+# Leave this False for normal use, the instrumentation is skipped entirely then.
+PROFILE = False
+
 # Gets the name of the add-in from the name of the folder the py file is in.
 # This is used when defining unique internal names for various UI elements 
 # that need a unique name. It's also recommended to use a company name as 
@@ -18,4 +23,73 @@ ADDIN_NAME = os.path.basename(os.path.dirname(__file__))
 COMPANY_NAME = 'ACME'
 
 # Palettes
-sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
\ No newline at end of file
+sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
+
+# Logging. Messages at or above LOG_LEVEL ('DEBUG', 'INFO', 'WARNING' or
+# 'ERROR') are written to LOG_FILE by a background thread, rotating to a new
+# file after LOG_FILE_MAX_BYTES. The last LOG_BUFFER_SIZE messages are also
+# kept in memory. When DEBUG is True, messages at or above CONSOLE_LOG_LEVEL
+# are written to the Text Command window as well. Set LOG_FILE to '' to
+# disable the log file.
+LOG_LEVEL = 'DEBUG' if DEBUG else 'INFO'
+CONSOLE_LOG_LEVEL = 'INFO'
+LOG_FILE = os.path.join(os.path.dirname(__file__), 'logs', f'{ADDIN_NAME}.log')
+LOG_FILE_MAX_BYTES = 1000000
+LOG_FILE_BACKUP_COUNT = 3
+LOG_BUFFER_SIZE = 500
+
+# Compression level of gzip files and zip archives, from 1 (fastest) to 9
+# (smallest in general). Binary STL files barely compress better at higher
+# levels while compressing several times slower.
+COMPRESSION_LEVEL = 1
+
+# Post-export processing. Stages run on a background worker pool while the
+# next body is being exported.
+POST_EXPORT_WORKERS = 2
+POST_EXPORT_MAX_PENDING = 8
+# Decimate exported STL files to this fraction of their triangles, 0 to disable.
+# Only uncompressed STL files are decimated. Decimation clusters nearby
+# vertices, which can join thin walls or close surfaces and leave the mesh
+# non-manifold, so check the result for printing.
+POST_EXPORT_DECIMATE_RATIO = 0.0
+# Decimate exported STL files to at most this many triangles, 0 to disable.
+POST_EXPORT_DECIMATE_MAX_TRIANGLES = 0
+# Files with more facets are not decimated, which takes about 130 bytes of
+# memory and 4 µs per facet. 0 for no limit.
+POST_EXPORT_DECIMATE_MAX_FACETS = 5000000
+# Check every exported STL file for a facet count that doesn't match the file
+# size, degenerate facets, open or non-manifold edges, and report its size.
+POST_EXPORT_VERIFY = False
+# Files with more facets skip the edge check, which takes about 180 bytes of
+# memory per facet and doubles the time of about 3 µs per facet. 0 for no limit.
+POST_EXPORT_VERIFY_MAX_EDGE_FACETS = 2000000
+# Compute a SHA-256 checksum of every exported file.
+POST_EXPORT_CHECKSUM = False
+# Copy every exported file to this folder (e.g. a network share). Empty to disable.
+POST_EXPORT_COPY_FOLDER = ''
+# Upload every exported file to this HTTP endpoint (e.g. a print farm), empty
+# to disable. When the URL ends with a / the filename is appended to it. The
+# body is streamed with chunked transfer encoding, failed uploads are retried
+# with backoff.
+POST_EXPORT_UPLOAD_URL = ''
+POST_EXPORT_UPLOAD_METHOD = 'PUT'
+# Additional request headers, e.g. {'X-Api-Key': '...'}.
+POST_EXPORT_UPLOAD_HEADERS = {}
+# Number of keep-alive connections, and so of files uploaded at the same time.
+POST_EXPORT_UPLOAD_CONNECTIONS = 4
+POST_EXPORT_UPLOAD_RETRIES = 3
+
+# Every export writes a manifest.json to the export folder listing the size,
+# SHA-256 and triangle count of each file. Files are hashed on this many threads.
+MANIFEST_HASH_WORKERS = 4
+
+# Export all bodies command. Bodies are exported when their name, or their
+# occurrence path and name joined by a "/", matches an include pattern and no
+# exclude pattern. The folder defaults to the last used export folder.
+BATCH_EXPORT_FOLDER = ''
+BATCH_EXPORT_INCLUDE = ['*']
+BATCH_EXPORT_EXCLUDE = []
+
+# Watch mode re-exports changed bodies once the design has been left alone
+# for this many seconds.
+WATCH_DEBOUNCE_SECONDS = 2.0
@@ -14,6 +14,7 @@ from typing import Callable
 
 import adsk.core
 from .general_utils import handle_error
+from .profiling_utils import span
 
 
 # Global Variable to hold Event Handlers
@@ -74,6 +75,7 @@ def _create_handler(
 
 def _define_handler(handler_type, callback, name: str = None):
     name = name or handler_type.__name__
+    span_name = f'handler.{getattr(callback, "__module__", "")}.{getattr(callback, "__qualname__", name)}'
 
     class Handler(handler_type):
         def __init__(self):
@@ -81,7 +83,8 @@ def _define_handler(handler_type, callback, name: str = None):
 
         def notify(self, args):
             try:
-                callback(args)
+                with span(span_name):
+                    callback(args)
             except:
                 handle_error(name)
 
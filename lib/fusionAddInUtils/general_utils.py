@@ -10,7 +10,11 @@
 #  UNINTERRUPTED OR ERROR FREE.
 
 import os
+import queue
+import logging
+import logging.handlers
 import traceback
+from collections import deque
 import adsk.core
 
 app = adsk.core.Application.get()
@@ -23,27 +27,188 @@ try:
 except:
     DEBUG = False
 
+# Attempt to read the logging settings from parent config.
+try:
+    from ... import config
+    LOG_LEVEL = config.LOG_LEVEL
+    CONSOLE_LOG_LEVEL = config.CONSOLE_LOG_LEVEL
+    LOG_FILE = config.LOG_FILE
+    LOG_FILE_MAX_BYTES = config.LOG_FILE_MAX_BYTES
+    LOG_FILE_BACKUP_COUNT = config.LOG_FILE_BACKUP_COUNT
+    LOG_BUFFER_SIZE = config.LOG_BUFFER_SIZE
+except:
+    LOG_LEVEL = 'INFO'
+    CONSOLE_LOG_LEVEL = 'INFO'
+    LOG_FILE = ''
+    LOG_FILE_MAX_BYTES = 1000000
+    LOG_FILE_BACKUP_COUNT = 3
+    LOG_BUFFER_SIZE = 500
+
+# Level for chatty messages, e.g. from events that fire on every keystroke.
+# They are only recorded when LOG_LEVEL is 'DEBUG' and never reach the console.
+DEBUG_LOG_LEVEL = logging.DEBUG
+
+# Recent messages written to the Fusion log file together with an error.
+ERROR_CONTEXT_MESSAGES = 20
+
+_LOG_LEVELS = {
+    adsk.core.LogLevels.InfoLogLevel: logging.INFO,
+    adsk.core.LogLevels.WarningLogLevel: logging.WARNING,
+    adsk.core.LogLevels.ErrorLogLevel: logging.ERROR,
+}
+
+
+class _RingBufferHandler(logging.Handler):
+    """Keeps the most recent log records in memory."""
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records as they are.
+
+    Messages are plain strings without arguments or exception info, so the
+    copy and formatting the base class does on the calling thread are not
+    needed.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _level_number(level) -> int:
+    return logging.getLevelName(level) if isinstance(level, str) else level
+
+
+def _start_logging():
+    logger = logging.getLogger(f'{__name__}.log')
+    logger.setLevel(_level_number(LOG_LEVEL))
+    logger.propagate = False
+
+    # A reloaded add-in finds the handler of its previous instance on the logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    ring_buffer = _RingBufferHandler(LOG_BUFFER_SIZE)
+    ring_buffer.setFormatter(formatter)
+    handlers = [ring_buffer]
+
+    if LOG_FILE:
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding='utf-8', delay=True
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError:
+            print(f'Failed to open log file {LOG_FILE}:\n{traceback.format_exc()}')
+
+    # The calling thread only enqueues the record, a background thread
+    # writes it to the ring buffer and the log file.
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_RecordQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return logger, listener, ring_buffer
+
+
+# Set by start_logging, records are only queued while the listener runs.
+_logger = logging.getLogger(f'{__name__}.log')
+_listener = None
+_ring_buffer = None
+_console_level = _level_number(CONSOLE_LOG_LEVEL)
+
+
+def start_logging():
+    """Starts writing log messages to the log file and the buffer of recent messages.
+
+    Called when the add-in is run. Does nothing while logging is running, so
+    it can be called again after stop_logging when Fusion restarts the add-in
+    without importing it again.
+    """
+    global _logger, _listener, _ring_buffer
+    if _listener is None:
+        _logger, _listener, _ring_buffer = _start_logging()
+
 
 def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False):
     """Utility function to easily handle logging in your app.
 
+    Messages at or above config.LOG_LEVEL are written to the log file by a
+    background thread and kept in a buffer of recent messages. When
+    config.DEBUG is True, messages at or above config.CONSOLE_LOG_LEVEL are
+    also written to the Text Command window. Errors are always written to
+    the Fusion log file right away.
+
     Arguments:
     message -- The message to log.
-    level -- The logging severity level.
+    level -- The logging severity level, an adsk.core.LogLevels value or DEBUG_LOG_LEVEL.
     force_console -- Forces the message to be written to the Text Command window. 
-    """    
-    # Always print to console, only seen through IDE.
-    print(message)  
+    """
+    log_level = _LOG_LEVELS.get(level, level)
+    to_console = force_console or (DEBUG and log_level >= _console_level)
+
+    to_file = _listener is not None and _logger.isEnabledFor(log_level)
+
+    # Filter before doing any work for the message
+    if not to_console and not to_file:
+        return
+
+    # The caller's file and line are not logged, so don't look them up
+    if to_file:
+        _logger.handle(_logger.makeRecord(_logger.name, log_level, '', 0, message, None, None))
 
     # Log all errors to Fusion log file.
-    if level == adsk.core.LogLevels.ErrorLogLevel:
-        log_type = adsk.core.LogTypes.FileLogType
-        app.log(message, level, log_type)
+    if log_level >= logging.ERROR:
+        app.log(message, adsk.core.LogLevels.ErrorLogLevel, adsk.core.LogTypes.FileLogType)
 
-    # If config.DEBUG is True write all log messages to the console.
-    if DEBUG or force_console:
-        log_type = adsk.core.LogTypes.ConsoleLogType
-        app.log(message, level, log_type)
+    if to_console:
+        # Print to console, only seen through IDE.
+        print(message)
+        console_level = level if level in _LOG_LEVELS else adsk.core.LogLevels.InfoLogLevel
+        app.log(message, console_level, adsk.core.LogTypes.ConsoleLogType)
+
+
+def is_log_enabled(level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel) -> bool:
+    """Returns True if a message at level would be recorded, to skip building expensive messages."""
+    log_level = _LOG_LEVELS.get(level, level)
+    return (_listener is not None and _logger.isEnabledFor(log_level)) or (DEBUG and log_level >= _console_level)
+
+
+def recent_log_messages(count: int = None) -> list:
+    """Returns up to count of the most recent log messages, oldest first.
+
+    Messages are added by the background thread, so the very latest ones may
+    not be included yet.
+    """
+    if _ring_buffer is None:
+        return []
+    records = list(_ring_buffer.records)
+    if count is not None:
+        records = records[-count:] if count > 0 else []
+    return [_ring_buffer.format(record) for record in records]
+
+
+def stop_logging():
+    """Writes out all queued log messages and closes the log file.
+
+    Messages logged afterwards are not queued until start_logging is called again.
+    """
+    global _listener
+    if _listener is None:
+        return
+
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
 
 
 def handle_error(name: str, show_message_box: bool = False):
@@ -56,6 +221,11 @@ def handle_error(name: str, show_message_box: bool = False):
                         and logged to the log file.                        
     """    
 
+    # What led up to the error, the log file may be off or lost with the add-in
+    recent = recent_log_messages(ERROR_CONTEXT_MESSAGES)
+    if recent:
+        app.log('Recent messages:\n' + '\n'.join(recent), adsk.core.LogLevels.ErrorLogLevel, adsk.core.LogTypes.FileLogType)
+
     log('===== Error =====', adsk.core.LogLevels.ErrorLogLevel)
     log(f'{name}\n{traceback.format_exc()}', adsk.core.LogLevels.ErrorLogLevel)
 
@@ -0,0 +1,187 @@
+import json
+import math
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+# Attempt to read PROFILE flag from parent config.
+try:
+    from ... import config
+    PROFILE = config.PROFILE
+except:
+    PROFILE = False
+
+# Spans beyond this many are still aggregated but left out of the trace.
+MAX_TRACE_EVENTS = 100000
+
+_NULL_SPAN = nullcontext()
+_lock = threading.Lock()
+_run_start = time.perf_counter()
+_events = []
+_durations = {}
+_counters = {}
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        _record(self.name, self.start, end - self.start)
+        return False
+
+
+def set_profiling(enabled: bool):
+    """Turns profiling on or off for the rest of the session."""
+    global PROFILE
+    PROFILE = enabled
+
+
+def is_profiling() -> bool:
+    """Returns True while spans and counters are being recorded."""
+    return PROFILE
+
+
+def span(name: str):
+    """Returns a context manager that times the code it wraps.
+
+    Arguments:
+    name -- The name the timings are aggregated under.
+
+    When profiling is disabled a shared no-op context manager is returned.
+    """
+    if not PROFILE:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def profiled(name: str = None):
+    """Decorator that times every call of the decorated function.
+
+    Arguments:
+    name -- The name the timings are aggregated under. Defaults to the
+            qualified name of the function.
+    """
+    def decorator(func):
+        span_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILE:
+                return func(*args, **kwargs)
+            with _Span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, amount: int = 1):
+    """Adds amount to the named counter while profiling is enabled."""
+    if not PROFILE:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset_profile():
+    """Discards all spans and counters, e.g. at the start of a run."""
+    global _run_start
+    with _lock:
+        _run_start = time.perf_counter()
+        _events.clear()
+        _durations.clear()
+        _counters.clear()
+
+
+def profile_stats():
+    """Aggregates the spans recorded since the last reset.
+
+    :returns:
+        A dict of span name to a dict with count, total, p50, p95 and max in seconds.
+    """
+    with _lock:
+        durations = {name: sorted(values) for name, values in _durations.items()}
+
+    stats = {}
+    for name, values in durations.items():
+        stats[name] = {
+            'count': len(values),
+            'total': sum(values),
+            'p50': _percentile(values, 0.5),
+            'p95': _percentile(values, 0.95),
+            'max': values[-1],
+        }
+    return stats
+
+
+def profile_summary() -> str:
+    """Returns a human readable table of the span timings and counters, slowest total first."""
+    stats = profile_stats()
+    with _lock:
+        counters = dict(_counters)
+        dropped = max(sum(len(values) for values in _durations.values()) - len(_events), 0)
+
+    lines = [f"{'span':<48} {'count':>7} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for name, s in sorted(stats.items(), key=lambda item: item[1]['total'], reverse=True):
+        lines.append(
+            f"{name:<48} {s['count']:>7} {s['total']:>9.3f} "
+            f"{s['p50'] * 1000:>9.1f} {s['p95'] * 1000:>9.1f} {s['max'] * 1000:>9.1f}"
+        )
+    if counters:
+        lines.append('')
+        lines.extend(f'{name:<48} {value:>7}' for name, value in sorted(counters.items()))
+    if dropped:
+        lines.append(f'\n{dropped} spans were left out of the trace.')
+    return '\n'.join(lines)
+
+
+def write_profile(trace_path: str, summary_path: str = None):
+    """Writes the spans recorded since the last reset as a JSON lines trace.
+
+    Arguments:
+    trace_path -- The file the trace is written to, one span per line with
+                  its start relative to the last reset, both in milliseconds.
+    summary_path -- Optional file to write the text of profile_summary to.
+    """
+    with _lock:
+        events = list(_events)
+        counters = dict(_counters)
+        run_start = _run_start
+
+    with open(trace_path, 'w', encoding='utf-8') as f:
+        for name, start, duration, thread in events:
+            f.write(json.dumps({
+                'name': name,
+                'start': round((start - run_start) * 1000, 3),
+                'duration': round(duration * 1000, 3),
+                'thread': thread,
+            }) + '\n')
+        for name, value in counters.items():
+            f.write(json.dumps({'counter': name, 'value': value}) + '\n')
+
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(profile_summary() + '\n')
+
+
+def _record(name, start, duration):
+    with _lock:
+        _durations.setdefault(name, []).append(duration)
+        if len(_events) < MAX_TRACE_EVENTS:
+            _events.append((name, start, duration, threading.get_ident()))
+
+
+def _percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
@@ -0,0 +1,31 @@
+import pytest
+
+import harness
+
+
+@pytest.fixture
+def addin():
+    """The started add-in, stopped again after the test."""
+    harness.startAddIn()
+    yield harness
+    harness.stopAddIn()
+
+
+@pytest.fixture
+def entry(addin):
+    return harness.importModule('commands.exportAsSTL.entry')
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """The add-in's config, with every change undone after the test."""
+    config = harness.importModule('config')
+
+    class Config:
+        def __getattr__(self, name):
+            return getattr(config, name)
+
+        def __setattr__(self, name, value):
+            monkeypatch.setattr(config, name, value)
+
+    return Config()
@@ -0,0 +1,8 @@
+"""Stand-in for Fusion's adsk modules, to run the add-in in a plain Python interpreter.
+
+Only the part of the API used by the add-in is covered. Classes, methods and
+properties carry the names of the real API, so the add-in runs unchanged.
+Anything only meant for tests, like firing a command's events or pumping
+custom events, is marked as a test helper.
+"""
+from . import core, fusion
@@ -0,0 +1,806 @@
+import collections
+import math
+import threading
+
+
+class Base:
+    """Base of the API objects. cast returns None for objects of another type, like the real one."""
+
+    @classmethod
+    def cast(cls, obj):
+        return obj if isinstance(obj, cls) else None
+
+    @classmethod
+    def classType(cls):
+        return f'adsk::{cls.__module__.rsplit(".", 1)[-1]}::{cls.__name__}'
+
+    @property
+    def objectType(self):
+        return type(self).classType()
+
+
+class LogLevels:
+    InfoLogLevel = 0
+    WarningLogLevel = 1
+    ErrorLogLevel = 2
+
+
+class LogTypes:
+    ConsoleLogType = 0
+    FileLogType = 1
+
+
+class DialogResults:
+    DialogError = -1
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+
+
+# Events. futil.add_handler finds the handler class through the annotation
+# of the event's add method, so every event names its handler class.
+
+class EventArgs(Base):
+    def __init__(self, firingEvent=None):
+        self.firingEvent = firingEvent
+
+
+class EventHandler(Base):
+    def notify(self, args):
+        pass
+
+
+class Event(Base):
+    def __init__(self, name='', sender=None):
+        self.name = name
+        self.sender = sender
+        self.handlers = []
+
+    def add(self, handler: 'EventHandler') -> bool:
+        self.handlers.append(handler)
+        return True
+
+    def remove(self, handler) -> bool:
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+            return True
+        return False
+
+    def fire(self, args):
+        """Test helper: notifies every handler with args."""
+        args.firingEvent = self
+        for handler in list(self.handlers):
+            handler.notify(args)
+        return args
+
+
+class CommandCreatedEventHandler(EventHandler):
+    pass
+
+
+class CommandCreatedEvent(Event):
+    def add(self, handler: 'CommandCreatedEventHandler') -> bool:
+        return super().add(handler)
+
+
+class CommandCreatedEventArgs(EventArgs):
+    def __init__(self, command):
+        super().__init__()
+        self.command = command
+
+
+class CommandEventHandler(EventHandler):
+    pass
+
+
+class CommandEvent(Event):
+    def add(self, handler: 'CommandEventHandler') -> bool:
+        return super().add(handler)
+
+
+class CommandEventArgs(EventArgs):
+    def __init__(self, command):
+        super().__init__()
+        self.command = command
+        self.executeFailed = False
+        self.isValidResult = False
+
+
+class InputChangedEventHandler(EventHandler):
+    pass
+
+
+class InputChangedEvent(Event):
+    def add(self, handler: 'InputChangedEventHandler') -> bool:
+        return super().add(handler)
+
+
+class InputChangedEventArgs(EventArgs):
+    def __init__(self, input, inputs):
+        super().__init__()
+        self.input = input
+        self.inputs = inputs
+
+
+class ValidateInputsEventHandler(EventHandler):
+    pass
+
+
+class ValidateInputsEvent(Event):
+    def add(self, handler: 'ValidateInputsEventHandler') -> bool:
+        return super().add(handler)
+
+
+class ValidateInputsEventArgs(EventArgs):
+    def __init__(self, inputs):
+        super().__init__()
+        self.inputs = inputs
+        self.areInputsValid = True
+
+
+class CustomEventHandler(EventHandler):
+    pass
+
+
+class CustomEvent(Event):
+    def add(self, handler: 'CustomEventHandler') -> bool:
+        return super().add(handler)
+
+
+class CustomEventArgs(EventArgs):
+    def __init__(self, additionalInfo=''):
+        super().__init__()
+        self.additionalInfo = additionalInfo
+
+
+class DocumentEventHandler(EventHandler):
+    pass
+
+
+class DocumentEvent(Event):
+    def add(self, handler: 'DocumentEventHandler') -> bool:
+        return super().add(handler)
+
+
+class DocumentEventArgs(EventArgs):
+    def __init__(self, document):
+        super().__init__()
+        self.document = document
+
+
+class ApplicationCommandEventHandler(EventHandler):
+    pass
+
+
+class ApplicationCommandEvent(Event):
+    def add(self, handler: 'ApplicationCommandEventHandler') -> bool:
+        return super().add(handler)
+
+
+class ApplicationCommandEventArgs(EventArgs):
+    def __init__(self, commandId=''):
+        super().__init__()
+        self.commandId = commandId
+
+
+# Geometry
+
+class Point3D(Base):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    def distanceTo(self, point):
+        return math.sqrt((self.x - point.x) ** 2 + (self.y - point.y) ** 2 + (self.z - point.z) ** 2)
+
+
+class BoundingBox3D(Base):
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+    @staticmethod
+    def create(minPoint, maxPoint):
+        return BoundingBox3D(minPoint, maxPoint)
+
+
+# Documents and attributes
+
+class Attribute(Base):
+    def __init__(self, attributes, groupName, name, value):
+        self._attributes = attributes
+        self.groupName = groupName
+        self.name = name
+        self.value = value
+
+    def deleteMe(self):
+        self._attributes._items.pop((self.groupName, self.name), None)
+        return True
+
+
+class Attributes(Base):
+    def __init__(self):
+        self._items = {}
+
+    def add(self, groupName, name, value):
+        attribute = Attribute(self, groupName, name, value)
+        self._items[(groupName, name)] = attribute
+        return attribute
+
+    def itemByName(self, groupName, name):
+        return self._items.get((groupName, name))
+
+
+class Document(Base):
+    def __init__(self, name='Untitled'):
+        self.name = name
+        self.attributes = Attributes()
+
+
+# Command inputs
+
+class CommandInput(Base):
+    def __init__(self, inputs, id, name=''):
+        self.id = id
+        self.name = name
+        self.tooltip = ''
+        self.tooltipDescription = ''
+        self.isVisible = True
+        self.isEnabled = True
+        self.isFullWidth = False
+        self.parentCommandInput = None
+        self._inputs = inputs
+
+    @property
+    def parentCommand(self):
+        return self._inputs.command
+
+    @property
+    def commandInputs(self):
+        return self._inputs
+
+    def deleteMe(self):
+        return self._inputs._remove(self)
+
+
+class BoolValueCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, isCheckBox, resourceFolder, initialValue):
+        super().__init__(inputs, id, name)
+        self.isCheckBox = isCheckBox
+        self.value = initialValue
+
+
+class TextBoxCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, formattedText, numRows, isReadOnly):
+        super().__init__(inputs, id, name)
+        self.formattedText = formattedText
+        self.numRows = numRows
+        self.isReadOnly = isReadOnly
+
+    @property
+    def text(self):
+        return self.formattedText
+
+    @text.setter
+    def text(self, value):
+        self.formattedText = value
+
+
+class StringValueCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, initialValue=''):
+        super().__init__(inputs, id, name)
+        self.value = initialValue
+        self.isReadOnly = False
+
+
+class IntegerSpinnerCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, minimumValue, maximumValue, spinStep, initialValue):
+        super().__init__(inputs, id, name)
+        self.minimumValue = minimumValue
+        self.maximumValue = maximumValue
+        self.spinStep = spinStep
+        self.value = initialValue
+
+
+class ListItem(Base):
+    def __init__(self, listItems, name, isSelected, index):
+        self._listItems = listItems
+        self.name = name
+        self.index = index
+        self._isSelected = isSelected
+
+    @property
+    def isSelected(self):
+        return self._isSelected
+
+    @isSelected.setter
+    def isSelected(self, value):
+        # A single selection dropdown has one selected item at a time
+        if value:
+            for item in self._listItems._items:
+                item._isSelected = False
+        self._isSelected = value
+
+
+class ListItems(Base):
+    def __init__(self):
+        self._items = []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def add(self, name, isSelected, icon=''):
+        item = ListItem(self, name, False, len(self._items))
+        self._items.append(item)
+        item.isSelected = isSelected
+        return item
+
+    def item(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class DropDownCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, dropDownStyle):
+        super().__init__(inputs, id, name)
+        self.dropDownStyle = dropDownStyle
+        self.listItems = ListItems()
+
+    @property
+    def selectedItem(self):
+        return next((item for item in self.listItems if item.isSelected), None)
+
+
+class Selection(Base):
+    def __init__(self, entity):
+        self.entity = entity
+
+
+class SelectionCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, commandPrompt):
+        super().__init__(inputs, id, name)
+        self.commandPrompt = commandPrompt
+        self.selectionFilters = []
+        self._selections = []
+        self._entities = set()
+
+    @property
+    def selectionCount(self):
+        return len(self._selections)
+
+    def selection(self, index):
+        return self._selections[index]
+
+    def addSelection(self, entity):
+        if entity in self._entities:
+            return False
+        self._selections.append(Selection(entity))
+        self._entities.add(entity)
+        return True
+
+    def removeSelection(self, index):
+        self._entities.discard(self._selections.pop(index).entity)
+        return True
+
+    def clearSelection(self):
+        self._selections = []
+        self._entities = set()
+        return True
+
+    def setSelectionLimits(self, minimum, maximum=0):
+        self.minimumSelections = minimum
+        self.maximumSelections = maximum
+        return True
+
+    def addSelectionFilter(self, filter):
+        self.selectionFilters.append(filter)
+        return True
+
+
+class TableCommandInput(CommandInput):
+    def __init__(self, inputs, id, name, numberOfColumns, columnRatio):
+        super().__init__(inputs, id, name)
+        self.numberOfColumns = numberOfColumns
+        self.columnRatio = columnRatio
+        self.maximumVisibleRows = 4
+        self._rows = []
+
+    @property
+    def rowCount(self):
+        return len(self._rows)
+
+    def addCommandInput(self, input, row, column, rowSpan=0, columnSpan=0):
+        while len(self._rows) <= row:
+            self._rows.append({})
+        self._rows[row][column] = input
+        input.parentCommandInput = self
+        return True
+
+    def getInputAtPosition(self, row, column):
+        if 0 <= row < len(self._rows):
+            return self._rows[row].get(column)
+        return None
+
+    def getPosition(self, input):
+        for row, columns in enumerate(self._rows):
+            for column, cellInput in columns.items():
+                if cellInput is input:
+                    return True, row, column, 1, 1
+        return False, -1, -1, 0, 0
+
+    def deleteRow(self, row):
+        # The inputs of the row are deleted with it
+        if not 0 <= row < len(self._rows):
+            return False
+        for input in self._rows.pop(row).values():
+            self._inputs._remove(input)
+        return True
+
+    def clear(self):
+        while self._rows:
+            self.deleteRow(len(self._rows) - 1)
+        return True
+
+
+class GroupCommandInput(CommandInput):
+    def __init__(self, inputs, id, name):
+        super().__init__(inputs, id, name)
+        self.isExpanded = True
+        self.isEnabledCheckBoxDisplayed = False
+        self.children = CommandInputs(inputs.command, inputs._registry, self)
+
+
+class CommandInputs(Base):
+    """Inputs of a command. Inputs added to a group are found by itemById of the command as well."""
+
+    def __init__(self, command, registry=None, parent=None):
+        self.command = command
+        self._registry = registry if registry is not None else {}
+        self._parent = parent
+        self._children = []
+
+    @property
+    def count(self):
+        return len(self._children)
+
+    def item(self, index):
+        return self._children[index]
+
+    def itemById(self, id):
+        return self._registry.get(id)
+
+    def _add(self, input):
+        # Fusion refuses a second input with the same id
+        if input.id in self._registry:
+            raise RuntimeError(f'3 : An input with the id "{input.id}" already exists')
+        self._registry[input.id] = input
+        self._children.append(input)
+        input.parentCommandInput = self._parent
+        return input
+
+    def _remove(self, input):
+        if self._registry.get(input.id) is not input:
+            return False
+        del self._registry[input.id]
+        for inputs in self._allCollections():
+            if input in inputs._children:
+                inputs._children.remove(input)
+        return True
+
+    def _allCollections(self):
+        collections = [self.command.commandInputs] if self.command else [self]
+        for input in list(self._registry.values()):
+            if isinstance(input, GroupCommandInput):
+                collections.append(input.children)
+        return collections
+
+    def addBoolValueInput(self, id, name, isCheckBox, resourceFolder='', initialValue=False):
+        return self._add(BoolValueCommandInput(self, id, name, isCheckBox, resourceFolder, initialValue))
+
+    def addTextBoxCommandInput(self, id, name, formattedText, numRows, isReadOnly):
+        return self._add(TextBoxCommandInput(self, id, name, formattedText, numRows, isReadOnly))
+
+    def addStringValueInput(self, id, name, initialValue=''):
+        return self._add(StringValueCommandInput(self, id, name, initialValue))
+
+    def addIntegerSpinnerCommandInput(self, id, name, minimumValue, maximumValue, spinStep, initialValue):
+        return self._add(IntegerSpinnerCommandInput(self, id, name, minimumValue, maximumValue, spinStep, initialValue))
+
+    def addDropDownCommandInput(self, id, name, dropDownStyle):
+        return self._add(DropDownCommandInput(self, id, name, dropDownStyle))
+
+    def addSelectionInput(self, id, name, commandPrompt):
+        return self._add(SelectionCommandInput(self, id, name, commandPrompt))
+
+    def addTableCommandInput(self, id, name, numberOfColumns, columnRatio):
+        return self._add(TableCommandInput(self, id, name, numberOfColumns, columnRatio))
+
+    def addGroupCommandInput(self, id, name):
+        return self._add(GroupCommandInput(self, id, name))
+
+
+# Commands
+
+class Command(Base):
+    def __init__(self, commandDefinition):
+        self.parentCommandDefinition = commandDefinition
+        self.commandInputs = CommandInputs(self)
+        self.execute = CommandEvent('execute', self)
+        self.executePreview = CommandEvent('executePreview', self)
+        self.destroy = CommandEvent('destroy', self)
+        self.inputChanged = InputChangedEvent('inputChanged', self)
+        self.validateInputs = ValidateInputsEvent('validateInputs', self)
+        self.isOKButtonVisible = True
+        self.okButtonText = 'OK'
+
+    def changeInput(self, input):
+        """Test helper: fires the events Fusion fires after the user changed input.
+
+        :returns:
+            True when the inputs were valid, in which case the preview ran too.
+        """
+        self.inputChanged.fire(InputChangedEventArgs(input, input.commandInputs))
+        return self.validate()
+
+    def validate(self):
+        """Test helper: fires validateInputs, and executePreview when the inputs are valid."""
+        args = self.validateInputs.fire(ValidateInputsEventArgs(self.commandInputs))
+        if args.areInputsValid:
+            self.executePreview.fire(CommandEventArgs(self))
+        return args.areInputsValid
+
+    def clickOK(self):
+        """Test helper: fires execute and destroy, like clicking OK in the dialog."""
+        self.execute.fire(CommandEventArgs(self))
+        self.destroy.fire(CommandEventArgs(self))
+
+    def cancel(self):
+        """Test helper: fires destroy, like closing the dialog."""
+        self.destroy.fire(CommandEventArgs(self))
+
+
+class CommandDefinition(Base):
+    def __init__(self, definitions, id, name, tooltip, resourceFolder):
+        self._definitions = definitions
+        self.id = id
+        self.name = name
+        self.tooltip = tooltip
+        self.resourceFolder = resourceFolder
+        self.commandCreated = CommandCreatedEvent('commandCreated', self)
+
+    def execute(self):
+        """Creates the command and fires commandCreated. Returns the command, unlike the real method."""
+        command = Command(self)
+        self.commandCreated.fire(CommandCreatedEventArgs(command))
+        return command
+
+    def deleteMe(self):
+        self._definitions._items.pop(self.id, None)
+        return True
+
+
+class CommandDefinitions(Base):
+    def __init__(self):
+        self._items = {}
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def addButtonDefinition(self, id, name, tooltip, resourceFolder=''):
+        if id in self._items:
+            raise RuntimeError(f'3 : A command definition with the id "{id}" already exists')
+        definition = CommandDefinition(self, id, name, tooltip, resourceFolder)
+        self._items[id] = definition
+        return definition
+
+    def itemById(self, id):
+        return self._items.get(id)
+
+
+class CommandControl(Base):
+    def __init__(self, controls, commandDefinition):
+        self._controls = controls
+        self.commandDefinition = commandDefinition
+        self.id = commandDefinition.id
+        self.isPromoted = False
+        self.isVisible = True
+
+    def deleteMe(self):
+        self._controls._items.pop(self.id, None)
+        return True
+
+
+class ToolbarControls(Base):
+    def __init__(self):
+        self._items = {}
+
+    def addCommand(self, commandDefinition, positionID='', isBefore=False):
+        control = CommandControl(self, commandDefinition)
+        self._items[control.id] = control
+        return control
+
+    def itemById(self, id):
+        return self._items.get(id)
+
+
+class ToolbarPanel(Base):
+    def __init__(self, id):
+        self.id = id
+        self.controls = ToolbarControls()
+
+
+class _ItemsById(Base):
+    # Collection that creates the item the first time it is asked for
+    def __init__(self, factory):
+        self._factory = factory
+        self._items = {}
+
+    def itemById(self, id):
+        if id not in self._items:
+            self._items[id] = self._factory(id)
+        return self._items[id]
+
+
+class Workspace(Base):
+    def __init__(self, id):
+        self.id = id
+        self.toolbarPanels = _ItemsById(ToolbarPanel)
+
+
+class ProgressDialog(Base):
+    def __init__(self):
+        self.cancelButtonText = 'Cancel'
+        self.isBackgroundTranslucent = True
+        self.isCancelButtonShown = True
+        self.message = ''
+        self.title = ''
+        self.minimumValue = 0
+        self.maximumValue = 0
+        self.progressValue = 0
+        self.isShowing = False
+        self.wasCancelled = False
+        self.cancelAt = None
+
+    def show(self, title, message, minimumValue, maximumValue, delay=0):
+        self.title = title
+        self.message = message
+        self.minimumValue = minimumValue
+        self.maximumValue = maximumValue
+        self.isShowing = True
+        return True
+
+    def hide(self):
+        self.isShowing = False
+        return True
+
+    def __setattr__(self, name, value):
+        # Test helper: set cancelAt to press Cancel once progressValue reaches it
+        super().__setattr__(name, value)
+        if name == 'progressValue' and getattr(self, 'cancelAt', None) is not None and value >= self.cancelAt:
+            super().__setattr__('wasCancelled', True)
+
+
+class FolderDialog(Base):
+    def __init__(self, userInterface):
+        self._userInterface = userInterface
+        self.title = ''
+        self.initialDirectory = ''
+        self.folder = ''
+
+    def showDialog(self):
+        # Test helper: the folder chosen is taken from UserInterface.folderDialogResult
+        if self._userInterface.folderDialogResult:
+            self.folder = self._userInterface.folderDialogResult
+            return DialogResults.DialogOK
+        return DialogResults.DialogCancel
+
+
+class UserInterface(Base):
+    def __init__(self):
+        self.commandDefinitions = CommandDefinitions()
+        self.workspaces = _ItemsById(Workspace)
+        self.commandTerminated = ApplicationCommandEvent('commandTerminated', self)
+        self.progressDialogs = []
+        self.messages = []
+        self.messageBoxResult = DialogResults.DialogNo
+        self.folderDialogResult = ''
+
+    def messageBox(self, text, title='', buttons=0, icon=0):
+        # Test helper: messages are recorded instead of shown
+        self.messages.append(text)
+        return self.messageBoxResult
+
+    def createProgressDialog(self):
+        dialog = ProgressDialog()
+        self.progressDialogs.append(dialog)
+        return dialog
+
+    def createFolderDialog(self):
+        return FolderDialog(self)
+
+
+class Application(Base):
+    _instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.documentSaved = DocumentEvent('documentSaved', self)
+        self.activeDocument = Document()
+        self.activeProduct = None
+        self.logMessages = []
+        self._customEvents = {}
+        self._pendingEvents = collections.deque()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
+
+    def log(self, message, level=LogLevels.InfoLogLevel, type=LogTypes.ConsoleLogType):
+        self.logMessages.append((message, level, type))
+
+    def registerCustomEvent(self, eventId):
+        event = CustomEvent(eventId, self)
+        self._customEvents[eventId] = event
+        return event
+
+    def unregisterCustomEvent(self, eventId):
+        return self._customEvents.pop(eventId, None) is not None
+
+    def fireCustomEvent(self, eventId, additionalInfo=''):
+        # Custom events are queued and run later on the main thread, from any thread
+        if eventId not in self._customEvents:
+            return False
+        with self._lock:
+            self._pendingEvents.append((eventId, additionalInfo))
+        return True
+
+    def processCustomEvents(self, limit=None):
+        """Test helper: runs queued custom events, including those queued meanwhile.
+
+        :returns:
+            The number of events run.
+        """
+        count = 0
+        while limit is None or count < limit:
+            with self._lock:
+                if not self._pendingEvents:
+                    break
+                eventId, additionalInfo = self._pendingEvents.popleft()
+            event = self._customEvents.get(eventId)
+            if event:
+                event.fire(CustomEventArgs(additionalInfo))
+            count += 1
+        return count
+
+    @property
+    def pendingCustomEvents(self):
+        """Test helper: ids of the custom events waiting to run."""
+        with self._lock:
+            return [eventId for eventId, _ in self._pendingEvents]
+
+    def resetForTest(self):
+        """Test helper: clears the state left by a previous test, keeping this instance."""
+        self.userInterface.messages.clear()
+        self.userInterface.progressDialogs.clear()
+        self.userInterface.messageBoxResult = DialogResults.DialogNo
+        self.userInterface.folderDialogResult = ''
+
+        # Fusion drops the handlers of a stopped add-in once nothing references them
+        self.userInterface.commandTerminated = ApplicationCommandEvent('commandTerminated', self.userInterface)
+        self.documentSaved = DocumentEvent('documentSaved', self)
+        self.activeDocument = Document()
+        self.activeProduct = None
+        self.logMessages.clear()
+        with self._lock:
+            self._pendingEvents.clear()
@@ -0,0 +1,374 @@
+import itertools
+import math
+import os
+import struct
+
+from . import core
+
+
+class MeshRefinementSettings:
+    MeshRefinementHigh = 0
+    MeshRefinementLow = 1
+    MeshRefinementMedium = 2
+    MeshRefinementCustom = 3
+
+
+class TriangleMeshQualityOptions:
+    LowQualityTriangleMesh = 8
+    NormalQualityTriangleMesh = 11
+    HighQualityTriangleMesh = 13
+    VeryHighQualityTriangleMesh = 15
+
+
+# Surface tolerance of each quality as a fraction of the body's bounding box
+# diagonal. Normal matches Fusion's Medium refinement.
+_QUALITY_TOLERANCES = {
+    TriangleMeshQualityOptions.LowQualityTriangleMesh: 0.002,
+    TriangleMeshQualityOptions.NormalQualityTriangleMesh: 0.0005,
+    TriangleMeshQualityOptions.HighQualityTriangleMesh: 0.0002,
+    TriangleMeshQualityOptions.VeryHighQualityTriangleMesh: 0.0001,
+}
+
+_tokens = itertools.count(1)
+
+
+class Material(core.Base):
+    def __init__(self, name):
+        self.name = name
+
+
+class TriangleMesh(core.Base):
+    def __init__(self, coordinates, indices):
+        self.nodeCoordinatesAsFloat = coordinates
+        self.nodeIndices = indices
+
+    @property
+    def nodeCount(self):
+        return len(self.nodeCoordinatesAsFloat) // 3
+
+    @property
+    def triangleCount(self):
+        return len(self.nodeIndices) // 3
+
+
+# Meshes of boxes by their dimensions and divisions, shared by every body of that size.
+_box_meshes = {}
+
+
+def boxMesh(dimensions, divisions):
+    """Test helper: a watertight mesh of a box at the origin with each face split into divisions² squares.
+
+    :returns:
+        A (coordinates, indices) tuple of flat lists, 12·divisions² triangles.
+    """
+    key = (tuple(dimensions), divisions)
+    mesh = _box_meshes.get(key)
+    if mesh:
+        return mesh
+
+    nodes = {}
+    coordinates = []
+    indices = []
+
+    def node(i, j, k):
+        index = nodes.get((i, j, k))
+        if index is None:
+            index = nodes[(i, j, k)] = len(nodes)
+            coordinates.extend(dimensions[axis] * value / divisions for axis, value in enumerate((i, j, k)))
+        return index
+
+    n = divisions
+    for axis in range(3):
+        u, v = (axis + 1) % 3, (axis + 2) % 3
+        for side in (0, n):
+            for a in range(n):
+                for b in range(n):
+                    corners = []
+                    for du, dv in ((0, 0), (1, 0), (1, 1), (0, 1)):
+                        point = [0, 0, 0]
+                        point[axis], point[u], point[v] = side, a + du, b + dv
+                        corners.append(node(*point))
+                    # Wind the facets of both sides outwards
+                    if side == 0:
+                        corners.reverse()
+                    indices.extend((corners[0], corners[1], corners[2], corners[0], corners[2], corners[3]))
+
+    mesh = _box_meshes[key] = (coordinates, indices)
+    return mesh
+
+
+class MeshCalculator(core.Base):
+    def __init__(self, body):
+        self._body = body
+        self.surfaceTolerance = 0.0
+        self.maxNormalDeviation = 0.0
+        self.maxSideLength = 0.0
+        self.maxAspectRatio = 0.0
+
+    def setQuality(self, quality):
+        self.surfaceTolerance = self._body._size() * _QUALITY_TOLERANCES[quality]
+        self.maxNormalDeviation = math.radians(15)
+        return True
+
+    def calculate(self):
+        # Finer tolerances give more triangles, a quarter of the divisions a
+        # curved body would need keeps meshes of a Medium export small.
+        body = self._body
+        tolerance = self.surfaceTolerance or body._size() * _QUALITY_TOLERANCES[TriangleMeshQualityOptions.NormalQualityTriangleMesh]
+        divisions = max(1, round(body.meshDetail * math.sqrt(body._size() / tolerance) / 4))
+        coordinates, indices = boxMesh(body._dimensions, divisions)
+        offset = body._origin
+        if any(offset):
+            coordinates = [value + offset[i % 3] for i, value in enumerate(coordinates)]
+        body._calculateCount += 1
+        return TriangleMesh(coordinates, indices)
+
+
+class MeshManager(core.Base):
+    def __init__(self, body):
+        self._body = body
+
+    def createMeshCalculator(self):
+        return MeshCalculator(self._body)
+
+
+class BRepBody(core.Base):
+    """A box shaped body. Bodies of occurrences are proxies of the component's body."""
+
+    def __init__(self, component, name, dimensions, origin=(0.0, 0.0, 0.0), material='Steel', native=None, occurrence=None):
+        self._component = component
+        self._native = native
+        self._occurrence = occurrence
+        self._origin = tuple(origin)
+        self._revision = 1
+        self._calculateCount = 0
+        self.isVisible = True
+        self.isValid = True
+        if native:
+            self.entityToken = f"{native.entityToken}/{occurrence.fullPathName}="
+        else:
+            self.meshDetail = 1.0
+            self.name = name
+            self._dimensions = tuple(dimensions)
+            self.material = Material(material) if material else None
+            self.entityToken = f"bRep+{next(_tokens)}/body="
+        self.meshManager = MeshManager(self)
+
+    def __getattr__(self, name):
+        # Proxies share the geometry, name and material of the native body
+        native = self.__dict__.get('_native')
+        if native is not None and name in ('name', 'material', '_dimensions', 'meshDetail'):
+            return getattr(native, name)
+        raise AttributeError(name)
+
+    def __eq__(self, other):
+        return isinstance(other, BRepBody) and other.entityToken == self.entityToken
+
+    def __hash__(self):
+        return hash(self.entityToken)
+
+    @property
+    def nativeObject(self):
+        return self._native
+
+    @property
+    def assemblyContext(self):
+        return self._occurrence
+
+    @property
+    def parentComponent(self):
+        return self._component
+
+    @property
+    def revisionId(self):
+        native = self._native or self
+        return f"rev-{native.entityToken}-{native._revision}"
+
+    @property
+    def boundingBox(self):
+        low = self._origin
+        high = tuple(o + d for o, d in zip(self._origin, self._dimensions))
+        return core.BoundingBox3D(core.Point3D(*low), core.Point3D(*high))
+
+    @property
+    def area(self):
+        x, y, z = self._dimensions
+        return 2 * (x * y + y * z + z * x)
+
+    @property
+    def volume(self):
+        x, y, z = self._dimensions
+        return x * y * z
+
+    def _size(self):
+        return math.sqrt(sum(d * d for d in self._dimensions))
+
+    def modify(self, dimensions=None):
+        """Test helper: edits the body, giving it a new revisionId."""
+        native = self._native or self
+        if dimensions:
+            native._dimensions = tuple(dimensions)
+        native._revision += 1
+
+
+class BRepBodies(core.Base):
+    def __init__(self, bodies):
+        self._bodies = bodies
+
+    @property
+    def count(self):
+        return len(self._bodies)
+
+    def item(self, index):
+        return self._bodies[index]
+
+    def __iter__(self):
+        return iter(list(self._bodies))
+
+    def __len__(self):
+        return len(self._bodies)
+
+
+class Occurrence(core.Base):
+    def __init__(self, component, index, offset):
+        self.component = component
+        self.name = f"{component.name}:{index}"
+        self.fullPathName = self.name
+        self._offset = tuple(offset)
+        self._proxies = {}
+        self.isVisible = True
+
+    @property
+    def bRepBodies(self):
+        proxies = []
+        for body in self.component._bodies:
+            proxy = self._proxies.get(body.entityToken)
+            if proxy is None:
+                origin = tuple(o + p for o, p in zip(body._origin, self._offset))
+                proxy = self._proxies[body.entityToken] = BRepBody(
+                    self.component, None, None, origin, native=body, occurrence=self
+                )
+            proxies.append(proxy)
+        return BRepBodies(proxies)
+
+
+class Component(core.Base):
+    def __init__(self, design, name):
+        self._design = design
+        self.name = name
+        self._bodies = []
+        self._occurrences = []
+
+    @property
+    def bRepBodies(self):
+        return BRepBodies(self._bodies)
+
+    @property
+    def allOccurrences(self):
+        return list(self._occurrences)
+
+    @property
+    def occurrences(self):
+        return list(self._occurrences)
+
+    def addBody(self, name, dimensions=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0), material='Steel'):
+        """Test helper: adds a box shaped body with dimensions in cm."""
+        body = BRepBody(self, name, dimensions, origin, material)
+        self._bodies.append(body)
+        return body
+
+    def addOccurrence(self, component, offset=(0.0, 0.0, 0.0)):
+        """Test helper: adds an instance of component, moved by offset."""
+        occurrence = Occurrence(component, len(self._occurrences) + 1, offset)
+        self._occurrences.append(occurrence)
+        return occurrence
+
+
+class STLExportOptions(core.Base):
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.filename = ''
+        self.meshRefinement = MeshRefinementSettings.MeshRefinementMedium
+        self.surfaceDeviation = 0.0
+        self.normalDeviation = 0.0
+        self.isBinaryFormat = True
+        self.sendToPrintUtility = False
+
+
+class ExportManager(core.Base):
+    def __init__(self):
+        self.executeCount = 0
+        self.exitAfter = None
+
+    def createSTLExportOptions(self, geometry, filename=''):
+        options = STLExportOptions(geometry)
+        options.filename = filename
+        return options
+
+    def execute(self, options):
+        """Writes the body as a binary STL file, adding .stl to the filename like Fusion does.
+
+        Test helper: when exitAfter is set, the export after that many others
+        writes half of its file and ends the process, like Fusion crashing.
+        """
+        body = options.geometry
+        calculator = body.meshManager.createMeshCalculator()
+        if options.meshRefinement == MeshRefinementSettings.MeshRefinementCustom:
+            calculator.surfaceTolerance = options.surfaceDeviation
+            calculator.maxNormalDeviation = options.normalDeviation
+        else:
+            calculator.setQuality(TriangleMeshQualityOptions.NormalQualityTriangleMesh)
+        mesh = calculator.calculate()
+
+        filePath = options.filename
+        if not filePath.lower().endswith('.stl'):
+            filePath += '.stl'
+        data = stlBytes(mesh.nodeCoordinatesAsFloat, mesh.nodeIndices)
+
+        if self.exitAfter is not None and self.executeCount >= self.exitAfter:
+            with open(filePath, 'wb') as f:
+                f.write(data[:len(data) // 2])
+            os._exit(3)
+
+        with open(filePath, 'wb') as f:
+            f.write(data)
+        self.executeCount += 1
+        return True
+
+
+def stlBytes(coordinates, indices, scale=10.0):
+    """Test helper: the binary STL of a mesh in mm, with zero normals."""
+    facet = struct.Struct('<12x9f2x')
+    data = bytearray(80 + 4 + 50 * (len(indices) // 3))
+    struct.pack_into('<I', data, 80, len(indices) // 3)
+    offset = 84
+    for t in range(0, len(indices), 3):
+        a, b, c = indices[t] * 3, indices[t + 1] * 3, indices[t + 2] * 3
+        facet.pack_into(
+            data, offset,
+            *(coordinates[i + axis] * scale for i in (a, b, c) for axis in range(3)),
+        )
+        offset += 50
+    return bytes(data)
+
+
+class Design(core.Base):
+    def __init__(self, name='Design'):
+        self.rootComponent = Component(self, name)
+        self.exportManager = ExportManager()
+
+    @staticmethod
+    def create(name='Design'):
+        """Test helper: a new design, made the active product."""
+        design = Design(name)
+        app = core.Application.get()
+        app.activeProduct = design
+        app.activeDocument = core.Document(name)
+        return design
+
+    def findEntityByToken(self, entityToken):
+        root = self.rootComponent
+        bodies = list(root._bodies)
+        for occurrence in root.allOccurrences:
+            bodies.extend(occurrence.bRepBodies)
+        return [body for body in bodies if body.entityToken == entityToken and body.isValid]
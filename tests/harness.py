@@ -0,0 +1,136 @@
+"""Runs the add-in in a plain Python interpreter, on the stand-in adsk package in fakes/.
+
+The add-in folder is loaded as the package exporttools, whatever the folder
+is called, so its relative imports work like they do inside Fusion. Logging
+to the log file is turned off before the add-in is imported.
+"""
+import importlib
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDIN_DIR = os.path.dirname(TESTS_DIR)
+PACKAGE_NAME = 'exporttools'
+
+if os.path.join(TESTS_DIR, 'fakes') not in sys.path:
+    sys.path.insert(0, os.path.join(TESTS_DIR, 'fakes'))
+
+import adsk.core
+import adsk.fusion
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+def loadAddIn():
+    """Imports the add-in package and returns its commands module."""
+    if PACKAGE_NAME not in sys.modules:
+        spec = importlib.machinery.ModuleSpec(PACKAGE_NAME, None, is_package=True)
+        spec.submodule_search_locations = [ADDIN_DIR]
+        sys.modules[PACKAGE_NAME] = importlib.util.module_from_spec(spec)
+
+        config = importlib.import_module(f'{PACKAGE_NAME}.config')
+        config.DEBUG = False
+        config.LOG_LEVEL = 'INFO'
+        config.LOG_FILE = ''
+    return importlib.import_module(f'{PACKAGE_NAME}.commands')
+
+
+def importModule(name):
+    """Imports a module of the add-in, e.g. 'commands.exportAsSTL.decimate'."""
+    loadAddIn()
+    return importlib.import_module(f'{PACKAGE_NAME}.{name}')
+
+
+def startAddIn():
+    """Starts the add-in on a clean application, like Fusion does when it is run."""
+    commands = loadAddIn()
+    app.resetForTest()
+    resetExportState()
+    importModule('lib.fusionAddInUtils').start_logging()
+    commands.start()
+    return commands
+
+
+def stopAddIn():
+    commands = loadAddIn()
+    commands.stop()
+    futil = importModule('lib.fusionAddInUtils')
+    futil.clear_handlers()
+    futil.stop_logging()
+
+
+def resetExportState():
+    # Module level state of the export command, normally cleared by its dialog
+    entry = importModule('commands.exportAsSTL.entry')
+    entry.active_export = None
+    entry.selection_state.clear()
+    entry.filename_generator.clear()
+    entry.filename_validator.clear()
+    entry.body_sizes.clear()
+    entry.body_areas.clear()
+    entry.triangle_estimates.clear()
+    entry.mesh_column_texts.clear()
+    entry.mesh_column_triangles.clear()
+    entry.mesh_column_total = 0
+    entry.mesh_column_signature = None
+    entry.body_index = entry.body_index.__class__()
+    entry.body_index_synced = False
+    entry.watch_state.clear()
+    entry.watch_settings.clear()
+
+
+def createDesign(bodyCount=3, name='Design', dimensions=(2.0, 1.0, 0.5)):
+    """Creates the active design with bodyCount box shaped bodies in its root component."""
+    design = adsk.fusion.Design.create(name)
+    for i in range(bodyCount):
+        design.rootComponent.addBody(f'Part{i + 1}', dimensions, origin=(i * 3.0, 0.0, 0.0))
+    return design
+
+
+def openExportDialog(folder=None):
+    """Clicks the export button and returns the command of the dialog."""
+    entry = importModule('commands.exportAsSTL.entry')
+    command = ui.commandDefinitions.itemById(entry.CMD_ID).execute()
+    if folder is not None:
+        command.commandInputs.itemById('folderPathInput').text = folder
+    return command
+
+
+def selectBodies(command, bodies):
+    """Adds bodies to the selection of the dialog, one selection event for all of them."""
+    selectionInput = command.commandInputs.itemById('selectedBodies')
+    for body in bodies:
+        selectionInput.addSelection(body)
+    return command.changeInput(selectionInput)
+
+
+def setInput(command, inputId, value):
+    """Sets an input of the dialog like the user would and fires the events that follow.
+
+    Dropdowns take the index of the item to select.
+    """
+    input = command.commandInputs.itemById(inputId)
+    if isinstance(input, adsk.core.DropDownCommandInput):
+        input.listItems.item(value).isSelected = True
+    elif isinstance(input, adsk.core.TextBoxCommandInput):
+        input.text = value
+    else:
+        input.value = value
+    return command.changeInput(input)
+
+
+def runExport(command):
+    """Clicks OK and runs the export chunks until the export is done.
+
+    :returns:
+        The number of chunks run.
+    """
+    command.clickOK()
+    return runPendingEvents()
+
+
+def runPendingEvents():
+    return app.processCustomEvents()
@@ -0,0 +1,139 @@
+import collections
+import zipfile
+
+import pytest
+
+from harness import app, importModule, createDesign, openExportDialog, selectBodies, setInput, stopAddIn
+
+BatchScheduler = importModule('commands.exportAsSTL.batch_scheduler').BatchScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEventLoop:
+    """Runs fired chunks one at a time, like Fusion's custom events between UI events."""
+
+    def __init__(self):
+        self.pending = collections.deque()
+        self.chunks = 0
+
+    def fire(self):
+        self.pending.append(None)
+
+    def run(self, scheduler, limit=None):
+        while self.pending and (limit is None or self.chunks < limit):
+            self.pending.popleft()
+            self.chunks += 1
+            scheduler.runChunk()
+
+
+def makeScheduler(costs, sliceSeconds=0.1, **kwargs):
+    clock = FakeClock()
+    loop = FakeEventLoop()
+    processed = []
+
+    def process(item):
+        clock.now += costs[item]
+        processed.append(item)
+        return 100
+
+    scheduler = BatchScheduler(
+        range(len(costs)), process, loop.fire, sliceSeconds=sliceSeconds, clock=clock, **kwargs
+    )
+    return scheduler, loop, processed
+
+
+def test_chunks_stay_within_slice():
+    costs = [0.03] * 100
+    scheduler, loop, processed = makeScheduler(costs)
+    scheduler.start()
+    loop.run(scheduler)
+
+    assert processed == list(range(100))
+    assert scheduler.finished and not scheduler.cancelled
+    assert scheduler.bytesWritten == 100 * 100
+    # A chunk ends with the item that used up its slice
+    assert scheduler.maxChunkSeconds == pytest.approx(0.12)
+    assert scheduler.chunkCount == loop.chunks == 25
+
+
+def test_slow_item_is_the_longest_stall():
+    costs = [0.01] * 50
+    costs[20] = 2.0
+    scheduler, loop, _ = makeScheduler(costs)
+    scheduler.start()
+    loop.run(scheduler)
+
+    assert scheduler.maxChunkSeconds == pytest.approx(2.0 + 0.01 * 9)
+
+
+def test_cancel_stops_after_current_chunk():
+    completed = []
+    scheduler, loop, processed = makeScheduler([0.05] * 10, onComplete=completed.append)
+    scheduler.start()
+    loop.run(scheduler, limit=2)
+
+    scheduler.cancel()
+    loop.run(scheduler)
+
+    assert processed == [0, 1, 2, 3]
+    assert scheduler.cancelled and scheduler.finished
+    assert completed == [scheduler]
+
+
+def test_is_cancelled_is_polled_before_each_item():
+    scheduler, loop, processed = makeScheduler([0.01] * 10, isCancelled=lambda: len(processed) >= 3)
+    scheduler.start()
+    loop.run(scheduler)
+
+    assert processed == [0, 1, 2]
+    assert scheduler.cancelled
+
+
+def test_empty_batch_completes_at_start():
+    completed = []
+    scheduler, loop, _ = makeScheduler([], onComplete=completed.append)
+    scheduler.start()
+
+    assert completed == [scheduler]
+    assert not loop.pending
+
+
+def test_progress_and_eta():
+    progress = []
+    scheduler, loop, _ = makeScheduler([0.1] * 4, onProgress=lambda s: progress.append((s.index, s.eta)))
+    scheduler.start()
+    loop.run(scheduler)
+
+    assert [index for index, _ in progress] == [1, 2, 3, 4]
+    assert progress[0][1] == pytest.approx(0.3)
+    assert progress[-1][1] == 0
+
+
+def test_stopping_add_in_finishes_running_export(entry, tmp_path, monkeypatch):
+    # One body per chunk, so the export is still running after the first
+    monkeypatch.setattr(entry, 'EXPORT_SLICE_SECONDS', 0)
+    design = createDesign(5)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, design.rootComponent.bRepBodies)
+    setInput(command, 'outputFormatInput', entry.FORMAT_3MF)
+    command.clickOK()
+    app.processCustomEvents(limit=2)
+
+    job = entry.active_export
+    assert job and not job.scheduler.finished
+    stopAddIn()
+
+    assert entry.active_export is None
+    assert job.scheduler.finished and job.scheduler.cancelled
+    assert not job.progressDialog.isShowing
+    assert job.journal._file is None
+    with zipfile.ZipFile(tmp_path / 'Design.3mf') as package:
+        assert package.testzip() is None
+        assert package.read('3D/3dmodel.model').count(b'<object ') == 2
@@ -0,0 +1,95 @@
+import pytest
+
+from harness import importModule, createDesign
+
+body_index = importModule('commands.exportAsSTL.body_index')
+entry = importModule('commands.exportAsSTL.entry')
+
+
+def createAssembly():
+    design = createDesign(0)
+    root = design.rootComponent
+    root.addBody('Bolt M6', (1.0, 1.0, 1.0), material='Steel')
+    root.addBody('Bolt M8', (2.0, 1.0, 1.0), material='Steel')
+    root.addBody('Cover', (4.0, 4.0, 0.5), material='Aluminum 6061')
+    return design
+
+
+def syncedIndex(design):
+    index = body_index.BodyIndex()
+    index.sync(entry.iterDesignBodies(design.rootComponent))
+    return index
+
+
+def names(bodies):
+    return [body.name for body in bodies]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('bolt*', ['Bolt M6', 'Bolt M8']),
+    ('"bolt m6"', ['Bolt M6']),
+    ('"Bolt M6" cover', ['Bolt M6', 'Cover']),
+    ('name:/^bolt.m\\d$/', ['Bolt M6', 'Bolt M8']),
+    ('"path:" cover', ['Cover']),
+    ('material:aluminum*', ['Cover']),
+    ('material:steel volume:1.5..', ['Bolt M8']),
+    ('volume:..1', ['Bolt M6']),
+    ('volume:2..8', ['Bolt M8', 'Cover']),
+    ('visible:yes bolt*', ['Bolt M6', 'Bolt M8']),
+    ('visible:no', []),
+    ('', ['Bolt M6', 'Bolt M8', 'Cover']),
+])
+def test_query(text, expected):
+    design = createAssembly()
+    assert names(syncedIndex(design).query(text)) == expected
+
+
+@pytest.mark.parametrize('text', ['visible:maybe', 'volume:abc', 'volume:1..x', 'volume:5', 'name:/[/'])
+def test_invalid_queries_raise(text):
+    with pytest.raises(ValueError):
+        body_index.parseQuery(text)
+
+
+def test_sync_sees_renamed_and_hidden_bodies():
+    design = createAssembly()
+    root = design.rootComponent
+    index = syncedIndex(design)
+
+    bolt = root.bRepBodies.item(0)
+    bolt.name = 'Screw M6'
+    bolt.isVisible = False
+    root.bRepBodies.item(2).material = None
+    readCount = index.sync(entry.iterDesignBodies(root))
+
+    # Nothing was edited, so no volume is computed again
+    assert readCount == 0
+    assert names(index.query('screw*')) == ['Screw M6']
+    assert names(index.query('bolt*')) == ['Bolt M8']
+    assert names(index.query('visible:no')) == ['Screw M6']
+    assert names(index.query('material:aluminum*')) == []
+
+
+def test_sync_sees_renamed_occurrences():
+    design = createDesign(0)
+    root = design.rootComponent
+    frame = type(root)(design, 'Frame')
+    frame.addBody('Rail', (1.0, 1.0, 1.0))
+    occurrence = root.addOccurrence(frame)
+    index = syncedIndex(design)
+    assert len(index.query('path:frame*')) == 1
+
+    occurrence.fullPathName = 'Chassis:1'
+    index.sync(entry.iterDesignBodies(root))
+
+    assert index.query('path:frame*') == []
+    assert len(index.query('path:chassis*')) == 1
+
+
+def test_sync_computes_the_volume_of_edited_bodies_only():
+    design = createAssembly()
+    root = design.rootComponent
+    index = syncedIndex(design)
+
+    root.bRepBodies.item(0).modify((3.0, 3.0, 3.0))
+    assert index.sync(entry.iterDesignBodies(root)) == 1
+    assert names(index.query('volume:20..')) == ['Bolt M6']
@@ -0,0 +1,61 @@
+import gzip
+import os
+import zipfile
+
+from harness import importModule
+
+compression = importModule('commands.exportAsSTL.compression')
+
+
+def writeSource(filePath, size):
+    data = os.urandom(size // 2) * 2
+    filePath.write_bytes(data)
+    return data
+
+
+def test_gzip_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression, 'CHUNK_SIZE', 1000)
+    data = writeSource(tmp_path / 'Part.stl', 10001)
+    targetPath = tmp_path / 'Part.stl.gz'
+
+    size = compression.gzipFile(str(tmp_path / 'Part.stl'), str(targetPath))
+
+    assert size == targetPath.stat().st_size
+    with gzip.open(targetPath, 'rb') as f:
+        assert f.read() == data
+
+
+def test_gzip_output_is_deterministic_and_stores_the_name(tmp_path):
+    writeSource(tmp_path / 'Part.stl', 5000)
+    compression.gzipFile(str(tmp_path / 'Part.stl'), str(tmp_path / 'a.stl.gz'))
+    os.utime(tmp_path / 'Part.stl', (0, 0))
+    compression.gzipFile(str(tmp_path / 'Part.stl'), str(tmp_path / 'a.stl.GZ'))
+
+    first = (tmp_path / 'a.stl.gz').read_bytes()
+    assert first == (tmp_path / 'a.stl.GZ').read_bytes()
+    # No timestamp in the header, and the name of the uncompressed file after it
+    assert first[4:8] == b'\0\0\0\0'
+    assert first[10:].startswith(b'a.stl\0')
+
+
+def test_batch_archive_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression, 'CHUNK_SIZE', 1000)
+    files = {f'Part{i}.stl': writeSource(tmp_path / f'Part{i}.stl', 3000 * i + 1) for i in range(3)}
+    archivePath = tmp_path / 'Design.zip'
+    tempPath = tmp_path / 'Design.zip.partial'
+
+    archive = compression.BatchArchive(str(archivePath), 9, str(tempPath))
+    for name in files:
+        archive.addFile(str(tmp_path / name), name)
+    assert archive.fileCount == 3
+    assert tempPath.exists() and not archivePath.exists()
+
+    archive.close()
+    archive.close()
+
+    assert archivePath.exists() and not tempPath.exists()
+    with zipfile.ZipFile(archivePath) as f:
+        assert f.testzip() is None
+        assert f.namelist() == list(files)
+        assert {name: f.read(name) for name in f.namelist()} == files
+        assert all(info.compress_type == zipfile.ZIP_DEFLATED for info in f.infolist())
@@ -0,0 +1,60 @@
+import pytest
+
+import adsk.fusion
+from harness import importModule
+
+decimate = importModule('commands.exportAsSTL.decimate')
+
+
+def writeBox(filePath, divisions):
+    coordinates, indices = adsk.fusion.boxMesh((4.0, 2.0, 1.0), divisions)
+    with open(filePath, 'wb') as f:
+        f.write(adsk.fusion.stlBytes(coordinates, indices))
+    return len(indices) // 3
+
+
+def test_decimates_to_target(tmp_path):
+    filePath = str(tmp_path / 'box.stl')
+    facets = writeBox(filePath, 20)
+
+    header, vertices, indices, facetCount = decimate.readBinaryStl(filePath)
+    assert facetCount == facets == len(indices) // 3
+    assert len(vertices) // 3 == 6 * 21 * 21 - 12 * 21 + 8
+
+    info = {}
+    decimate.makeDecimateStage(targetRatio=0.1)(filePath, info)
+    decimation = info['decimation']
+    assert decimation['before'] == facets
+    assert facets * 0.1 * decimate.SEARCH_TOLERANCE * 0.5 <= decimation['after'] <= facets * 0.1
+    assert decimate.readFacetCount(filePath) == decimation['after']
+
+    # Vertices move by less than the diagonal of a grid cell
+    assert decimation['maxError'] < 40.0 * 3 ** 0.5
+
+
+def test_large_files_are_skipped(tmp_path):
+    filePath = str(tmp_path / 'box.stl')
+    facets = writeBox(filePath, 10)
+
+    info = {}
+    decimate.makeDecimateStage(targetRatio=0.5, maxFacets=facets - 1)(filePath, info)
+    assert info == {'decimationSkipped': facets}
+    assert decimate.readFacetCount(filePath) == facets
+
+
+def test_interrupted_decimation_is_cleared_on_resume(tmp_path, monkeypatch):
+    filePath = str(tmp_path / 'box.stl')
+    writeBox(filePath, 10)
+
+    def crash(source, target):
+        raise OSError('Fusion closed')
+
+    # The decimated file is written but never moved into place
+    monkeypatch.setattr(decimate.os, 'replace', crash)
+    with pytest.raises(OSError):
+        decimate.makeDecimateStage(targetRatio=0.5)(filePath, {})
+    monkeypatch.undo()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['.box.decimate.partial.stl', 'box.stl']
+
+    importModule('commands.exportAsSTL.entry').removePartialFiles(str(tmp_path))
+    assert [path.name for path in tmp_path.iterdir()] == ['box.stl']
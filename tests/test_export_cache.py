@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from harness import ui, importModule, createDesign, openExportDialog, selectBodies, runExport
+
+export_cache = importModule('commands.exportAsSTL.export_cache')
+ExportCache = export_cache.ExportCache
+
+
+def exportAll(design, folder):
+    command = openExportDialog(str(folder))
+    selectBodies(command, design.rootComponent.bRepBodies)
+    runExport(command)
+
+
+def test_second_run_does_not_export(entry, tmp_path):
+    design = createDesign(3)
+    exportMgr = design.exportManager
+
+    exportAll(design, tmp_path)
+    assert exportMgr.executeCount == 3
+
+    exportAll(design, tmp_path)
+    assert exportMgr.executeCount == 3
+    assert ui.messages[-1].startswith('Exported 0, skipped 3 unchanged or already done, failed 0')
+
+
+def test_changed_body_is_exported_again(entry, tmp_path):
+    design = createDesign(3)
+    exportMgr = design.exportManager
+    exportAll(design, tmp_path)
+
+    design.rootComponent.bRepBodies.item(1).modify()
+    exportAll(design, tmp_path)
+
+    assert exportMgr.executeCount == 4
+    assert ui.messages[-1].startswith('Exported 1, skipped 2')
+
+
+def test_touched_file_is_exported_again(entry, tmp_path):
+    design = createDesign(2)
+    exportMgr = design.exportManager
+    exportAll(design, tmp_path)
+
+    with open(tmp_path / 'Part2.stl', 'ab') as f:
+        f.write(b'\0')
+    exportAll(design, tmp_path)
+
+    assert exportMgr.executeCount == 3
+
+
+def writeFile(folder, name, data=b'solid'):
+    with open(os.path.join(folder, name), 'wb') as f:
+        f.write(data)
+
+
+def test_record_and_reload(tmp_path):
+    writeFile(tmp_path, 'a (1).stl')
+    cache = ExportCache(str(tmp_path))
+    key = ExportCache.makeKey('rev1', 'Medium')
+    cache.record('a.stl', key, 'a (1).stl')
+    cache.save()
+
+    reloaded = ExportCache(str(tmp_path))
+    assert reloaded.isFresh('a.stl', key)
+    assert reloaded.writtenName('a.stl') == 'a (1).stl'
+    assert not reloaded.isFresh('a.stl', ExportCache.makeKey('rev2', 'Medium'))
+    assert not reloaded.isFresh('b.stl', key)
+
+
+def test_missing_or_changed_file_is_not_fresh(tmp_path):
+    writeFile(tmp_path, 'a.stl')
+    cache = ExportCache(str(tmp_path))
+    cache.record('a.stl', 'key')
+
+    writeFile(tmp_path, 'a.stl', b'solid body')
+    assert not cache.isFresh('a.stl', 'key')
+
+    cache.restat(['a.stl'])
+    assert cache.isFresh('a.stl', 'key')
+
+    os.remove(tmp_path / 'a.stl')
+    assert not cache.isFresh('a.stl', 'key')
+
+
+@pytest.mark.parametrize('content', ['{not json', '{"version": 0, "entries": {"a.stl": {}}}', '[]'])
+def test_unreadable_index_is_empty(tmp_path, content):
+    with open(tmp_path / export_cache.CACHE_FILENAME, 'w') as f:
+        f.write(content)
+    writeFile(tmp_path, 'a.stl')
+
+    cache = ExportCache(str(tmp_path))
+    assert not cache.isFresh('a.stl', 'key')
+    assert cache.writtenName('a.stl') == 'a.stl'
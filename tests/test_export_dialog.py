@@ -0,0 +1,103 @@
+import os
+
+from harness import ui, createDesign, openExportDialog, selectBodies, setInput, runExport
+
+
+def test_dialog_exports_selected_bodies(entry, tmp_path):
+    design = createDesign(3)
+    command = openExportDialog(str(tmp_path))
+
+    assert selectBodies(command, design.rootComponent.bRepBodies)
+    table = command.commandInputs.itemById('filenameTable')
+    assert table.rowCount == 3
+    assert [table.getInputAtPosition(row, 0).value for row in range(3)] == ['Part1.stl', 'Part2.stl', 'Part3.stl']
+
+    runExport(command)
+
+    assert entry.active_export is None
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.stl')) == [
+        'Part1.stl', 'Part2.stl', 'Part3.stl',
+    ]
+    assert ui.messages and ui.messages[-1].startswith('Exported 3, skipped 0')
+
+
+def test_invalid_filename_disables_ok(entry, tmp_path):
+    design = createDesign(1)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, design.rootComponent.bRepBodies)
+
+    nameInput = command.commandInputs.itemById('filenameTable').getInputAtPosition(0, 0)
+    nameInput.value = 'bad:name.stl'
+    assert not command.changeInput(nameInput)
+    assert command.commandInputs.itemById('errorTextInput').text
+
+    nameInput.value = 'good.stl'
+    assert command.changeInput(nameInput)
+
+
+def test_mesh_column_shows_estimates(entry, tmp_path):
+    design = createDesign(2)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, design.rootComponent.bRepBodies)
+
+    table = command.commandInputs.itemById('filenameTable')
+    assert 'triangles' in table.getInputAtPosition(0, 1).text
+    assert 'for 2 bodies' in command.commandInputs.itemById('estimateInput').text
+
+    setInput(command, 'outputEncodingInput', entry.ENCODING_GZIP)
+    assert command.commandInputs.itemById('estimateInput').text.endswith('before compression')
+
+
+def test_mesh_column_follows_inputs_without_preview(entry, tmp_path):
+    # The folder doesn't exist, so the inputs are invalid and there is no preview
+    design = createDesign(2)
+    command = openExportDialog(str(tmp_path / 'missing'))
+    assert not selectBodies(command, design.rootComponent.bRepBodies)
+
+    estimateInput = command.commandInputs.itemById('estimateInput')
+    meshInput = command.commandInputs.itemById('filenameTable').getInputAtPosition(0, 1)
+    assert 'for 2 bodies' in estimateInput.text
+    assert meshInput.text.startswith('Medium')
+
+    setInput(command, 'refinementModeInput', entry.REFINEMENT_ADAPTIVE)
+    adaptiveText = meshInput.text
+    assert not adaptiveText.startswith('Medium')
+    setInput(command, 'triangleBudgetInput', 100)
+    assert meshInput.text != adaptiveText
+
+    setInput(command, 'outputEncodingInput', entry.ENCODING_GZIP)
+    assert estimateInput.text.endswith('before compression')
+
+
+def test_mesh_column_updates_only_changed_rows(entry, tmp_path, monkeypatch):
+    design = createDesign(5)
+    bodies = list(design.rootComponent.bRepBodies)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, bodies[:4])
+    estimateInput = command.commandInputs.itemById('estimateInput')
+    assert 'for 4 bodies' in estimateInput.text
+
+    estimated = []
+    estimateBodyTriangles = entry.estimateBodyTriangles
+    monkeypatch.setattr(entry, 'estimateBodyTriangles', lambda body, refinement=None: (
+        estimated.append(body.name), estimateBodyTriangles(body, refinement))[1])
+
+    selectionInput = command.commandInputs.itemById('selectedBodies')
+    selectionInput.removeSelection(0)
+    selectBodies(command, bodies[4:])
+    assert estimated == ['Part5']
+    assert 'for 4 bodies' in estimateInput.text
+
+    # The running total matches estimating every row again
+    text = estimateInput.text
+    entry.mesh_column_signature = None
+    entry.updateMeshColumn(command.commandInputs)
+    assert estimateInput.text == text
+
+    # A budget is shared by the selection, so its rows are planned together
+    setInput(command, 'refinementModeInput', entry.REFINEMENT_ADAPTIVE)
+    setInput(command, 'triangleBudgetInput', 100)
+    estimated.clear()
+    selectBodies(command, bodies[:1])
+    assert sorted(estimated) == ['Part1', 'Part2', 'Part3', 'Part4', 'Part5']
+    assert 'for 5 bodies' in estimateInput.text
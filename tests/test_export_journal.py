@@ -0,0 +1,54 @@
+import os
+import threading
+
+from harness import importModule, createDesign, openExportDialog, selectBodies, runExport
+
+export_journal = importModule('commands.exportAsSTL.export_journal')
+manifest = importModule('commands.exportAsSTL.manifest')
+ExportJournal = export_journal.ExportJournal
+
+
+def test_files_are_hashed_off_the_main_thread(entry, tmp_path, monkeypatch):
+    hashThreads = []
+    fileSha256 = export_journal.fileSha256
+
+    def recordThread(filePath):
+        hashThreads.append(threading.current_thread())
+        return fileSha256(filePath)
+
+    monkeypatch.setattr(export_journal, 'fileSha256', recordThread)
+    manifestHashes = []
+    monkeypatch.setattr(manifest, 'hashFile', manifestHashes.append)
+
+    design = createDesign(3)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, list(design.rootComponent.bRepBodies))
+    runExport(command)
+
+    # The manifest takes the checksums the journal computed in the background
+    assert len(hashThreads) == 3 and threading.main_thread() not in hashThreads
+    assert manifestHashes == []
+    assert all(fileEntry['sha256'] for fileEntry in manifest.readManifest(str(tmp_path))['files'])
+
+
+def test_entries_are_complete_before_their_checksum(tmp_path):
+    (tmp_path / 'Part1.stl').write_bytes(b'solid')
+    journal = ExportJournal(str(tmp_path))
+    journal.record('Part1.stl', 'key')
+    journal.close()
+
+    journalPath = tmp_path / export_journal.JOURNAL_FILENAME
+    lines = journalPath.read_text().splitlines()
+    assert len(lines) == 2
+    assert ExportJournal(str(tmp_path))._entries['Part1.stl']['sha256'] == journal.digests['Part1.stl'][1]
+
+    # A crash before the checksum line leaves the size and modification time to check
+    journalPath.write_text(lines[0] + '\n')
+    assert ExportJournal(str(tmp_path)).isComplete('Part1.stl', 'key')
+    assert not ExportJournal(str(tmp_path)).isComplete('Part1.stl', 'other key')
+
+    # Same size, written a second later
+    mtime = (tmp_path / 'Part1.stl').stat().st_mtime_ns
+    (tmp_path / 'Part1.stl').write_bytes(b'SOLID')
+    os.utime(tmp_path / 'Part1.stl', ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+    assert not ExportJournal(str(tmp_path)).isComplete('Part1.stl', 'key')
@@ -0,0 +1,63 @@
+import pytest
+
+from harness import importModule
+
+filename_generator = importModule('commands.exportAsSTL.filename_generator')
+FilenameValidator = importModule('commands.exportAsSTL.filename_validator').FilenameValidator
+
+
+@pytest.mark.parametrize('style, expected', [
+    (filename_generator.STYLE_NONE, 'pre-bracket_Left arm2-post.stl'),
+    (filename_generator.STYLE_PASCAL, 'pre-BracketLeftArmV2-post.stl'),
+    (filename_generator.STYLE_CAMEL, 'pre-bracketLeftArmV2-post.stl'),
+    (filename_generator.STYLE_SNAKE, 'pre-bracket_left_arm_v2-post.stl'),
+    (filename_generator.STYLE_KEBAB, 'pre-bracket-left-arm-v2-post.stl'),
+    (filename_generator.STYLE_SPACE, 'pre-bracket left arm v2-post.stl'),
+])
+def test_styles(style, expected):
+    generator = filename_generator.FilenameGenerator()
+    assert generator.generate('bracket_Left arm', '2', 'pre-', '-post', style) == expected
+
+
+def test_words_split_on_camel_case_and_invalid_characters_are_dropped():
+    generator = filename_generator.FilenameGenerator()
+    assert generator.tokenize('mountPlate: top?. ') == ('mountPlate top', ('mount', 'plate', 'top'), '')
+    assert generator.generate('mountPlate', '', '', '', filename_generator.STYLE_SNAKE) == 'mount_plate.stl'
+
+
+def test_words_are_cached_per_body_name():
+    generator = filename_generator.FilenameGenerator()
+    names = generator.generateAll(['Part A', 'Part A', 'Part B'], '1', '', '', filename_generator.STYLE_KEBAB)
+    assert names == ['part-a-v1.stl', 'part-a-v1.stl', 'part-b-v1.stl']
+    assert len(generator._tokens) == 2
+
+    generator.clear()
+    assert not generator._tokens
+
+
+def test_validator_reports_invalid_and_duplicate_names():
+    validator = FilenameValidator()
+    validator.update('row1', 'a.stl')
+    validator.update('row2', 'a.stl')
+    validator.update('row3', 'b|c.stl')
+    assert validator.problems() == [
+        "Filename 'b|c.stl' contains invalid characters.",
+        "Duplicate filenames found: a.stl",
+    ]
+
+    # Editing or removing one row only changes what that row caused
+    validator.update('row3', 'c.stl')
+    assert validator.problems() == ["Duplicate filenames found: a.stl"]
+    validator.remove('row2')
+    assert validator.problems() == []
+    assert len(validator) == 2 and 'row2' not in validator
+
+
+def test_validator_duplicate_stays_while_two_rows_remain():
+    validator = FilenameValidator()
+    for row in ('row1', 'row2', 'row3'):
+        validator.update(row, 'a.stl')
+    validator.update('row1', 'b.stl')
+    assert validator.problems() == ["Duplicate filenames found: a.stl"]
+    validator.update('row2', 'b.stl')
+    assert validator.problems() == ["Duplicate filenames found: b.stl"]
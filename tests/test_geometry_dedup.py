@@ -0,0 +1,79 @@
+import os
+import struct
+
+from harness import ui, importModule, createDesign, openExportDialog, selectBodies, setInput, runExport
+import adsk.fusion
+
+ExportJournal = importModule('commands.exportAsSTL.export_journal').ExportJournal
+readManifest = importModule('commands.exportAsSTL.manifest').readManifest
+
+
+def facetCount(filePath):
+    with open(filePath, 'rb') as f:
+        f.seek(80)
+        return struct.unpack('<I', f.read(4))[0]
+
+
+def createBolts(count):
+    design = createDesign(0)
+    bolt = adsk.fusion.Component(design, 'Bolt')
+    bolt.addBody('Body1', (0.5, 0.5, 3.0))
+    for i in range(count):
+        design.rootComponent.addOccurrence(bolt, (2 * i, 0, 0))
+    bodies = [body for occurrence in design.rootComponent.allOccurrences for body in occurrence.bRepBodies]
+    return design, bodies
+
+
+def exportBolts(folder, bodies):
+    folder.mkdir()
+    command = openExportDialog(str(folder))
+    selectBodies(command, bodies)
+    setInput(command, 'reuseGeometryButton', True)
+
+    # Every instance gets a filename of its own
+    table = command.commandInputs.itemById('filenameTable')
+    for row in range(table.rowCount):
+        nameInput = table.getInputAtPosition(row, 0)
+        nameInput.value = f'Bolt{row + 1}.stl'
+        command.changeInput(nameInput)
+    runExport(command)
+
+
+def test_reused_files_are_post_processed(entry, config, tmp_path):
+    design, bodies = createBolts(3)
+    exportBolts(tmp_path / 'plain', bodies)
+    originalFacets = facetCount(tmp_path / 'plain' / 'Bolt1.stl')
+
+    config.POST_EXPORT_DECIMATE_RATIO = 0.5
+    config.POST_EXPORT_CHECKSUM = True
+    exportBolts(tmp_path / 'decimated', bodies)
+    folder = tmp_path / 'decimated'
+
+    assert design.exportManager.executeCount == 2
+    assert 'Reused identical geometry for 2 bodies' in ui.messages[-1]
+    assert 'Decimated 3 files' in ui.messages[-1]
+
+    # Each file is decimated once, not again through a link to a decimated file
+    names = [f'Bolt{n}.stl' for n in (1, 2, 3)]
+    counts = {facetCount(folder / name) for name in names}
+    assert len(counts) == 1 and counts.pop() <= originalFacets // 2 + 1
+    assert not [name for name in os.listdir(folder) if '.partial' in name]
+
+    journal = ExportJournal(str(folder))
+    assert all(journal.writtenName(name) == name for name in names)
+    assert len(journal._entries) == 3
+
+    sameAs = {record['file']: record.get('sameAs') for record in readManifest(str(folder))['files']}
+    assert sameAs == {'Bolt1.stl': None, 'Bolt2.stl': 'Bolt1.stl', 'Bolt3.stl': 'Bolt1.stl'}
+
+
+def test_refinement_is_part_of_the_fingerprint(entry):
+    design, bodies = createBolts(1)
+    body = bodies[0]
+
+    class Refinement:
+        surfaceDeviation = 0.01
+        normalDeviation = 0.2
+
+    assert entry.getGeometryFingerprint(body) != entry.getGeometryFingerprint(body, Refinement())
+    assert entry.getGeometryFingerprint(body, Refinement()) == entry.getGeometryFingerprint(body.nativeObject, Refinement())
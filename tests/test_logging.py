@@ -0,0 +1,39 @@
+from harness import app, importModule
+import adsk.core
+
+futil = importModule('lib.fusionAddInUtils')
+general_utils = importModule('lib.fusionAddInUtils.general_utils')
+
+
+def test_restarted_add_in_logs_again(addin):
+    listener = general_utils._listener
+    futil.start_logging()
+    assert general_utils._listener is listener
+
+    futil.log('before stop')
+    futil.stop_logging()
+    assert futil.recent_log_messages(1)[0].endswith('before stop')
+
+    # Nothing is queued while stopped, Fusion may restart the add-in without importing it again
+    futil.log('while stopped')
+    assert not futil.is_log_enabled()
+    futil.start_logging()
+    futil.log('after restart')
+    futil.stop_logging()
+    assert [message.split(' ', 3)[-1] for message in futil.recent_log_messages()] == ['after restart']
+    futil.start_logging()
+
+
+def test_errors_carry_recent_messages(addin):
+    futil.log('opened the dialog')
+    # Wait for the background thread to buffer it
+    general_utils._listener.stop()
+    general_utils._listener.start()
+    try:
+        raise ValueError('broken')
+    except ValueError:
+        futil.handle_error('export')
+
+    fileLogs = [message for message, _, logType in app.logMessages if logType == adsk.core.LogTypes.FileLogType]
+    assert fileLogs[0].startswith('Recent messages:') and 'opened the dialog' in fileLogs[0]
+    assert 'ValueError: broken' in fileLogs[-1]
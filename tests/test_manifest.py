@@ -0,0 +1,52 @@
+import hashlib
+
+from harness import importModule, createDesign, openExportDialog, selectBodies, runExport
+
+manifest = importModule('commands.exportAsSTL.manifest')
+export_journal = importModule('commands.exportAsSTL.export_journal')
+post_process = importModule('commands.exportAsSTL.post_process')
+
+
+def countCalls(monkeypatch, module, name):
+    calls = []
+    function = getattr(module, name)
+
+    def counted(filePath):
+        calls.append(filePath)
+        return function(filePath)
+
+    monkeypatch.setattr(module, name, counted)
+    return calls
+
+
+def test_each_file_is_hashed_once(entry, config, tmp_path, monkeypatch):
+    config.POST_EXPORT_CHECKSUM = True
+    stageHashes = countCalls(monkeypatch, post_process, 'fileSha256')
+    journalHashes = countCalls(monkeypatch, export_journal, 'fileSha256')
+    manifestHashes = countCalls(monkeypatch, manifest, 'hashFile')
+
+    design = createDesign(3)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, list(design.rootComponent.bRepBodies))
+    runExport(command)
+
+    assert len(stageHashes) == 3
+    assert journalHashes == [] and manifestHashes == []
+    for fileEntry in manifest.readManifest(str(tmp_path))['files']:
+        assert fileEntry['sha256'] == hashlib.sha256((tmp_path / fileEntry['file']).read_bytes()).hexdigest()
+
+
+def test_files_that_cannot_be_read_are_reported(tmp_path, monkeypatch):
+    (tmp_path / 'a.stl').write_bytes(b'solid')
+    (tmp_path / 'b.stl').write_bytes(b'solid')
+
+    def hashFile(filePath):
+        raise PermissionError('denied')
+
+    monkeypatch.setattr(manifest, 'hashFile', hashFile)
+    digest = hashlib.sha256(b'solid').hexdigest()
+    _, changes = manifest.writeManifest(str(tmp_path), [{'file': 'a.stl'}, {'file': 'b.stl'}], digests={'b.stl': (5, digest)})
+
+    assert changes['failed'] == {'a.stl': 'PermissionError: denied'}
+    files = {fileEntry['file']: fileEntry['sha256'] for fileEntry in manifest.readManifest(str(tmp_path))['files']}
+    assert files == {'a.stl': None, 'b.stl': digest}
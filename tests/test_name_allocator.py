@@ -0,0 +1,35 @@
+from harness import importModule
+
+NameAllocator = importModule('commands.exportAsSTL.name_allocator').NameAllocator
+
+
+def test_duplicates_in_a_batch_get_counters():
+    allocator = NameAllocator(None)
+    assert [allocator.allocate('Part.stl') for _ in range(3)] == ['Part.stl', 'Part(1).stl', 'Part(2).stl']
+    assert allocator.allocate('Other.stl') == 'Other.stl'
+
+
+def test_existing_files_are_kept(tmp_path):
+    for name in ('Part.stl', 'Part(1).stl', 'Part(4).stl', 'Bolt.STL'):
+        (tmp_path / name).write_bytes(b'')
+    allocator = NameAllocator(str(tmp_path))
+
+    # Counting goes on after the highest counter in the folder
+    assert allocator.allocate('Part.stl') == 'Part(5).stl'
+    assert allocator.allocate('Part(1).stl') == 'Part(6).stl'
+    assert allocator.allocate('Part(2).stl') == 'Part(2).stl'
+
+    # Names differing only in case collide
+    assert allocator.allocate('bolt.stl') == 'bolt(1).stl'
+
+
+def test_counter_skips_names_taken_out_of_order(tmp_path):
+    allocator = NameAllocator(None)
+    assert allocator.allocate('Part(1).stl') == 'Part(1).stl'
+    assert allocator.allocate('Part.stl') == 'Part.stl'
+    assert allocator.allocate('Part.stl') == 'Part(2).stl'
+
+
+def test_missing_folder_is_empty(tmp_path):
+    allocator = NameAllocator(str(tmp_path / 'missing'))
+    assert allocator.allocate('Part.stl') == 'Part.stl'
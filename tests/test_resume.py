@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+from harness import TESTS_DIR
+
+# Exports six bodies in a fresh interpreter, so a crash ends only that
+# process and the bodies get the same tokens and revisions in every run.
+EXPORT_SCRIPT = '''
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import harness
+
+harness.startAddIn()
+design = harness.createDesign(6)
+design.exportManager.exitAfter = json.loads(sys.argv[3])
+entry = harness.importModule('commands.exportAsSTL.entry')
+job = entry.exportAllBodies(sys.argv[2], replace=False, resume=True)
+print(json.dumps({
+    'executeCount': design.exportManager.executeCount,
+    'statuses': {record['file']: record['status'] for record in job.records},
+}))
+'''
+
+
+def runExport(folder, exitAfter=None):
+    return subprocess.run(
+        [sys.executable, '-c', EXPORT_SCRIPT, TESTS_DIR, str(folder), json.dumps(exitAfter)],
+        capture_output=True, text=True,
+    )
+
+
+def isCompleteStl(filePath):
+    with open(filePath, 'rb') as f:
+        data = f.read()
+    return len(data) == 84 + 50 * int.from_bytes(data[80:84], 'little')
+
+
+def test_resume_after_crash_exports_only_the_rest(tmp_path):
+    # Fusion dies while writing the fourth body
+    crashed = runExport(tmp_path, exitAfter=3)
+    assert crashed.returncode == 3
+    names = sorted(os.listdir(tmp_path))
+    assert names == ['.Part4.partial.stl', '.exporttools-journal.jsonl', 'Part1.stl', 'Part2.stl', 'Part3.stl']
+    assert not isCompleteStl(tmp_path / '.Part4.partial.stl')
+
+    resumed = runExport(tmp_path)
+    assert resumed.returncode == 0, resumed.stderr
+    result = json.loads(resumed.stdout)
+    assert result['executeCount'] == 3
+    assert result['statuses'] == {
+        'Part1.stl': 'resumed', 'Part2.stl': 'resumed', 'Part3.stl': 'resumed',
+        'Part4.stl': 'exported', 'Part5.stl': 'exported', 'Part6.stl': 'exported',
+    }
+
+    # The unfinished file is gone and no body got a (1) name
+    stlNames = sorted(name for name in os.listdir(tmp_path) if name.endswith('.stl'))
+    assert stlNames == [f'Part{n}.stl' for n in range(1, 7)]
+    assert all(isCompleteStl(tmp_path / name) for name in stlNames)
+
+    # Nothing is left to do
+    again = json.loads(runExport(tmp_path).stdout)
+    assert again['executeCount'] == 0
@@ -0,0 +1,108 @@
+import os
+
+from harness import ui, importModule, createDesign, openExportDialog, selectBodies, runExport
+import adsk.fusion
+
+SelectionState = importModule('commands.exportAsSTL.selection_state').SelectionState
+readManifest = importModule('commands.exportAsSTL.manifest').readManifest
+
+
+class FakeBody:
+    def __init__(self, entityToken, revisionId='rev'):
+        self.entityToken = entityToken
+        self.revisionId = revisionId
+
+
+class FakeTable:
+    def __init__(self):
+        self.rows = []
+
+    def deleteRow(self, row):
+        del self.rows[row]
+
+
+def update(state, table, bodies):
+    def createRow(rowId, body, row):
+        assert row == len(table.rows)
+        table.rows.append((rowId, body.entityToken))
+
+    return state.update(bodies, table, createRow)
+
+
+def test_rows_follow_selection():
+    state = SelectionState()
+    table = FakeTable()
+    a, b, c, d = (FakeBody(token) for token in 'abcd')
+
+    added, removed = update(state, table, [a, b, c])
+    assert len(added) == 3 and removed == []
+    assert [token for _, token in table.rows] == ['a', 'b', 'c']
+
+    rowIdOfB = state.rowIdOf(b)
+    added, removed = update(state, table, [c, d, a])
+    assert removed == [rowIdOfB]
+    assert [token for _, token in table.rows] == ['a', 'c', 'd']
+    assert [rowId for rowId, _ in table.rows] == [rowId for rowId, _ in state.items()]
+    assert state.rowIdOf(b) is None
+    assert state.rowIdOf(d) == added[0]
+
+
+def test_occurrences_get_rows_of_their_own():
+    # Instances of a component share the revisionId of their bodies
+    state = SelectionState()
+    table = FakeTable()
+    first, second = FakeBody('tok/1+=', 'rev'), FakeBody('tok/2+=', 'rev')
+
+    update(state, table, [first, second])
+    assert len(table.rows) == 2
+    assert state.rowIdOf(first) != state.rowIdOf(second)
+    assert all('/' not in rowId and '=' not in rowId for rowId, _ in table.rows)
+
+
+def test_dialog_exports_every_occurrence(entry, tmp_path):
+    design = createDesign(0)
+    bolt = adsk.fusion.Component(design, 'Bolt')
+    bolt.addBody('Body1', (0.5, 0.5, 3.0))
+    root = design.rootComponent
+    root.addOccurrence(bolt, (0, 0, 0))
+    root.addOccurrence(bolt, (2, 0, 0))
+    bodies = [body for occurrence in root.allOccurrences for body in occurrence.bRepBodies]
+
+    command = openExportDialog(str(tmp_path))
+    assert not selectBodies(command, bodies)
+    table = command.commandInputs.itemById('filenameTable')
+    assert table.rowCount == 2
+    assert 'Duplicate filenames found: Bolt.stl' in command.commandInputs.itemById('errorTextInput').text
+
+    nameInput = table.getInputAtPosition(1, 0)
+    nameInput.value = 'Bolt right.stl'
+    assert command.changeInput(nameInput)
+    runExport(command)
+
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.stl')) == ['Bolt right.stl', 'Bolt.stl']
+    assert design.exportManager.executeCount == 2
+    assert ui.messages[-1].startswith('Exported 2')
+
+
+def test_filenames_follow_rows_not_selection_order(entry, tmp_path):
+    design = createDesign(3)
+    bodies = list(design.rootComponent.bRepBodies)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, bodies)
+
+    # Deselect the first body and select it again, it moves to the last row
+    selectionInput = command.commandInputs.itemById('selectedBodies')
+    selectionInput.removeSelection(0)
+    command.changeInput(selectionInput)
+    table = command.commandInputs.itemById('filenameTable')
+    table.getInputAtPosition(0, 0).value = 'Second.stl'
+    command.changeInput(table.getInputAtPosition(0, 0))
+    selectionInput.clearSelection()
+    for body in (bodies[0], bodies[1], bodies[2]):
+        selectionInput.addSelection(body)
+    command.changeInput(selectionInput)
+    assert [table.getInputAtPosition(row, 0).value for row in range(3)] == ['Second.stl', 'Part3.stl', 'Part1.stl']
+
+    runExport(command)
+    exported = {entry['file']: entry['body'] for entry in readManifest(str(tmp_path))['files']}
+    assert exported == {'Part1.stl': 'Part1', 'Second.stl': 'Part2', 'Part3.stl': 'Part3'}
@@ -0,0 +1,84 @@
+import math
+
+import adsk.fusion
+
+from harness import importModule
+
+stl_verify = importModule('commands.exportAsSTL.stl_verify')
+
+
+def verify(tmp_path, coordinates, indices):
+    filePath = tmp_path / 'body.stl'
+    filePath.write_bytes(adsk.fusion.stlBytes(coordinates, indices, scale=1.0))
+    return stl_verify.verifyStl(str(filePath))
+
+
+def test_watertight_box(tmp_path):
+    report = verify(tmp_path, *adsk.fusion.boxMesh((2.0, 1.0, 0.5), 2))
+
+    assert report['errors'] == []
+    assert report['facets'] == 48
+    assert (report['degenerate'], report['boundaryEdges'], report['nonManifoldEdges']) == (0, 0, 0)
+    assert report['bounds'] == ((0.0, 0.0, 0.0), (2.0, 1.0, 0.5))
+    assert not stl_verify.hasProblems(report)
+    assert 'watertight' in stl_verify.describeVerification(report)
+
+
+def test_degenerate_facets(tmp_path):
+    coordinates = [
+        0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0,
+        # Corners on a line, and a corner used twice
+        0.0, 0.0, 0.0, 1.0, 1.0, 1.0, 2.0, 2.0, 2.0,
+        # A sliver whose longest edge is the one between its second and third corner
+        0.0, 1e-7, 0.0, -1.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+    ]
+    indices = [0, 1, 2, 3, 4, 5, 3, 3, 4, 6, 7, 8]
+
+    report = verify(tmp_path, coordinates, indices)
+
+    assert report['degenerate'] == 3
+    assert stl_verify.hasProblems(report)
+    assert '3 degenerate facets' in stl_verify.describeVerification(report)
+
+
+def test_facets_that_are_not_numbers_are_degenerate(tmp_path):
+    coordinates = [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0, math.nan, 0.0, 0.0, math.inf, 1.0, 1.0]
+    indices = [0, 1, 2, 3, 1, 2, 0, 1, 4]
+
+    report = verify(tmp_path, coordinates, indices)
+
+    assert report['degenerate'] == 2
+    assert report['errors'] == []
+
+
+def test_open_and_non_manifold_edges(tmp_path):
+    coordinates, indices = adsk.fusion.boxMesh((1.0, 1.0, 1.0), 1)
+    # A fin on an edge of the box, which three facets use then
+    coordinates = list(coordinates) + [0.5, -1.0, -1.0]
+    fin = len(coordinates) // 3 - 1
+    first = indices[:3]
+
+    report = verify(tmp_path, coordinates, list(indices) + [first[0], first[1], fin])
+    assert (report['boundaryEdges'], report['nonManifoldEdges']) == (2, 1)
+
+    # A box without its first facet has a hole of three edges
+    report = verify(tmp_path, coordinates, list(indices[3:]))
+    assert (report['boundaryEdges'], report['nonManifoldEdges']) == (3, 0)
+
+
+def test_files_that_are_not_binary_stl(tmp_path):
+    filePath = tmp_path / 'body.stl'
+    filePath.write_bytes(adsk.fusion.stlBytes(*adsk.fusion.boxMesh((1.0, 1.0, 1.0), 1))[:-10])
+    assert 'header says 12 facets' in stl_verify.verifyStl(str(filePath))['errors'][0]
+
+    filePath.write_bytes(b'solid body\n  facet normal 0 0 0\n' + b' ' * 200)
+    assert stl_verify.verifyStl(str(filePath))['errors'] == ['file is an ASCII STL']
+
+
+def test_large_files_skip_the_edge_check(tmp_path):
+    filePath = tmp_path / 'body.stl'
+    filePath.write_bytes(adsk.fusion.stlBytes(*adsk.fusion.boxMesh((1.0, 1.0, 1.0), 1)))
+
+    report = stl_verify.verifyStl(str(filePath), maxEdgeFacets=11)
+    assert report['boundaryEdges'] is None and report['nonManifoldEdges'] is None
+    assert 'edges not checked' in stl_verify.describeVerification(report)
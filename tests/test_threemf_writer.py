@@ -0,0 +1,107 @@
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from harness import importModule, createDesign, openExportDialog, selectBodies, setInput, runExport
+import adsk.fusion
+
+threemf_writer = importModule('commands.exportAsSTL.threemf_writer')
+
+NAMESPACE = {'m': 'http://schemas.microsoft.com/3dmanufacturing/core/2015/02'}
+
+
+def readPackage(filePath):
+    """Parses a 3MF package back into a list of (name, vertices, triangles) per object."""
+    with zipfile.ZipFile(filePath) as package:
+        assert package.testzip() is None
+        names = package.namelist()
+        assert '[Content_Types].xml' in names
+        rels = ElementTree.fromstring(package.read('_rels/.rels'))
+        assert rels[0].get('Target') == '/' + threemf_writer.MODEL_PATH
+        model = ElementTree.fromstring(package.read(threemf_writer.MODEL_PATH))
+
+    assert model.get('unit') == 'millimeter'
+    objects = []
+    for element in model.iterfind('m:resources/m:object', NAMESPACE):
+        vertices = [
+            tuple(float(vertex.get(axis)) for axis in 'xyz')
+            for vertex in element.iterfind('m:mesh/m:vertices/m:vertex', NAMESPACE)
+        ]
+        triangles = [
+            tuple(int(triangle.get(v)) for v in ('v1', 'v2', 'v3'))
+            for triangle in element.iterfind('m:mesh/m:triangles/m:triangle', NAMESPACE)
+        ]
+        objects.append((element.get('id'), element.get('name'), vertices, triangles))
+
+    build = [item.get('objectid') for item in model.iterfind('m:build/m:item', NAMESPACE)]
+    assert build == [objectId for objectId, _, _, _ in objects]
+    return [(name, vertices, triangles) for _, name, vertices, triangles in objects]
+
+
+def cornerTriangles(coordinates, indices, scale=10.0):
+    # Triangles as tuples of corner positions, rounded to the precision of the package
+    def corner(i):
+        return tuple(round(coordinates[i * 3 + axis] * scale, 3) for axis in range(3))
+
+    return [tuple(corner(indices[t + k]) for k in range(3)) for t in range(0, len(indices), 3)]
+
+
+def test_round_trip(tmp_path):
+    # Fusion's meshes repeat the nodes of every corner, the package welds them
+    square = [0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 0, 0, 1, 1, 0, 0, 1, 0]
+    box, boxIndices = adsk.fusion.boxMesh((1.0, 2.0, 3.0), 2)
+    filePath = tmp_path / 'parts.3mf'
+
+    writer = threemf_writer.ThreeMFWriter(str(filePath))
+    assert writer.addMesh('Square & "quoted" <name>', square, list(range(6))) == 2
+    assert writer.addMesh('Box', box, boxIndices) == 48
+    writer.close()
+
+    (squareName, squareVertices, squareTriangles), (boxName, boxVertices, boxTriangles) = readPackage(filePath)
+    assert squareName == 'Square & "quoted" <name>'
+    assert len(squareVertices) == 4
+    assert [tuple(squareVertices[i] for i in t) for t in squareTriangles] == pytest.approx(
+        cornerTriangles(square, list(range(6)))
+    )
+
+    assert boxName == 'Box'
+    assert len(boxVertices) == len(box) // 3
+    assert [tuple(boxVertices[i] for i in t) for t in boxTriangles] == cornerTriangles(box, boxIndices)
+    assert writer.triangleCount == 50
+
+
+def test_package_appears_when_closed(tmp_path):
+    filePath, tempPath = tmp_path / 'parts.3mf', tmp_path / '.parts.partial.3mf'
+    writer = threemf_writer.ThreeMFWriter(str(filePath), tempPath=str(tempPath))
+    writer.addMesh('Box', *adsk.fusion.boxMesh((1.0, 1.0, 1.0), 1))
+    assert writer.size > 0
+    assert not filePath.exists()
+
+    writer.close()
+    assert not tempPath.exists()
+    assert [name for name, _, _ in readPackage(filePath)] == ['Box']
+
+
+def test_empty_package(tmp_path):
+    writer = threemf_writer.ThreeMFWriter(str(tmp_path / 'empty.3mf'))
+    writer.close()
+    writer.close()
+    assert readPackage(tmp_path / 'empty.3mf') == []
+
+
+def test_dialog_exports_one_package(entry, tmp_path):
+    design = createDesign(3, name='Assembly')
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, design.rootComponent.bRepBodies)
+    nameInput = command.commandInputs.itemById('filenameTable').getInputAtPosition(1, 0)
+    nameInput.value = 'Renamed.stl'
+    command.changeInput(nameInput)
+    setInput(command, 'outputFormatInput', entry.FORMAT_3MF)
+    runExport(command)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['Assembly.3mf', 'manifest.json']
+    objects = readPackage(tmp_path / 'Assembly.3mf')
+    assert [name for name, _, _ in objects] == ['Part1', 'Renamed', 'Part3']
+    expected = entry.calculateBodyMesh(design.rootComponent.bRepBodies.item(0)).triangleCount
+    assert all(len(triangles) == expected for _, _, triangles in objects)
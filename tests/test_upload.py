@@ -0,0 +1,123 @@
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from harness import importModule
+
+upload = importModule('commands.exportAsSTL.upload')
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        body = b''
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            body += self.rfile.read(size + 2)[:-2]
+            if not size:
+                break
+        self.server.requests.append((urllib.parse.unquote(self.path), dict(self.headers), body))
+
+        status = self.server.statuses.pop(0) if self.server.statuses else 201
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UploadHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(upload.time, 'sleep', sleeps.append)
+    monkeypatch.setattr(upload.random, 'uniform', lambda low, high: high)
+    return sleeps
+
+
+def makeUploader(server, **kwargs):
+    return upload.HttpUploader(f'http://127.0.0.1:{server.server_port}/files/', **kwargs)
+
+
+def test_retries_with_backoff_until_the_upload_succeeds(server, sleeps, tmp_path):
+    (tmp_path / 'Part.stl').write_bytes(b'solid' * 1000)
+    server.statuses = [503, 429]
+    uploader = makeUploader(server, retries=3, backoffSeconds=0.5)
+
+    assert uploader.upload(str(tmp_path / 'Part.stl')) == 201
+    uploader.close()
+
+    assert sleeps == [0.5, 1.0]
+    assert uploader.retryCount == 2 and uploader.uploadCount == 1
+    assert [request[2] for request in server.requests] == [b'solid' * 1000] * 3
+
+
+def test_gives_up_after_the_last_retry(server, sleeps, tmp_path):
+    (tmp_path / 'Part.stl').write_bytes(b'solid')
+    server.statuses = [503] * 3
+    uploader = makeUploader(server, retries=2, backoffSeconds=1.0)
+
+    with pytest.raises(upload.UploadError, match='after 3 attempts'):
+        uploader.upload(str(tmp_path / 'Part.stl'))
+
+    assert sleeps == [1.0, 2.0]
+    assert len(server.requests) == 3 and uploader.uploadCount == 0
+
+
+def test_final_statuses_are_not_retried(server, sleeps, tmp_path):
+    (tmp_path / 'Part.stl').write_bytes(b'solid')
+    server.statuses = [403]
+
+    with pytest.raises(upload.UploadError, match='HTTP 403'):
+        makeUploader(server).upload(str(tmp_path / 'Part.stl'))
+
+    assert sleeps == [] and len(server.requests) == 1
+
+
+def test_connection_errors_are_retried(server, sleeps, tmp_path):
+    (tmp_path / 'Part.stl').write_bytes(b'solid')
+    port = server.server_port
+    server.shutdown()
+    server.server_close()
+    uploader = upload.HttpUploader(f'http://127.0.0.1:{port}/files/', retries=1)
+
+    with pytest.raises(upload.UploadError) as raised:
+        uploader.upload(str(tmp_path / 'Part.stl'))
+
+    assert isinstance(raised.value.__cause__, ConnectionError)
+    assert len(sleeps) == 1
+
+
+def test_missing_files_fail_without_retrying(server, sleeps, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        makeUploader(server).upload(str(tmp_path / 'Missing.stl'))
+
+    assert sleeps == [] and server.requests == []
+
+
+def test_names_outside_latin1_are_sent(server, sleeps, tmp_path):
+    (tmp_path / 'part.stl').write_bytes(b'solid')
+
+    makeUploader(server).upload(str(tmp_path / 'part.stl'), 'Träger "Ω".stl')
+
+    path, headers, _ = server.requests[0]
+    assert path == '/files/Träger "Ω".stl'
+    assert headers['Content-Disposition'] == (
+        'attachment; filename="Tr_ger ___.stl"; filename*=UTF-8\'\'Tr%C3%A4ger%20%22%CE%A9%22.stl'
+    )
@@ -0,0 +1,243 @@
+import os
+
+import pytest
+
+from harness import app, ui, importModule, createDesign, openExportDialog, selectBodies, setInput, runExport, runPendingEvents
+import adsk.core
+import adsk.fusion
+
+watch_state = importModule('commands.exportAsSTL.watch_state')
+WatchState = watch_state.WatchState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Design:
+    """Revisions of the watched bodies, changed by the synthetic events."""
+
+    def __init__(self, keys):
+        self.revisions = {key: 1 for key in keys}
+
+    def edit(self, key):
+        self.revisions[key] += 1
+
+    def revisionOf(self, key):
+        return self.revisions.get(key)
+
+
+def makeWatch(keys, debounceSeconds=2.0):
+    clock = FakeClock()
+    state = WatchState(debounceSeconds, clock)
+    state.watch((key, 1, f'{key}.stl') for key in keys)
+    return state, clock
+
+
+def replay(state, clock, design, events, exportSeconds=1.0):
+    """Plays a stream of (time, action) events and returns the exports started.
+
+    Actions are 'poll', or a key, which edits that body and notifies the
+    state like a completed command. Exports take exportSeconds and finish
+    with the revisions they started from.
+    """
+    exports = []
+    running = None
+    for time, action in events:
+        if running and running[0] <= time:
+            clock.now = running[0]
+            state.finish(running[1])
+            running = None
+
+        clock.now = time
+        if action == 'poll':
+            changed = state.poll(design.revisionOf)
+            if changed:
+                exports.append((time, sorted(key for key, _, _ in changed)))
+                running = (time + exportSeconds, {key: revisionId for key, revisionId, _ in changed})
+        else:
+            design.edit(action)
+            state.notify()
+    return exports
+
+
+def test_not_watching_ignores_events():
+    state = WatchState(2.0, FakeClock())
+    assert state.notify() is None
+    assert state.remaining() is None
+    assert state.poll(lambda key: 2) == []
+
+
+def test_burst_of_edits_exports_once():
+    state, clock = makeWatch(['a', 'b', 'c'])
+    design = Design(['a', 'b', 'c'])
+
+    # Edits 0.5 s apart keep restarting the debounce period, polls during it do nothing
+    events = [(0.0, 'a'), (0.5, 'b'), (1.0, 'poll'), (1.0, 'a'), (1.5, 'poll'), (2.9, 'poll'), (3.0, 'poll'), (3.5, 'poll')]
+    assert replay(state, clock, design, events) == [(3.0, ['a', 'b'])]
+    assert state.state == watch_state.WATCH_EXPORTING
+
+
+def test_edits_during_export_start_another_period():
+    state, clock = makeWatch(['a', 'b'])
+    design = Design(['a', 'b'])
+
+    events = [
+        (0.0, 'a'), (2.0, 'poll'),
+        # b changes while a is exported, a is exported again as well as it changed too
+        (2.5, 'b'), (2.6, 'a'), (2.7, 'poll'),
+        (3.5, 'poll'), (4.6, 'poll'), (5.0, 'poll'),
+    ]
+    assert replay(state, clock, design, events) == [(2.0, ['a']), (4.6, ['a', 'b'])]
+
+
+def test_export_finishing_after_the_period_polls_right_away():
+    state, clock = makeWatch(['a'])
+    design = Design(['a'])
+
+    events = [(0.0, 'a'), (2.0, 'poll'), (2.1, 'a'), (6.0, 'poll')]
+    assert replay(state, clock, design, events, exportSeconds=3.0) == [(2.0, ['a']), (6.0, ['a'])]
+
+
+def test_unchanged_and_deleted_bodies_are_not_exported():
+    state, clock = makeWatch(['a', 'b', 'c'])
+    design = Design(['a', 'b', 'c'])
+    del design.revisions['c']
+
+    assert replay(state, clock, design, [(0.0, 'a'), (5.0, 'poll')]) == [(5.0, ['a'])]
+
+    # A failed export keeps the old revision, the body is exported after the next event
+    state.finish({})
+    assert replay(state, clock, design, [(10.0, 'b'), (12.0, 'poll')]) == [(12.0, ['a', 'b'])]
+
+
+def test_finish_reports_remaining_debounce():
+    state, clock = makeWatch(['a'])
+    assert state.notify() == 2.0
+    clock.now = 2.0
+    changed = state.poll(lambda key: 2)
+    assert [key for key, _, _ in changed] == ['a']
+
+    clock.now = 2.5
+    state.notify()
+    clock.now = 3.0
+    assert state.finish({'a': 2}) == pytest.approx(1.5)
+    assert state.state == watch_state.WATCH_PENDING
+
+
+def test_dialog_watch_reexports_edited_body(entry, tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(entry.watch_state, '_clock', clock)
+    scheduled = []
+    monkeypatch.setattr(entry, 'scheduleWatchCheck', scheduled.append)
+
+    design = createDesign(3)
+    bodies = list(design.rootComponent.bRepBodies)
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, bodies)
+    setInput(command, 'watchButton', True)
+    runExport(command)
+    assert design.exportManager.executeCount == 3
+    assert entry.watch_state.isWatching
+
+    # Two commands in quick succession, the second one edits a body
+    ui.commandTerminated.fire(adsk.core.ApplicationCommandEventArgs('SketchCreate'))
+    clock.now = 1.0
+    bodies[1].modify()
+    ui.commandTerminated.fire(adsk.core.ApplicationCommandEventArgs('Extrude'))
+    assert scheduled == [2.0, 2.0]
+
+    # The first timer fires early and is rescheduled for the rest of the period
+    app.fireCustomEvent(entry.WATCH_EVENT_ID)
+    runPendingEvents()
+    assert scheduled[-1] == pytest.approx(2.0)
+    assert design.exportManager.executeCount == 3
+
+    clock.now = 3.0
+    app.fireCustomEvent(entry.WATCH_EVENT_ID)
+    runPendingEvents()
+    assert design.exportManager.executeCount == 4
+    assert entry.watch_state.state == watch_state.WATCH_IDLE
+
+    # Nothing changed since, a save doesn't export again
+    app.documentSaved.fire(adsk.core.DocumentEventArgs(app.activeDocument))
+    clock.now = 10.0
+    app.fireCustomEvent(entry.WATCH_EVENT_ID)
+    runPendingEvents()
+    assert design.exportManager.executeCount == 4
+
+
+def startWatching(entry, monkeypatch, folder, bodies, fileNames=None):
+    clock = FakeClock()
+    monkeypatch.setattr(entry.watch_state, '_clock', clock)
+    monkeypatch.setattr(entry, 'scheduleWatchCheck', lambda seconds: None)
+
+    command = openExportDialog(str(folder))
+    selectBodies(command, bodies)
+    table = command.commandInputs.itemById('filenameTable')
+    for row, fileName in enumerate(fileNames or []):
+        nameInput = table.getInputAtPosition(row, 0)
+        nameInput.value = fileName
+        command.changeInput(nameInput)
+    setInput(command, 'watchButton', True)
+    runExport(command)
+    return clock
+
+
+def runWatchExport(entry, clock):
+    ui.commandTerminated.fire(adsk.core.ApplicationCommandEventArgs('Extrude'))
+    clock.now += 10.0
+    app.fireCustomEvent(entry.WATCH_EVENT_ID)
+    runPendingEvents()
+
+
+def test_watch_overwrites_the_counted_name_it_wrote(entry, tmp_path, monkeypatch):
+    # A file of someone else's has the body's name, the export writes Part1(1).stl
+    (tmp_path / 'Part1.stl').write_bytes(b'other')
+    design = createDesign(1)
+    body = design.rootComponent.bRepBodies.item(0)
+    clock = startWatching(entry, monkeypatch, tmp_path, [body])
+
+    body.modify()
+    runWatchExport(entry, clock)
+    assert design.exportManager.executeCount == 2
+    assert sorted(os.listdir(tmp_path)) == ['.exporttools-cache.json', '.exporttools-journal.jsonl', 'Part1(1).stl', 'Part1.stl', 'manifest.json']
+    assert (tmp_path / 'Part1.stl').read_bytes() == b'other'
+
+    # The cache still knows the file by its requested name, a manual export finds it up to date
+    command = openExportDialog(str(tmp_path))
+    selectBodies(command, [body])
+    runExport(command)
+    assert design.exportManager.executeCount == 2
+    assert not (tmp_path / 'Part1(2).stl').exists()
+
+
+def test_watch_tells_instances_apart(entry, tmp_path, monkeypatch):
+    design = createDesign(0)
+    bolt = adsk.fusion.Component(design, 'Bolt')
+    bolt.addBody('Body1', (0.5, 0.5, 3.0))
+    for i in range(2):
+        design.rootComponent.addOccurrence(bolt, (2 * i, 0, 0))
+    bodies = [body for occurrence in design.rootComponent.allOccurrences for body in occurrence.bRepBodies]
+    clock = startWatching(entry, monkeypatch, tmp_path, bodies, ['Bolt1.stl', 'Bolt2.stl'])
+    oldRevision = bodies[0].revisionId
+
+    # Both instances change with their component, only the second one fails to export
+    exportBodyFusion = entry.exportBodyFusion
+
+    def failSecond(exportMgr, body, filePath, refinement=None):
+        if body.entityToken == bodies[1].entityToken:
+            raise RuntimeError('export failed')
+        exportBodyFusion(exportMgr, body, filePath, refinement)
+
+    monkeypatch.setattr(entry, 'exportBodyFusion', failSecond)
+    bodies[0].modify()
+    runWatchExport(entry, clock)
+
+    revisions = entry.watch_state._revisions
+    assert revisions[bodies[0].entityToken] == bodies[0].revisionId
+    assert revisions[bodies[1].entityToken] == oldRevision